@@ -1,16 +1,29 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Optional
-from ..services.fetcher import fetcher
+from ..services.fetcher import fetcher, MAX_BARS
+from ..services.prefetch import prefetcher
+from ..services.upstream import upstream, UpstreamUnavailable
+from ..services.indicator_cache import indicator_cache
+from ..services.aura_engine import aura_engines
+from ..services.volume_profile import volume_profiles
+from ..services.pipeline import evaluate_strategies, parse_strategies
 from ..services.analysis import TechnicalAnalyzer
 from ..services.signals import SignalGenerator
-from ..services.strategies import Strategies, StrategySignal
+from ..services.strategies import Strategies, StrategySignal, registry
 from ..services.backtester import Backtester
+from ..services.optimizer import optimizer, parse_space
+from ..services.portfolio import PortfolioBacktester
 from ..services.paper_trader import paper_trader
 from ..models.schemas import Signal, AnalysisResult, MarketData, BacktestSummary, PaperTradingStatus
 
 router = APIRouter()
 
+# Simbol default market scan (juga di-prefetch di background saat startup)
+DEFAULT_SCAN_SYMBOLS = ["BTC", "ETH", "AAPL", "TSLA", "GOOGL", "GULA", "ISHG"]
+# Jumlah bar backtest jika limit dan period tidak diisi
+BACKTEST_LIMIT = 1000
+
 @router.post("/paper/start")
 async def start_paper_trading(symbol: str, strategy: str, capital: float = 10000000):
     return paper_trader.start(symbol, strategy, capital)
@@ -23,130 +36,328 @@ async def stop_paper_trading():
 async def get_paper_trading_status():
     return paper_trader.get_status()
 
-@router.get("/strategy/popgun/{symbol}", response_model=List[StrategySignal])
-async def get_popgun_strategy(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+@router.get("/strategies", response_model=List[Dict])
+async def list_strategies():
+    """
+    Daftar strategi terdaftar beserta metadata (warmup, parameter, indikator, dukungan backtest/paper).
+    """
+    return registry.describe()
+
+@router.get("/strategy/{name}/{symbol}", response_model=List[StrategySignal])
+async def get_strategy(name: str, symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None, baseline: str = "mean"):
     """
-    Detects PopGun patterns in historical data.
+    Detects signals for a registered strategy (popgun, fvg, rbd, aura, volume_surprise).
+    Aura memakai engine incremental dan Volume Surprise memakai profil musiman
+    persisten per symbol/interval (baseline: mean, median atau pNN).
     """
     try:
+        spec = registry.get(name)
+        if spec is None:
+            raise HTTPException(status_code=404, detail=f"Strategi tidak dikenal: {name} (pilihan: {', '.join(s.slug for s in registry.specs())})")
         data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        
-        signals = Strategies.detect_popgun(data)
-        return signals
+
+        results = await run_in_threadpool(evaluate_strategies, data, [spec.slug], f"{source}_{symbol}", interval, baseline, period)
+        return results[spec.slug]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/strategy/fvg/{symbol}", response_model=List[StrategySignal])
-async def get_fvg_strategy(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+@router.get("/strategies/{symbol}", response_model=Dict[str, List])
+async def get_multi_strategy(symbol: str, strategies: Optional[str] = None, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None, baseline: str = "mean"):
     """
-    Detects Bullish Fair Value Gaps (FVG) in historical data.
+    Evaluasi beberapa strategi sekaligus atas satu data (satu request untuk semua overlay chart).
+    strategies: comma separated (popgun,fvg,rbd,aura,volume_surprise,volume_surprise_indicator), kosong = semua.
     """
     try:
+        names = parse_strategies(strategies)
         data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        
-        signals = Strategies.detect_fvg(data)
-        return signals
+
+        return await run_in_threadpool(evaluate_strategies, data, names, f"{source}_{symbol}", interval, baseline, period)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/strategy/rbd/{symbol}", response_model=List[StrategySignal])
-async def get_rbd_strategy(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+@router.get("/indicator/volume_surprise/{symbol}", response_model=List[Dict])
+async def get_volume_surprise_indicator(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None, baseline: str = "mean"):
     """
-    Detects Rally-Base-Drop (RBD) Pivot Signals.
+    Returns time-series data for Volume Surprise indicator (Volume vs Expected Volume).
+    baseline: mean (default), median atau pNN (kuantil histori slot).
     """
     try:
         data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
         
-        signals = Strategies.detect_rbd(data)
-        return signals
+        # Profil musiman persisten per symbol/interval/period: hanya bar baru yang diproses
+        expected = volume_profiles.expected_volume(f"{source}_{symbol}_{period}", interval, data, baseline=baseline)
+        results = Strategies.analyze_volume_surprise(data, expected=expected, baseline=baseline)
+        return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/strategy/aura/{symbol}", response_model=List[StrategySignal])
-async def get_aura_strategy(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+
+
+@router.get("/indicator/volume_surprise_sector", response_model=Dict)
+async def get_sector_volume_surprise(symbols: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None, baseline: str = "median"):
     """
-    Detects Aura V14 Signals.
+    Volume Surprise level sektor untuk daftar simbol (comma separated), memakai
+    baseline kuantil per slot yang di-merge dari semua simbol.
     """
     try:
-        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
+        symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+        if not symbol_list:
+            raise HTTPException(status_code=400, detail="Parameter symbols kosong")
+        datasets = await run_in_threadpool(fetcher.get_bulk_historical_data, symbol_list, interval=interval, limit=300, source=source, period=period)
+        if not any(datasets.values()):
+            raise HTTPException(status_code=404, detail="Data historis tidak ditemukan")
+        return volume_profiles.sector_surprise(datasets, interval, baseline=baseline, key_prefix=f"{source}_{period}_")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _exchange_rate(symbol: str, source: str) -> float:
+    # Determine exchange rate
+    # If asset is Crypto/US Stock (USD) and capital is IDR (implied by default 10jt)
+    # We need to know if the asset is priced in IDR or USD.
+    # Simple heuristic: If symbol ends with .JK -> IDR. Else -> USD.
+    is_idr_asset = symbol.endswith(".JK") or source == "STOCKBIT" or source == "IDX"
+    return 1.0 if is_idr_asset else 16000.0 # Default USD rate
+
+def _backtest_limit(limit: Optional[int], period: Optional[str]) -> int:
+    """
+    Jumlah bar untuk backtest: limit eksplisit, atau seluruh bar jika period diisi
+    (histori panjang), atau BACKTEST_LIMIT bar terakhir.
+    """
+    if limit is not None:
+        if limit < 1:
+            raise ValueError("limit minimal 1")
+        return limit
+    return MAX_BARS if period else BACKTEST_LIMIT
+
+@router.get("/backtest/{strategy}/{symbol}", response_model=BacktestSummary)
+async def run_backtest(
+    strategy: str, 
+    symbol: str, 
+    interval: str = "1d", 
+    source: str = "YAHOO", 
+    period: Optional[str] = None,
+    initial_capital: float = 10000000,
+    expiry: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    Runs a backtest for a given strategy and symbol.
+    expiry: batas bar order stop/limit menunggu fill (default sampai data habis).
+    limit: jumlah bar terakhir (default seluruh period jika period diisi, selain itu 1000).
+    """
+    try:
+        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=_backtest_limit(limit, period), source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
         
-        signals = Strategies.detect_aura(data)
-        return signals
+        backtester = Backtester(data, initial_capital=initial_capital, exchange_rate=_exchange_rate(symbol, source))
+        result = await run_in_threadpool(backtester.run, strategy.upper(), expiry)
+        
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/strategy/volume_surprise/{symbol}", response_model=List[StrategySignal])
-async def get_volume_surprise_strategy(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+@router.get("/backtest/{strategy}/{symbol}/columns", response_model=Dict)
+async def run_backtest_columns(
+    strategy: str,
+    symbol: str,
+    interval: str = "1d",
+    source: str = "YAHOO",
+    period: Optional[str] = None,
+    initial_capital: float = 10000000,
+    expiry: Optional[int] = None,
+    limit: Optional[int] = None
+):
     """
-    Detects Volume Surprise Signals.
+    Backtest dengan hasil kolom (satu list per field trade) + statistik ringkasan;
+    lebih ringan dari daftar TradeResult untuk histori panjang.
     """
     try:
-        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
+        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=_backtest_limit(limit, period), source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        
-        signals = Strategies.detect_volume_surprise(data)
-        return signals
+
+        backtester = Backtester(data, initial_capital=initial_capital, exchange_rate=_exchange_rate(symbol, source))
+        columns = await run_in_threadpool(backtester.simulate, strategy.upper(), expiry)
+        if columns is None:
+            raise HTTPException(status_code=404, detail=f"Strategi tidak bisa di-backtest: {strategy}")
+        return {"strategy": strategy.upper(), **columns.stats(), "trades": columns.to_dict()}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/indicator/volume_surprise/{symbol}", response_model=List[Dict])
-async def get_volume_surprise_indicator(symbol: str, interval: str = "1d", source: str = "YAHOO", period: Optional[str] = None):
+@router.get("/backtest/{strategy}/{symbol}/walk_forward", response_model=Dict)
+async def run_walk_forward(
+    strategy: str,
+    symbol: str,
+    train_bars: int = 250,
+    test_bars: int = 50,
+    step: Optional[int] = None,
+    anchored: bool = False,
+    interval: str = "1d",
+    source: str = "YAHOO",
+    period: Optional[str] = None,
+    initial_capital: float = 10000000,
+    expiry: Optional[int] = None,
+    limit: Optional[int] = None
+):
     """
-    Returns time-series data for Volume Surprise indicator (Volume vs Expected Volume).
+    Walk-forward / rolling-window backtest: metrik per window train/test + agregat out-of-sample.
+    Indikator dan sinyal dihitung sekali untuk seluruh data lalu diiris per window.
     """
     try:
-        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
+        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=_backtest_limit(limit, period), source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        
-        results = Strategies.analyze_volume_surprise(data)
-        return results
+
+        backtester = Backtester(data, initial_capital=initial_capital, exchange_rate=_exchange_rate(symbol, source))
+        result = await run_in_threadpool(backtester.walk_forward, strategy.upper(), train_bars, test_bars, step, anchored, expiry)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"Strategi tidak bisa di-backtest: {strategy}")
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/portfolio/backtest/{strategy}", response_model=Dict)
+async def run_portfolio_backtest(
+    strategy: str,
+    symbols: str,
+    interval: str = "1d",
+    source: str = "YAHOO",
+    period: Optional[str] = None,
+    initial_capital: float = 100000000,
+    max_positions: int = 10,
+    position_size: Optional[float] = None,
+    expiry: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    Backtest satu strategi atas universe simbol (comma separated, misal daftar saham IDX)
+    dengan satu pool modal, batas posisi terbuka, dan merge event berurutan waktu.
+    position_size: fraksi equity per trade (default 1 / max_positions).
+    """
+    try:
+        symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+        if not symbol_list:
+            raise HTTPException(status_code=400, detail="Parameter symbols kosong")
+        backtester = PortfolioBacktester(initial_capital=initial_capital, max_positions=max_positions, position_size=position_size)
+        datasets = await run_in_threadpool(fetcher.get_bulk_historical_data, symbol_list, interval=interval, limit=_backtest_limit(limit, period), source=source, period=period)
+        if not any(datasets.values()):
+            raise HTTPException(status_code=404, detail="Data historis tidak ditemukan")
+        return await run_in_threadpool(backtester.run, strategy.upper(), datasets, expiry)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-
-@router.get("/backtest/{strategy}/{symbol}", response_model=BacktestSummary)
-async def run_backtest(
-    strategy: str, 
-    symbol: str, 
-    interval: str = "1d", 
-    source: str = "YAHOO", 
+@router.post("/optimize/{strategy}/{symbol}", response_model=Dict)
+async def start_optimization(
+    strategy: str,
+    symbol: str,
+    params: str,
+    interval: str = "1d",
+    source: str = "YAHOO",
     period: Optional[str] = None,
-    initial_capital: float = 10000000
+    mode: str = "grid",
+    samples: Optional[int] = None,
+    metric: str = "total_pnl",
+    initial_capital: float = 10000000,
+    limit: Optional[int] = None
 ):
     """
-    Runs a backtest for a given strategy and symbol.
+    Parameter sweep di background (process pool). params: "lookback=10,20,30;atr_mult=1,1.5".
+    mode: grid / random (samples kombinasi). Progress & hasil: GET /optimize/jobs/{id}.
     """
     try:
-        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=1000, source=source, period=period)
+        spec = registry.get(strategy)
+        if spec is None:
+            raise HTTPException(status_code=404, detail=f"Strategi tidak dikenal: {strategy}")
+        space = parse_space(params, spec.params)
+        data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=_backtest_limit(limit, period), source=source, period=period)
         if not data:
              raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        
-        # Determine exchange rate
-        # If asset is Crypto/US Stock (USD) and capital is IDR (implied by default 10jt)
-        # We need to know if the asset is priced in IDR or USD.
-        # Simple heuristic: If symbol ends with .JK -> IDR. Else -> USD.
-        
-        is_idr_asset = symbol.endswith(".JK") or source == "STOCKBIT" or source == "IDX"
-        exchange_rate = 1.0 if is_idr_asset else 16000.0 # Default USD rate
-        
-        backtester = Backtester(data, initial_capital=initial_capital, exchange_rate=exchange_rate)
-        result = backtester.run(strategy.upper())
-        
-        return result
+
+        job = optimizer.start(data, spec.name, space, mode=mode, samples=samples, metric=metric,
+                              initial_capital=initial_capital, exchange_rate=_exchange_rate(symbol, source),
+                              label=f"{source}_{symbol}_{interval}")
+        return job.to_dict(top=0)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/optimize/jobs", response_model=List[Dict])
+async def list_optimization_jobs():
+    return optimizer.jobs()
+
+@router.get("/optimize/jobs/{job_id}", response_model=Dict)
+async def get_optimization_job(job_id: str, top: int = 20):
+    """
+    Status, progress, dan tabel hasil ter-ranking (top N) satu sweep.
+    """
+    job = optimizer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job tidak ditemukan: {job_id}")
+    return job.to_dict(top=top)
+
+@router.post("/optimize/jobs/{job_id}/cancel", response_model=Dict)
+async def cancel_optimization_job(job_id: str):
+    job = optimizer.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job tidak ditemukan: {job_id}")
+    return job.to_dict(top=0)
+
 @router.get("/signals/{symbol}", response_model=Signal)
 async def get_signal(symbol: str, interval: str = "1d"):
     """
@@ -173,6 +384,8 @@ async def get_signal(symbol: str, interval: str = "1d"):
         
         return signal
 
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -186,7 +399,10 @@ async def get_history(symbol: str, interval: str = "1d", source: str = "YAHOO",
         data = await run_in_threadpool(fetcher.get_historical_data, symbol, interval=interval, limit=300, source=source, period=period)
         if not data:
             raise HTTPException(status_code=404, detail=f"Data historis tidak ditemukan untuk {symbol}")
-        return data
+        # Model pydantic hanya dibangun di sini (batas API)
+        return data.to_marketdata()
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -196,15 +412,59 @@ async def get_latest(symbol: str, interval: str = "1d", source: str = "YAHOO"):
     Mengambil data candle terakhir untuk update realtime.
     """
     try:
-        data = await run_in_threadpool(fetcher.get_latest_candle, symbol, interval=interval, source=source)
+        data = await fetcher.get_latest_candle(symbol, interval=interval, source=source)
         if not data:
             raise HTTPException(status_code=404, detail="Data not available")
         return data
     except HTTPException:
         raise
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache/stats", response_model=Dict)
+async def get_cache_stats():
+    """
+    Statistik cache bar (hit, miss, eviction, memory) untuk sizing cache.
+    """
+    return fetcher.cache.stats()
+
+@router.get("/indicators/cache/stats", response_model=Dict)
+async def get_indicator_cache_stats():
+    """
+    Statistik memoization indikator (hit, miss, eviction).
+    """
+    return indicator_cache.stats()
+
+@router.get("/volume_profiles/stats", response_model=Dict)
+async def get_volume_profile_stats():
+    """
+    Statistik profil Volume Surprise (jumlah profil, slot, update, rebuild).
+    """
+    return volume_profiles.stats()
+
+@router.get("/aura/engines/stats", response_model=Dict)
+async def get_aura_engine_stats():
+    """
+    Statistik engine Aura incremental (jumlah engine, bar diproses, replay).
+    """
+    return aura_engines.stats()
+
+@router.get("/prefetch/stats", response_model=Dict)
+async def get_prefetch_stats():
+    """
+    Status scheduler prefetch (watchlist, jadwal refresh berikutnya, jumlah run).
+    """
+    return prefetcher.stats()
+
+@router.get("/upstream/stats", response_model=Dict)
+async def get_upstream_stats():
+    """
+    Status governance upstream per host (circuit, throttled, shed, served stale).
+    """
+    return upstream.stats()
+
 @router.get("/market-scan", response_model=List[Signal])
 async def scan_market(interval: str = "1d", symbols: Optional[str] = None, source: str = "YAHOO"):
     """
@@ -214,14 +474,19 @@ async def scan_market(interval: str = "1d", symbols: Optional[str] = None, sourc
     if symbols:
         symbol_list = [s.strip() for s in symbols.split(",") if s.strip()]
     else:
-        symbol_list = ["BTC", "ETH", "AAPL", "TSLA", "GOOGL", "GULA", "ISHG"]
+        symbol_list = DEFAULT_SCAN_SYMBOLS
     
     results = []
     
+    # Satu download batch (per chunk) untuk semua simbol, bukan satu request per simbol
+    bulk_data = await run_in_threadpool(fetcher.get_bulk_historical_data, symbol_list, interval=interval, limit=300, source=source)
+    
     for sym in symbol_list:
         try:
             # Gunakan logika yang sama dengan get_signal
-            raw_data = await run_in_threadpool(fetcher.get_historical_data, sym, interval=interval, limit=300, source=source)
+            raw_data = bulk_data.get(sym)
+            if not raw_data:
+                continue
             analyzer = TechnicalAnalyzer(raw_data)
             analysis_result = analyzer.get_latest_analysis(sym)
             if analysis_result:
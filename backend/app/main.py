@@ -1,11 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api import market
+from .services.http_client import http_clients
+from .services.fetcher import fetcher
+from .services.prefetch import prefetcher, PREFETCH_ENABLED, PREFETCH_INTERVALS, PREFETCH_SYMBOLS
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jaga cache tetap hangat untuk simbol market scan (dan simbol tambahan dari env)
+    if PREFETCH_ENABLED:
+        prefetcher.add_watchlist("market-scan", market.DEFAULT_SCAN_SYMBOLS, PREFETCH_INTERVALS)
+        if PREFETCH_SYMBOLS:
+            prefetcher.add_watchlist("custom", PREFETCH_SYMBOLS, PREFETCH_INTERVALS)
+        await prefetcher.start()
+    yield
+    # Hentikan prefetch dan feed streaming, lalu tutup connection pool upstream saat shutdown
+    await prefetcher.stop()
+    await fetcher.streams.stop_all()
+    await http_clients.aclose()
 
 app = FastAPI(
     title="Signaliers API",
     description="Backend API untuk analisis sinyal saham dan kripto real-time.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Konfigurasi CORS agar Frontend bisa mengakses API
@@ -1,47 +1,37 @@
-from typing import List, Optional
-from ..models.schemas import MarketData, AnalysisResult
+from typing import Optional
+from ..models.schemas import AnalysisResult
+from .bar_series import BarSeries
+from . import indicators
+from .indicator_cache import cached
 
 class TechnicalAnalyzer:
-    def __init__(self, data: List[MarketData]):
+    def __init__(self, data: BarSeries):
         self.data = data
 
     def get_latest_analysis(self, symbol: str) -> Optional[AnalysisResult]:
         if not self.data:
             return None
-            
-        last_candle = self.data[-1]
         
         # Simple Logic without pandas_ta for now (to avoid dependency issues)
         # We can implement basic SMA/RSI calculation manually here if needed
         # For now, we return basic price info to ensure dashboard works
         
-        prices = [d.close for d in self.data]
+        prices = self.data.close
         
         # Calculate Simple SMA 50
         sma_50 = None
         if len(prices) >= 50:
-            sma_50 = sum(prices[-50:]) / 50
+            sma_50 = float(indicators.sma(prices[-50:], 50)[-1])
             
         # Calculate RSI (Simplified 14 periods)
-        rsi = 50.0
-        if len(prices) > 14:
-            deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-            gains = [d for d in deltas if d > 0]
-            losses = [abs(d) for d in deltas if d < 0]
-            
-            avg_gain = sum(gains[-14:]) / 14 if gains else 0
-            avg_loss = sum(losses[-14:]) / 14 if losses else 0
-            
-            if avg_loss == 0:
-                rsi = 100.0
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
+        rsi = cached(indicators.simple_rsi, self.data, 14)
+        if rsi is None:
+            rsi = 50.0
 
         return AnalysisResult(
             symbol=symbol,
-            price=last_candle.close,
-            volume=last_candle.volume,
+            price=float(prices[-1]),
+            volume=float(self.data.volume[-1]),
             rsi=rsi,
             sma_50=sma_50,
             sma_200=None, # Need more data
@@ -50,5 +40,5 @@ class TechnicalAnalyzer:
             upper_band=None,
             lower_band=None,
             volume_avg=None,
-            timestamp=last_candle.timestamp
+            timestamp=self.data.datetime_at(-1)
         )
\ No newline at end of file
@@ -0,0 +1,188 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from app.models.schemas import StrategySignal
+from .bar_series import BarSeries
+from .bar_cache import interval_seconds
+from .indicator_state import AtrState, CciState, DmiState, MfiState, RsiState
+from .strategies.registry import registry
+
+# Jumlah engine (symbol/interval) yang disimpan (bisa di-override lewat env)
+AURA_ENGINE_MAX = int(os.getenv("AURA_ENGINE_MAX", "256"))
+
+class AuraEngine:
+    """
+    Aura V14 incremental: state indikator + state machine detect_aura disimpan
+    sebagai checkpoint, sehingga setiap update hanya memproses bar yang baru close
+    (O(1) per bar terhadap panjang histori). Candle yang masih berjalan dievaluasi
+    sementara (peek) tanpa mengubah checkpoint.
+
+    Hasil update() selalu sama dengan detect_aura() pada seluruh histori engine
+    (nilai indikator Wilder sama sampai pembulatan floating point):
+    - anchored=True: histori = data yang diberikan (sama dengan detect_aura(data));
+      jika bar pertama data bergeser, engine replay ulang dari awal data.
+    - anchored=False: bar baru terus ditambahkan walaupun window data bergeser
+      (untuk loop yang hanya mengambil N bar terakhir, misal paper trader).
+    Jika bar terakhir yang sudah diproses tidak ada lagi / berubah isinya di data
+    baru (revisi upstream, gap), engine replay ulang dari data tersebut.
+    """
+
+    def __init__(self, interval: str = "1d", anchored: bool = True):
+        # Modul strategi Aura di-load lazy lewat registry
+        self._aura = registry.get("AURA").import_module()
+        self.interval = interval
+        self.anchored = anchored
+        self._lock = threading.Lock()
+        self.replays = 0
+        self._reset()
+
+    def _reset(self):
+        aura = self._aura
+        self.states = {
+            "mfi": MfiState(aura.ALPHA_P),
+            "atr": AtrState(aura.ALPHA_P),
+            "cci": CciState(aura.MAGIC_P),
+            "dmi": DmiState(aura.ADX_P),
+            "rsi": RsiState(aura.RSI_P),
+        }
+        self.aura = aura.AuraState()
+        self.count = 0
+        self.first_ts: Optional[int] = None
+        self.last_bar: Optional[Tuple[int, float, float, float, float]] = None # (ts, high, low, close, volume)
+        self.closed_signals: List[StrategySignal] = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Checkpoint state (tanpa daftar sinyal); bisa disimpan sebagai JSON.
+        """
+        return {
+            "count": self.count,
+            "first_ts": self.first_ts,
+            "last_bar": self.last_bar,
+            "states": {name: state.snapshot() for name, state in self.states.items()},
+            "aura": self.aura.snapshot(),
+        }
+
+    def restore(self, checkpoint: Dict[str, Any]):
+        self.count = checkpoint["count"]
+        self.first_ts = checkpoint["first_ts"]
+        self.last_bar = tuple(checkpoint["last_bar"]) if checkpoint["last_bar"] is not None else None
+        for name, state in self.states.items():
+            state.restore(checkpoint["states"][name])
+        self.aura.restore(checkpoint["aura"])
+
+    def _step(self, ts: int, high: float, low: float, close: float, volume: float, tzinfo) -> Optional[StrategySignal]:
+        mfi = self.states["mfi"]._step(high, low, close, volume)
+        atr = self.states["atr"]._step(high, low, close, volume)
+        cci = self.states["cci"]._step(high, low, close, volume)
+        _, _, adx = self.states["dmi"]._step(high, low, close, volume)
+        rsi = self.states["rsi"]._step(high, low, close, volume)
+        self.count += 1
+        hit = self.aura.step(high, low, close, mfi, atr, cci, adx, rsi)
+        if hit is None:
+            return None
+        return self._aura.aura_signal(datetime.fromtimestamp(ts, tz=tzinfo), close, self.aura.alpha_trend, *hit)
+
+    def _resume_index(self, data: BarSeries) -> Optional[int]:
+        # Index bar pertama yang belum diproses, atau None jika harus replay dari awal
+        ts = data.timestamp
+        if self.last_bar is None:
+            return None
+        if self.anchored and int(ts[0]) != self.first_ts:
+            return None
+        pos = int(np.searchsorted(ts, self.last_bar[0]))
+        if pos >= len(ts) or int(ts[pos]) != self.last_bar[0]:
+            return None
+        if (float(data.high[pos]), float(data.low[pos]), float(data.close[pos]), float(data.volume[pos])) != self.last_bar[1:]:
+            return None
+        return pos + 1
+
+    def update(self, data: BarSeries, now: Optional[float] = None) -> List[StrategySignal]:
+        """
+        Proses bar baru yang sudah close dari `data`, evaluasi sementara candle yang
+        masih berjalan, dan kembalikan sinyal = detect_aura(histori engine).
+        """
+        if len(data) == 0:
+            return []
+        now = time.time() if now is None else now
+        tzinfo = timezone.utc if not data.tz or data.tz == "UTC" else ZoneInfo(data.tz)
+        ts = data.timestamp
+
+        with self._lock:
+            start = self._resume_index(data)
+            if start is None:
+                if self.last_bar is not None:
+                    self.replays += 1
+                self._reset()
+                self.first_ts = int(ts[0])
+                start = 0
+
+            # Bar close jika waktu buka + panjang interval sudah lewat
+            closed_end = max(int(np.searchsorted(ts, now - interval_seconds(self.interval), side="right")), start)
+            high, low, close, volume = data.high, data.low, data.close, data.volume
+            for i in range(start, closed_end):
+                bar = (int(ts[i]), float(high[i]), float(low[i]), float(close[i]), float(volume[i]))
+                signal = self._step(*bar, tzinfo)
+                if signal is not None:
+                    self.closed_signals.append(signal)
+                self.last_bar = bar
+
+            # Candle berjalan: evaluasi di atas checkpoint lalu kembalikan state
+            provisional = []
+            if closed_end < len(data):
+                saved = self.snapshot()
+                try:
+                    for i in range(closed_end, len(data)):
+                        signal = self._step(int(ts[i]), float(high[i]), float(low[i]), float(close[i]), float(volume[i]), tzinfo)
+                        if signal is not None:
+                            provisional.append(signal)
+                    total = self.count
+                finally:
+                    self.restore(saved)
+            else:
+                total = self.count
+
+            if total < self._aura.MIN_BARS:
+                return []
+            return self.closed_signals + provisional
+
+class AuraEngineRegistry:
+    """
+    Satu AuraEngine per key (misal symbol/interval), LRU dengan batas jumlah engine.
+    """
+
+    def __init__(self, max_engines: int = AURA_ENGINE_MAX):
+        self.max_engines = max_engines
+        self._lock = threading.Lock()
+        self._engines: "OrderedDict[str, AuraEngine]" = OrderedDict()
+
+    def get(self, key: str, interval: str = "1d", anchored: bool = True) -> AuraEngine:
+        key = f"{key}_{interval}_{'anchored' if anchored else 'rolling'}"
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._engines[key] = AuraEngine(interval, anchored)
+                while len(self._engines) > self.max_engines:
+                    self._engines.popitem(last=False)
+            self._engines.move_to_end(key)
+            return engine
+
+    def update(self, key: str, interval: str, data: BarSeries, anchored: bool = True) -> List[StrategySignal]:
+        return self.get(key, interval, anchored).update(data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engines": len(self._engines),
+                "max_engines": self.max_engines,
+                "bars": sum(e.count for e in self._engines.values()),
+                "replays": sum(e.replays for e in self._engines.values()),
+            }
+
+# Singleton instance
+aura_engines = AuraEngineRegistry()
@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .bar_series import BarSeries
+
+# Konfigurasi cache (bisa di-override lewat env)
+DEFAULT_MAX_BYTES = int(os.getenv("BAR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MIN_TTL = float(os.getenv("BAR_CACHE_MIN_TTL", "5"))
+MAX_TTL = float(os.getenv("BAR_CACHE_MAX_TTL", "900"))
+STALE_TTL = float(os.getenv("BAR_CACHE_STALE_TTL", "600"))
+# Jeda setelah candle close sebelum data upstream dianggap sudah tersedia
+CLOSE_GRACE = 2.0
+
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "wk": 7 * 86400, "mo": 30 * 86400}
+
+def interval_seconds(interval: str) -> int:
+    """
+    Panjang satu candle dalam detik ("1m" -> 60, "1h" -> 3600, "1wk" -> 604800).
+    """
+    interval = interval.lower()
+    amount = int("".join(c for c in interval if c.isdigit()) or 1)
+    unit = interval.lstrip("0123456789")
+    return amount * _UNIT_SECONDS.get(unit, 86400)
+
+def candle_ttl(interval: str, now: Optional[float] = None) -> float:
+    """
+    Lama data valid: sampai candle berikutnya bisa close (batas interval, UTC-aligned),
+    dibatasi MIN_TTL..MAX_TTL supaya candle harian/mingguan yang masih berjalan tetap ter-refresh.
+    """
+    now = time.time() if now is None else now
+    step = interval_seconds(interval)
+    next_close = (now // step + 1) * step + CLOSE_GRACE
+    return min(max(next_close - now, MIN_TTL), MAX_TTL)
+
+class BarCache:
+    """
+    Cache LRU untuk BarSeries dengan batas memory, TTL berbasis candle,
+    dan mode stale-while-revalidate.
+
+    get() mengembalikan (series, is_stale). Entry yang sudah expired tapi masih
+    dalam jendela stale_ttl tetap dikembalikan (is_stale=True) agar caller bisa
+    menyajikannya sambil me-refresh di background. Entry yang lebih basi lagi
+    hanya bisa diambil lewat peek() sampai tertimpa atau ter-evict.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, stale_ttl: float = STALE_TTL):
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        # key -> (series, expires_at, nbytes)
+        self._entries: "OrderedDict[str, Tuple[BarSeries, float, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[Optional[BarSeries], bool]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            series, expires_at, _ = entry
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return series, False
+
+            if now < expires_at + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return series, True
+
+            # Terlalu basi: anggap miss (entry tetap disimpan untuk peek() saat upstream down)
+            self.misses += 1
+            return None, False
+
+    def peek(self, key: str) -> Optional[BarSeries]:
+        """
+        Ambil entry tanpa memperhatikan TTL (fallback saat upstream gagal / circuit open).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key: str, series: BarSeries, interval: str):
+        nbytes = series.nbytes
+        expires_at = time.time() + candle_ttl(interval)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (series, expires_at, nbytes)
+            self.current_bytes += nbytes
+
+            # Evict LRU sampai di bawah budget (entry terbaru selalu dipertahankan)
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        _, _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,173 @@
+import itertools
+from datetime import datetime, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from ..models.schemas import MarketData
+
+# Penomoran series: slice/tail mewarisi nomor induknya (data yang sama)
+_origins = itertools.count(1)
+
+class BarSeries:
+    """
+    Kontainer OHLCV kolumnar untuk layer service.
+
+    Menyimpan array NumPy (open/high/low/close/volume float64) dan timestamp int64
+    epoch detik UTC, plus nama timezone bursa untuk konversi balik ke datetime.
+    Model pydantic (MarketData) hanya dibuat di batas API lewat to_marketdata().
+    """
+
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume", "tz", "origin")
+
+    FIELDS = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, timestamp: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, tz: Optional[str] = None, origin: Optional[int] = None):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.tz = tz
+        self.origin = next(_origins) if origin is None else origin
+
+    @classmethod
+    def empty(cls, tz: Optional[str] = None) -> "BarSeries":
+        ts = np.empty(0, dtype=np.int64)
+        cols = [np.empty(0, dtype=np.float64) for _ in cls.FIELDS]
+        return cls(ts, *cols, tz=tz)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "BarSeries":
+        """
+        Konversi DataFrame hasil yfinance (index Date/Datetime, kolom Open..Volume).
+        Timestamp duplikat dibuang (ambil yang terakhir).
+        """
+        if df.index.has_duplicates:
+            df = df[~df.index.duplicated(keep='last')]
+
+        index = df.index
+        tz = str(index.tz) if index.tz is not None else None
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+
+        return cls(
+            index.as_unit("s").asi8.astype(np.int64),
+            df["Open"].to_numpy(dtype=np.float64),
+            df["High"].to_numpy(dtype=np.float64),
+            df["Low"].to_numpy(dtype=np.float64),
+            df["Close"].to_numpy(dtype=np.float64),
+            df["Volume"].to_numpy(dtype=np.float64),
+            tz=tz,
+        )
+
+    @classmethod
+    def from_marketdata(cls, data: List[MarketData]) -> "BarSeries":
+        if not data:
+            return cls.empty()
+
+        first_tz = data[0].timestamp.tzinfo
+        return cls(
+            np.array([int(d.timestamp.replace(tzinfo=d.timestamp.tzinfo or timezone.utc).timestamp()) for d in data], dtype=np.int64),
+            np.array([d.open for d in data], dtype=np.float64),
+            np.array([d.high for d in data], dtype=np.float64),
+            np.array([d.low for d in data], dtype=np.float64),
+            np.array([d.close for d in data], dtype=np.float64),
+            np.array([d.volume for d in data], dtype=np.float64),
+            tz=getattr(first_tz, "key", None),
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, key: slice) -> "BarSeries":
+        if not isinstance(key, slice):
+            raise TypeError("BarSeries hanya mendukung slicing; gunakan candle(i) untuk satu bar")
+        return BarSeries(
+            self.timestamp[key], self.open[key], self.high[key],
+            self.low[key], self.close[key], self.volume[key], tz=self.tz, origin=self.origin,
+        )
+
+    def tail(self, n: int) -> "BarSeries":
+        if n <= 0:
+            return self[0:0]
+        return self[-n:]
+
+    def concat(self, other: "BarSeries") -> "BarSeries":
+        """
+        Gabungkan dua series; bar dari `other` menang untuk timestamp yang overlap.
+        """
+        if len(other) == 0:
+            return self
+        head = self[:np.searchsorted(self.timestamp, other.timestamp[0], side="left")]
+        return BarSeries(
+            np.concatenate([head.timestamp, other.timestamp]),
+            np.concatenate([head.open, other.open]),
+            np.concatenate([head.high, other.high]),
+            np.concatenate([head.low, other.low]),
+            np.concatenate([head.close, other.close]),
+            np.concatenate([head.volume, other.volume]),
+            tz=self.tz or other.tz,
+        )
+
+    @property
+    def fingerprint(self) -> tuple:
+        """
+        Identitas data series: nomor series asal + rentang bar. Array tidak pernah
+        diubah in-place, jadi fingerprint sama berarti isi bar sama.
+        """
+        if len(self.timestamp) == 0:
+            return (self.origin, 0)
+        return (self.origin, len(self.timestamp), int(self.timestamp[0]), int(self.timestamp[-1]))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f).nbytes for f in ("timestamp",) + self.FIELDS)
+
+    def _tzinfo(self):
+        if not self.tz or self.tz == "UTC":
+            return timezone.utc
+        return ZoneInfo(self.tz)
+
+    def datetime_at(self, i: int) -> datetime:
+        return datetime.fromtimestamp(int(self.timestamp[i]), tz=self._tzinfo())
+
+    def datetimes(self, indices: Optional[np.ndarray] = None) -> List[datetime]:
+        """
+        Datetime semua bar, atau hanya bar pada `indices` (misal index hasil mask).
+        """
+        tzinfo = self._tzinfo()
+        timestamps = self.timestamp if indices is None else self.timestamp[indices]
+        return [datetime.fromtimestamp(ts, tz=tzinfo) for ts in timestamps.tolist()]
+
+    def to_datetime_index(self) -> pd.DatetimeIndex:
+        index = pd.to_datetime(self.timestamp, unit="s", utc=True)
+        if self.tz and self.tz != "UTC":
+            index = index.tz_convert(self.tz)
+        return index
+
+    def candle(self, i: int) -> MarketData:
+        return MarketData(
+            timestamp=self.datetime_at(i),
+            open=float(self.open[i]),
+            high=float(self.high[i]),
+            low=float(self.low[i]),
+            close=float(self.close[i]),
+            volume=float(self.volume[i]),
+        )
+
+    def to_marketdata(self) -> List[MarketData]:
+        """
+        Bangun list MarketData untuk response API. Data sudah tervalidasi saat
+        masuk ke BarSeries, jadi pakai model_construct (tanpa validasi ulang).
+        """
+        construct = MarketData.model_construct
+        return [
+            construct(timestamp=ts, open=o, high=h, low=l, close=c, volume=v)
+            for ts, o, h, l, c, v in zip(
+                self.datetimes(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist(),
+            )
+        ]
@@ -0,0 +1,176 @@
+import os
+import json
+import shutil
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+from .bar_series import BarSeries
+
+# Lokasi default penyimpanan bar (bisa di-override lewat env BAR_STORE_DIR)
+DEFAULT_STORE_DIR = os.getenv("BAR_STORE_DIR", "bar_store")
+
+class BarStore:
+    """
+    Penyimpanan OHLCV persisten di disk.
+
+    Setiap symbol/interval disimpan sebagai folder versi (v1, v2, ...) berisi file
+    .npy per kolom BarSeries (timestamp int64 epoch detik UTC, open, high, low,
+    close, volume float64) plus meta.json. File CURRENT menunjuk ke versi aktif dan
+    diganti atomik (os.replace) setelah versi baru selesai ditulis, jadi reader
+    selalu melihat satu versi utuh. File dibuka dengan mmap sehingga cold start
+    tidak perlu membaca seluruh history ke memory dulu.
+    """
+
+    COLUMNS = ("open", "high", "low", "close", "volume")
+    POINTER = "CURRENT"
+    # Versi lama yang disimpan setelah publish (reader yang sedang membaca versi sebelumnya)
+    KEEP_VERSIONS = 2
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        # Lock per symbol/interval: merge memegangnya dari load sampai save
+        self._path_locks: Dict[str, threading.RLock] = {}
+
+    def _path(self, symbol: str, interval: str) -> str:
+        safe_symbol = "".join(c if c.isalnum() or c in ".-_" else "_" for c in symbol.upper())
+        return os.path.join(self.root, safe_symbol, interval)
+
+    def _path_lock(self, path: str) -> threading.RLock:
+        with self._lock:
+            lock = self._path_locks.get(path)
+            if lock is None:
+                lock = self._path_locks[path] = threading.RLock()
+            return lock
+
+    def _current_version(self, path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(path, self.POINTER), "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read_dir(self, path: str) -> Optional[Tuple[Dict[str, np.ndarray], dict]]:
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        arrays = {"timestamp": np.load(os.path.join(path, "timestamp.npy"), mmap_mode="r")}
+        for col in self.COLUMNS:
+            arrays[col] = np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r")
+
+        # Kolom harus sama panjang, kalau tidak anggap store rusak (misal write terputus)
+        rows = meta.get("rows")
+        if any(len(a) != rows for a in arrays.values()):
+            return None
+        return arrays, meta
+
+    def _read(self, symbol: str, interval: str) -> Optional[Tuple[Dict[str, np.ndarray], dict]]:
+        path = self._path(symbol, interval)
+        previous = None
+        while True:
+            version = self._current_version(path)
+            try:
+                if version is None:
+                    # Layout lama (kolom langsung di folder symbol/interval)
+                    return self._read_dir(path)
+                return self._read_dir(os.path.join(path, version))
+            except FileNotFoundError:
+                # Versi dihapus di antara baca pointer dan buka file: ulangi selama pointer bergeser
+                if version is None or version == previous:
+                    return None
+                previous = version
+            except Exception as e:
+                print(f"BarStore read failed {symbol} ({interval}): {e}")
+                return None
+
+    def load(self, symbol: str, interval: str) -> Optional[Tuple[BarSeries, dict]]:
+        """
+        Membaca bar tersimpan sebagai BarSeries (array tetap mmap, tanpa copy) beserta meta.
+        """
+        stored = self._read(symbol, interval)
+        if stored is None:
+            return None
+        arrays, meta = stored
+
+        series = BarSeries(
+            arrays["timestamp"],
+            *(arrays[col] for col in self.COLUMNS),
+            tz=meta.get("tz"),
+        )
+        return series, meta
+
+    def save(self, symbol: str, interval: str, series: BarSeries, since: int):
+        """
+        Menulis ulang seluruh bar untuk symbol/interval sebagai versi baru.
+        since: epoch detik sejak kapan data dianggap lengkap (tanpa gap).
+        """
+        path = self._path(symbol, interval)
+        arrays = {"timestamp": np.asarray(series.timestamp, dtype=np.int64)}
+        for col in self.COLUMNS:
+            arrays[col] = np.asarray(getattr(series, col), dtype=np.float64)
+
+        meta = {"tz": series.tz, "since": int(since), "rows": len(series)}
+
+        with self._path_lock(path):
+            os.makedirs(path, exist_ok=True)
+            current = self._current_version(path)
+            number = int(current[1:]) + 1 if current else 1
+            version = f"v{number}"
+            version_dir = os.path.join(path, version)
+            shutil.rmtree(version_dir, ignore_errors=True) # Sisa write yang terputus
+            os.makedirs(version_dir)
+            for name, arr in arrays.items():
+                np.save(os.path.join(version_dir, f"{name}.npy"), arr)
+            with open(os.path.join(version_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            # Publish: satu rename pointer, reader melihat versi lama atau baru secara utuh
+            tmp_pointer = os.path.join(path, f"{self.POINTER}.tmp")
+            with open(tmp_pointer, "w") as f:
+                f.write(version)
+            os.replace(tmp_pointer, os.path.join(path, self.POINTER))
+            self._cleanup(path, number)
+
+    def _cleanup(self, path: str, number: int):
+        # Hapus versi lama (kecuali KEEP_VERSIONS terakhir) dan file layout lama
+        for name in os.listdir(path):
+            full = os.path.join(path, name)
+            if name.startswith("v") and name[1:].isdigit():
+                if int(name[1:]) <= number - self.KEEP_VERSIONS:
+                    shutil.rmtree(full, ignore_errors=True)
+            elif name == "meta.json" or name.endswith(".npy"):
+                os.remove(full)
+
+    def merge(self, symbol: str, interval: str, new_series: BarSeries, since: Optional[int] = None) -> BarSeries:
+        """
+        Menggabungkan bar baru ke store (bar baru menang untuk timestamp yang sama).
+        Jika bar baru tidak bersambung dengan data lama (ada gap), data lama dibuang.
+        since: awal cakupan bar baru (untuk full fetch). None = tail fetch.
+        Load sampai save dijalankan di bawah lock symbol/interval, jadi dua merge
+        bersamaan (misal refresh dengan period berbeda) tidak saling menimpa.
+        """
+        with self._path_lock(self._path(symbol, interval)):
+            return self._merge(symbol, interval, new_series, since)
+
+    def _merge(self, symbol: str, interval: str, new_series: BarSeries, since: Optional[int]) -> BarSeries:
+        stored = self.load(symbol, interval)
+
+        if stored is not None and len(new_series) > 0:
+            old_series, meta = stored
+            if len(old_series) > 0 and old_series.timestamp[-1] >= new_series.timestamp[0]:
+                # Bersambung: gabung, ambil versi terbaru untuk bar yang overlap
+                merged = old_series.concat(new_series)
+                merged_since = meta["since"] if since is None else min(meta["since"], since)
+                self.save(symbol, interval, merged, merged_since)
+                return merged
+
+        if len(new_series) == 0:
+            return stored[0] if stored is not None else new_series
+
+        if since is None:
+            since = int(new_series.timestamp[0])
+        self.save(symbol, interval, new_series, since)
+        return new_series
+
+# Singleton instance
+bar_store = BarStore()
@@ -1,10 +1,50 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import yfinance as yf
-import requests
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from ..models.schemas import MarketData
+from .bar_series import BarSeries
+from .bar_cache import BarCache
+from .bar_store import bar_store
+from .single_flight import SingleFlight
+from .http_client import http_clients
+from .streaming import StreamManager
+from .resampler import resample, resample_base, session_for_symbol
+from .upstream import upstream, error_status, UpstreamError, UpstreamUnavailable
+
+# Batas lookback yfinance untuk interval intraday (tail fetch tidak bisa mundur lebih jauh)
+INTRADAY_MAX_LOOKBACK = {
+    "1m": pd.Timedelta(days=7),
+    "2m": pd.Timedelta(days=60),
+    "5m": pd.Timedelta(days=60),
+    "15m": pd.Timedelta(days=60),
+    "30m": pd.Timedelta(days=60),
+    "90m": pd.Timedelta(days=60),
+    "60m": pd.Timedelta(days=730),
+    "1h": pd.Timedelta(days=730),
+}
+
+# Penanda "since" untuk data period=max (cakupan penuh)
+MIN_SINCE = -(2**62)
+
+# Jumlah worker untuk refresh cache di background
+REFRESH_WORKERS = int(os.getenv("BAR_CACHE_REFRESH_WORKERS", "4"))
+
+# Base URL REST API Binance
+BINANCE_API = os.getenv("BINANCE_API", "https://api.binance.com")
+
+# Interval kline yang tersedia di stream Binance
+BINANCE_INTERVALS = {"1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d", "1w", "1M"}
+
+# Batas jumlah bar saat series base diambil untuk resampling (praktis tanpa batas)
+MAX_BARS = 10**9
+
+# Jumlah ticker per request batch (yf.download)
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "20"))
 
 class DataFetcher:
     """
@@ -12,9 +52,14 @@ class DataFetcher:
     """
     
     def __init__(self):
-        # Cache sederhana di memory: key = symbol_interval
-        self.cache: Dict[str, pd.DataFrame] = {}
-        self.last_fetch: Dict[str, datetime] = {}
+        # Cache LRU di memory: key = symbol_interval_period
+        self.cache = BarCache()
+        # Koalesensi fetch upstream per cache_key
+        self._single_flight = SingleFlight()
+        # Worker untuk refresh stale-while-revalidate
+        self._refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="bar-refresh")
+        # Feed live candle (satu subscription upstream per symbol/interval)
+        self.streams = StreamManager()
 
     def _map_symbol(self, symbol: str, source: str = "YAHOO") -> str:
         """
@@ -78,193 +123,531 @@ class DataFetcher:
             return "5y"
         return "1y" # Default
 
-    def get_historical_data(self, symbol: str, interval: str = "1d", limit: int = 300, source: str = "YAHOO", use_cache: bool = True, period: str = None) -> List[MarketData]:
-        yf_symbol = self._map_symbol(symbol, source)
-        cache_key = f"{yf_symbol}_{interval}_{period}"
-        
-        # Cek cache (valid selama 1 menit)
-        now = datetime.now()
-        if use_cache and cache_key in self.cache and cache_key in self.last_fetch:
-            if (now - self.last_fetch[cache_key]).total_seconds() < 60:
-                 # Return cached data (converted to list)
-                 data = self._df_to_marketdata(self.cache[cache_key].tail(limit))
-                 # Ensure timezone aware
-                 for d in data:
-                     if d.timestamp.tzinfo is None:
-                         d.timestamp = d.timestamp.replace(tzinfo=timezone.utc)
-                 return data
+    def _period_start(self, period: str, now: pd.Timestamp) -> Optional[pd.Timestamp]:
+        """
+        Menghitung awal window untuk period yfinance ("5d", "1mo", "1y", "ytd", "max").
+        None berarti tanpa batas (max).
+        """
+        period = period.lower()
+        if period == "max":
+            return None
+        if period == "ytd":
+            return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
 
-        try:
-            if not period:
-                period = self._get_period_for_interval(interval)
-            
+        amount = int("".join(c for c in period if c.isdigit()) or 1)
+        unit = period.lstrip("0123456789")
+        if unit == "d":
+            return now - pd.DateOffset(days=amount)
+        if unit == "wk":
+            return now - pd.DateOffset(weeks=amount)
+        if unit == "mo":
+            return now - pd.DateOffset(months=amount)
+        if unit == "y":
+            return now - pd.DateOffset(years=amount)
+        return now - pd.DateOffset(years=1)
+
+    def _fetch_with_store(self, yf_symbol: str, interval: str, period: str) -> BarSeries:
+        """
+        Mengambil bar via bar_store: jika store sudah mencakup window period, hanya bar
+        setelah timestamp terakhir yang diminta ke yfinance lalu di-merge. Jika belum,
+        lakukan full fetch seperti biasa.
+        """
+        now = pd.Timestamp.now(tz="UTC")
+        window_start = self._period_start(period, now)
+        stored = bar_store.load(yf_symbol, interval)
+
+        series = None
+        if stored is not None and len(stored[0]) > 0:
+            stored_series, meta = stored
+            last_ts = pd.Timestamp(int(stored_series.timestamp[-1]), unit="s", tz="UTC")
+            # Window period harus sudah tercakup, dan bar terakhir masih dalam batas lookback yfinance
+            if window_start is None:
+                covered = meta["since"] <= MIN_SINCE
+            else:
+                covered = meta["since"] <= window_start.timestamp()
+            max_lookback = INTRADAY_MAX_LOOKBACK.get(interval.lower())
+            reachable = max_lookback is None or (now - last_ts) < max_lookback
+
+            if covered and reachable:
+                try:
+                    # Mulai dari bar terakhir (inklusif) agar candle yang masih berjalan ikut ter-update
+                    tail = upstream.call("yahoo", lambda: yf.Ticker(yf_symbol).history(start=last_ts, interval=interval))
+                    series = bar_store.merge(yf_symbol, interval, BarSeries.from_dataframe(tail))
+                except Exception as e:
+                    # Upstream gagal: sajikan langsung dari disk
+                    print(f"Tail fetch failed {yf_symbol} ({interval}): {e}")
+                    upstream.host("yahoo").record_stale()
+                    series = stored_series
+
+        if series is None:
             ticker = yf.Ticker(yf_symbol)
             # Fetch data
-            df = ticker.history(period=period, interval=interval)
-            
+            try:
+                df = upstream.call("yahoo", lambda: ticker.history(period=period, interval=interval))
+            except Exception:
+                if stored is None or len(stored[0]) == 0:
+                    raise
+                # Store belum mencakup window penuh, tapi lebih baik daripada tidak ada data
+                upstream.host("yahoo").record_stale()
+                return self._trim_to_period(stored[0], period, window_start)
             if df.empty:
-                 # Fallback logic could be added here
-                 return []
+                return BarSeries.empty()
+
+            # from_dataframe juga membuang index duplikat (Date/Datetime)
+            since = MIN_SINCE if window_start is None else int(window_start.timestamp())
+            series = bar_store.merge(yf_symbol, interval, BarSeries.from_dataframe(df), since=since)
+
+        return self._trim_to_period(series, period, window_start)
+
+    def _trim_to_period(self, series: BarSeries, period: str, window_start: Optional[pd.Timestamp]) -> BarSeries:
+        """
+        Memotong bar dari store agar sesuai window period yang diminta.
+        Period harian ("1d", "5d") di yfinance berarti N hari bursa, bukan hari kalender.
+        """
+        if window_start is None or len(series) == 0:
+            return series
+
+        period = period.lower()
+        if period.endswith("d") and period[:-1].isdigit():
+            days = int(period[:-1])
+            dates = series.to_datetime_index().normalize()
+            keep_dates = dates.unique()[-days:]
+            return series[int(np.argmax(dates >= keep_dates[0])):]
 
-            # Update cache
-            # Remove duplicates based on index (Date/Datetime)
-            df = df[~df.index.duplicated(keep='last')]
+        start = np.searchsorted(series.timestamp, int(window_start.timestamp()), side="left")
+        return series[start:]
+
+    def _resample_base(self, interval: str, period: str) -> Optional[str]:
+        now = pd.Timestamp.now(tz="UTC")
+        window_start = self._period_start(period, now)
+        window = None if window_start is None else (now - window_start).total_seconds()
+        return resample_base(interval, window)
+
+    def _get_base_series(self, yf_symbol: str, base: str, period: str, use_cache: bool = True) -> BarSeries:
+        """
+        Series base untuk resampling, lewat cache + single-flight yang sama dengan fetch biasa.
+        use_cache=False: lewati cache dan ambil ulang base dari upstream/store.
+        """
+        base_key = f"{yf_symbol}_{base}_{period}"
+        if use_cache:
+            cached, is_stale = self.cache.get(base_key)
+            if cached is not None:
+                if is_stale:
+                    self._revalidate(base_key, yf_symbol, base, period)
+                return cached
+        return self._single_flight.do(base_key, lambda: self._refresh(base_key, yf_symbol, base, period))
+
+    def _refresh(self, cache_key: str, yf_symbol: str, interval: str, period: str, use_cache: bool = True) -> BarSeries:
+        base = self._resample_base(interval, period)
+        if base is None:
+            series = self._fetch_with_store(yf_symbol, interval, period)
+        else:
+            # Timeframe turunan: bangun dari series base yang lebih halus (satu feed upstream).
+            # Bucket terakhir yang belum lengkap tetap disertakan sebagai candle berjalan,
+            # sama seperti bar terakhir hasil download langsung yfinance.
+            base_series = self._get_base_series(yf_symbol, base, period, use_cache)
+            series = resample(base_series, interval, session_for_symbol(yf_symbol))
+        if len(series) > 0:
+            # TTL ikut interval base, karena candle terakhir berubah setiap base candle
+            self.cache.put(cache_key, series, base or interval)
+        return series
+
+    def _revalidate(self, cache_key: str, yf_symbol: str, interval: str, period: str):
+        """
+        Refresh entry cache yang sudah basi di background (stale-while-revalidate).
+        """
+        if self._single_flight.in_flight(cache_key):
+            return
+
+        def run():
+            try:
+                self._single_flight.do(cache_key, lambda: self._refresh(cache_key, yf_symbol, interval, period))
+            except Exception as e:
+                print(f"Background refresh failed {yf_symbol} ({interval}): {e}")
+
+        self._refresh_pool.submit(run)
+
+    def _merge_stream(self, yf_symbol: str, interval: str, series: BarSeries) -> BarSeries:
+        # Bar yang sudah close di feed streaming (jika ada) tapi belum masuk cache
+        return self.streams.merge_recent(f"{yf_symbol}_{interval}", series)
+
+    def get_historical_data(self, symbol: str, interval: str = "1d", limit: int = 300, source: str = "YAHOO", use_cache: bool = True, period: str = None) -> BarSeries:
+        yf_symbol = self._map_symbol(symbol, source)
+        fetch_period = period or self._get_period_for_interval(interval)
+        # Key memakai period efektif, jadi period default eksplisit berbagi entry dengan period=None
+        cache_key = f"{yf_symbol}_{interval}_{fetch_period}"
+        
+        # Cek cache (valid sampai candle berikutnya close)
+        if use_cache:
+            cached, is_stale = self.cache.get(cache_key)
+            if cached is not None:
+                if is_stale:
+                    # Sajikan data lama sekarang, refresh di background
+                    self._revalidate(cache_key, yf_symbol, interval, fetch_period)
+                return self._merge_stream(yf_symbol, interval, cached).tail(limit)
+
+        try:
+            # Request konkuren untuk cache_key yang sama menunggu satu fetch upstream yang sama
+            series = self._single_flight.do(cache_key, lambda: self._refresh(cache_key, yf_symbol, interval, fetch_period, use_cache))
             
-            self.cache[cache_key] = df
-            self.last_fetch[cache_key] = now
+            if len(series) == 0:
+                 # Fallback logic could be added here
+                 return series
             
-            data = self._df_to_marketdata(df.tail(limit))
-            # Ensure timezone aware
-            for d in data:
-                if d.timestamp.tzinfo is None:
-                    d.timestamp = d.timestamp.replace(tzinfo=timezone.utc)
-            return data
+            return self._merge_stream(yf_symbol, interval, series).tail(limit)
             
         except Exception as e:
             print(f"Error fetching {yf_symbol} ({interval}): {e}")
-            return []
+            # Upstream gagal / circuit open: sajikan entry cache lama jika masih ada
+            stale = self.cache.peek(cache_key)
+            if stale is not None:
+                upstream.host("yahoo").record_stale()
+                return stale.tail(limit)
+            # Bedakan "upstream sedang down / throttling" dari "simbol tidak ditemukan"
+            if isinstance(e, UpstreamUnavailable):
+                raise
+            status = error_status(e)
+            if status == 429 or (status is not None and status >= 500):
+                raise UpstreamUnavailable(str(e)) from e
+            return BarSeries.empty()
+
+    def _exchange_tz(self, yf_symbol: str) -> str:
+        """
+        Tebakan timezone bursa dari suffix ticker (dipakai saat bulk download
+        mengembalikan index UTC dan store belum punya info timezone).
+        """
+        if yf_symbol.endswith(".JK") or yf_symbol == "^JKSE":
+            return "Asia/Jakarta"
+        if yf_symbol.endswith("-USD"):
+            return "UTC"
+        return "America/New_York"
+
+    def _bulk_fetch(self, tickers: List[str], interval: str, period: str) -> Dict[str, BarSeries]:
+        """
+        Download satu chunk ticker sekaligus lewat yf.download lalu pecah per ticker
+        dan merge ke bar_store. Ticker yang store-nya sudah mencakup window cukup
+        diminta bar sejak timestamp terakhir (satu request tail untuk grup tersebut).
+        """
+        now = pd.Timestamp.now(tz="UTC")
+        window_start = self._period_start(period, now)
+        max_lookback = INTRADAY_MAX_LOOKBACK.get(interval.lower())
+
+        stored_meta = {}
+        tail_group, full_group = [], []
+        tail_start = None
+        for yf_symbol in tickers:
+            stored = bar_store.load(yf_symbol, interval)
+            if stored is not None and len(stored[0]) > 0:
+                stored_series, meta = stored
+                stored_meta[yf_symbol] = meta
+                last_ts = pd.Timestamp(int(stored_series.timestamp[-1]), unit="s", tz="UTC")
+                if window_start is None:
+                    covered = meta["since"] <= MIN_SINCE
+                else:
+                    covered = meta["since"] <= window_start.timestamp()
+                reachable = max_lookback is None or (now - last_ts) < max_lookback
+                if covered and reachable:
+                    tail_group.append(yf_symbol)
+                    tail_start = last_ts if tail_start is None else min(tail_start, last_ts)
+                    continue
+            full_group.append(yf_symbol)
+
+        results = {}
+        batches = []
+        if full_group:
+            since = MIN_SINCE if window_start is None else int(window_start.timestamp())
+            batches.append((full_group, {"period": period}, since))
+        if tail_group:
+            batches.append((tail_group, {"start": tail_start}, None))
+
+        for group, window, since in batches:
+            df = upstream.call("yahoo", lambda: yf.download(
+                group, interval=interval, group_by="ticker", auto_adjust=True,
+                ignore_tz=False, threads=True, progress=False, **window
+            ))
+            if df is None or df.empty:
+                continue
 
-    def get_latest_candle(self, symbol: str, interval: str = "1d", source: str = "YAHOO") -> Optional[MarketData]:
+            for yf_symbol in group:
+                if isinstance(df.columns, pd.MultiIndex):
+                    if yf_symbol not in df.columns.get_level_values(0):
+                        continue
+                    sub = df[yf_symbol]
+                else:
+                    sub = df
+                # Index gabungan semua ticker: buang baris milik ticker lain
+                sub = sub.dropna(subset=["Open", "High", "Low", "Close"])
+                if sub.empty:
+                    continue
+
+                series = BarSeries.from_dataframe(sub.fillna({"Volume": 0.0}))
+                # yf.download mengembalikan index UTC; kembalikan label timezone bursa
+                meta = stored_meta.get(yf_symbol)
+                series.tz = meta.get("tz") if meta and meta.get("tz") else self._exchange_tz(yf_symbol)
+
+                merged = bar_store.merge(yf_symbol, interval, series, since=since)
+                results[yf_symbol] = self._trim_to_period(merged, period, window_start)
+
+        return results
+
+    def get_bulk_historical_data(self, symbols: List[str], interval: str = "1d", limit: int = 300, source: str = "YAHOO", period: str = None, use_cache: bool = True) -> Dict[str, BarSeries]:
+        """
+        Versi batch dari get_historical_data untuk banyak simbol sekaligus.
+        Cache hit langsung dipakai; sisanya di-download per chunk (BULK_CHUNK_SIZE ticker
+        per request) dan hasilnya diisikan ke cache per simbol dengan key yang sama
+        seperti get_historical_data. Return: dict simbol input -> BarSeries.
+        use_cache=False: selalu ambil dari upstream (dipakai prefetcher untuk refresh).
+        """
+        fetch_period = period or self._get_period_for_interval(interval)
+        results: Dict[str, BarSeries] = {}
+        pending: Dict[str, List[tuple]] = {}
+
+        for sym in symbols:
+            yf_symbol = self._map_symbol(sym, source)
+            cache_key = f"{yf_symbol}_{interval}_{fetch_period}"
+            cached, is_stale = self.cache.get(cache_key) if use_cache else (None, False)
+            if cached is not None:
+                if is_stale:
+                    self._revalidate(cache_key, yf_symbol, interval, fetch_period)
+                results[sym] = cached.tail(limit)
+            else:
+                pending.setdefault(yf_symbol, []).append((sym, cache_key))
+
+        base = self._resample_base(interval, fetch_period)
+        if base is not None and pending:
+            # Timeframe turunan: bulk download interval base lalu resample per simbol
+            base_symbols = [sym for entries in pending.values() for sym, _ in entries]
+            base_results = self.get_bulk_historical_data(base_symbols, interval=base, limit=MAX_BARS, source=source, period=fetch_period, use_cache=use_cache)
+            for yf_symbol, entries in pending.items():
+                base_series = base_results.get(entries[0][0])
+                if not base_series:
+                    continue
+                series = resample(base_series, interval, session_for_symbol(yf_symbol))
+                for sym, cache_key in entries:
+                    self.cache.put(cache_key, series, base)
+                    results[sym] = series.tail(limit)
+            return results
+
+        tickers = list(pending)
+        for i in range(0, len(tickers), BULK_CHUNK_SIZE):
+            chunk = tickers[i:i + BULK_CHUNK_SIZE]
+            try:
+                fetched = self._bulk_fetch(chunk, interval, fetch_period)
+            except Exception as e:
+                # Batch gagal: fallback ke fetch per simbol
+                print(f"Bulk fetch failed ({interval}, {len(chunk)} tickers): {e}")
+                for yf_symbol in chunk:
+                    for sym, _ in pending[yf_symbol]:
+                        try:
+                            results[sym] = self.get_historical_data(sym, interval=interval, limit=limit, source=source, use_cache=use_cache, period=period)
+                        except UpstreamUnavailable:
+                            continue
+                continue
+
+            for yf_symbol, series in fetched.items():
+                for sym, cache_key in pending[yf_symbol]:
+                    self.cache.put(cache_key, series, interval)
+                    results[sym] = series.tail(limit)
+
+        return results
+
+    def _fetch_fast_info(self, yf_symbol: str, low_priority: bool = False) -> Optional[dict]:
+        """
+        Ambil snapshot realtime dari yfinance fast_info (blocking, jalankan di thread).
+        Ticker sengaja dibuat baru: fast_info di-cache per objek Ticker, jadi reuse
+        akan mengembalikan harga lama. Session HTTP yfinance sendiri sudah dipakai bersama.
+        low_priority: hanya memakai token rate limit sisa (polling live), lihat HostGuard.
+        """
+        def read():
+            ticker = yf.Ticker(yf_symbol)
+            # fast_info access is usually faster than history()
+            if not hasattr(ticker, 'fast_info') or 'last_price' not in ticker.fast_info:
+                return None
+            info = ticker.fast_info
+            current_price = info['last_price']
+            return {
+                "last_price": current_price,
+                "open": info.get('open', current_price),
+                "day_high": info.get('day_high', current_price),
+                "day_low": info.get('day_low', current_price),
+                "last_volume": info.get('last_volume', 0),
+            }
+        return upstream.call("yahoo", read, low_priority=low_priority)
+
+    def _binance_params(self, yf_symbol: str, interval: str) -> Tuple[str, str]:
+        # Map interval to Binance format
+        # Binance: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
+        binance_interval = interval
+        if interval == "1wk": binance_interval = "1w"
+        if interval == "1mo": binance_interval = "1M"
+        
+        binance_symbol = yf_symbol.replace("-USD", "USDT").replace("-", "").upper()
+        if not binance_symbol.endswith("USDT"):
+             binance_symbol += "USDT"
+        return binance_symbol, binance_interval
+
+    async def _binance_get(self, url: str, low_priority: bool = False):
+        """
+        GET ke Binance lewat governance upstream. 429/418/5xx dilempar sebagai UpstreamError
+        supaya memicu backoff dan circuit breaker.
+        """
+        async def request():
+            response = await http_clients.get().get(url)
+            if response.status_code in (418, 429) or response.status_code >= 500:
+                retry_after = response.headers.get("Retry-After")
+                raise UpstreamError(response.status_code, f"Binance HTTP {response.status_code}",
+                                    float(retry_after) if retry_after else None)
+            return response
+        return await upstream.acall("binance", request, low_priority=low_priority)
+
+    async def _get_binance_candle(self, yf_symbol: str, interval: str, low_priority: bool = False) -> Optional[MarketData]:
+        binance_symbol, binance_interval = self._binance_params(yf_symbol, interval)
+
+        # Fetch Kline (for Open, High, Low of the period)
+        url_kline = f"{BINANCE_API}/api/v3/klines?symbol={binance_symbol}&interval={binance_interval}&limit=1"
+        # Fetch Ticker Price (for absolute latest Close)
+        url_price = f"{BINANCE_API}/api/v3/ticker/price?symbol={binance_symbol}"
+        
+        # Kedua request independen: jalankan bersamaan di client yang sama (pooled, keep-alive)
+        r_kline, r_price = await asyncio.gather(self._binance_get(url_kline, low_priority),
+                                                self._binance_get(url_price, low_priority))
+        
+        if r_kline.status_code != 200 or r_price.status_code != 200:
+            return None
+
+        data = r_kline.json()
+        price_data = r_price.json()
+        if not data or len(data) == 0 or 'price' not in price_data:
+            return None
+
+        kline = data[0]
+        current_price = float(price_data['price'])
+        
+        # Binance kline: [Open Time, Open, High, Low, Close, Volume, Close Time, ...]
+        # Timestamp is ms. Use UTC to match Yahoo Finance Crypto (usually UTC)
+        ts = datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc)
+        
+        candle = MarketData(
+            timestamp=ts,
+            open=float(kline[1]),
+            high=float(kline[2]),
+            low=float(kline[3]),
+            close=current_price, # Use ticker price for latest close
+            volume=float(kline[5])
+        )
+        
+        # Adjust High/Low with latest price
+        if current_price > candle.high: candle.high = current_price
+        if current_price < candle.low: candle.low = current_price
+        return candle
+
+    async def get_latest_candle(self, symbol: str, interval: str = "1d", source: str = "YAHOO") -> Optional[MarketData]:
+        """
+        Candle terakhir untuk update realtime. Dibaca dari feed streaming di memory;
+        request pertama untuk symbol/interval memulai feed dan memakai jalur REST.
+        """
+        yf_symbol = self._map_symbol(symbol, source)
+        key = f"{yf_symbol}_{interval}"
+
+        candle = self.streams.latest(key)
+        if candle is not None:
+            return candle
+
+        is_crypto = "-USD" in yf_symbol or source in ["BINANCE", "COINGECKO"]
+        ws_stream = None
+        if is_crypto:
+            binance_symbol, binance_interval = self._binance_params(yf_symbol, interval)
+            if binance_interval in BINANCE_INTERVALS:
+                ws_stream = f"{binance_symbol.lower()}@kline_{binance_interval}"
+
+        self.streams.subscribe(
+            key,
+            lambda: self._fetch_latest_candle_rest(symbol, interval=interval, source=source, background=True),
+            ws_stream=ws_stream,
+        )
+        return await self._fetch_latest_candle_rest(symbol, interval=interval, source=source)
+
+    async def _fetch_latest_candle_rest(self, symbol: str, interval: str = "1d", source: str = "YAHOO",
+                                        background: bool = False) -> Optional[MarketData]:
+        # background=True (poller streaming): request realtime memakai prioritas rendah dan
+        # UpstreamUnavailable dilempar ke poller (yang lalu memperlambat polling feed ini)
         # Try Binance for Crypto first (Faster & Reliable)
         yf_symbol = self._map_symbol(symbol, source)
         is_crypto = "-USD" in yf_symbol or source in ["BINANCE", "COINGECKO"]
         
         if is_crypto:
             try:
-                # Map interval to Binance format
-                # Binance: 1m, 3m, 5m, 15m, 30m, 1h, 2h, 4h, 6h, 8h, 12h, 1d, 3d, 1w, 1M
-                binance_interval = interval
-                if interval == "1wk": binance_interval = "1w"
-                if interval == "1mo": binance_interval = "1M"
-                
-                binance_symbol = yf_symbol.replace("-USD", "USDT").replace("-", "").upper()
-                if not binance_symbol.endswith("USDT"):
-                     binance_symbol += "USDT"
-
-                # Fetch Kline (for Open, High, Low of the period)
-                url_kline = f"https://api.binance.com/api/v3/klines?symbol={binance_symbol}&interval={binance_interval}&limit=1"
-                # Fetch Ticker Price (for absolute latest Close)
-                url_price = f"https://api.binance.com/api/v3/ticker/price?symbol={binance_symbol}"
-                
-                print(f"DEBUG: Fetching Binance {url_kline}")
-                r_kline = requests.get(url_kline, timeout=2)
-                r_price = requests.get(url_price, timeout=2)
-                
-                if r_kline.status_code == 200 and r_price.status_code == 200:
-                    data = r_kline.json()
-                    price_data = r_price.json()
-                    
-                    if data and len(data) > 0 and 'price' in price_data:
-                        kline = data[0]
-                        current_price = float(price_data['price'])
-                        
-                        # Binance kline: [Open Time, Open, High, Low, Close, Volume, Close Time, ...]
-                        # Timestamp is ms. Use UTC to match Yahoo Finance Crypto (usually UTC)
-                        ts = datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc)
-                        
-                        candle = MarketData(
-                            timestamp=ts,
-                            open=float(kline[1]),
-                            high=float(kline[2]),
-                            low=float(kline[3]),
-                            close=current_price, # Use ticker price for latest close
-                            volume=float(kline[5])
-                        )
-                        
-                        # Adjust High/Low with latest price
-                        if current_price > candle.high: candle.high = current_price
-                        if current_price < candle.low: candle.low = current_price
-                        
-                        print(f"DEBUG: Binance Success {symbol} {candle.close}")
-                        return candle
+                candle = await self._get_binance_candle(yf_symbol, interval, low_priority=background)
+                if candle:
+                    return candle
             except Exception as e:
+                if background and isinstance(e, UpstreamUnavailable):
+                    raise
                 print(f"Binance fetch failed: {e}")
                 pass
 
         # Fallback to Yahoo Finance (Historical + Fast Info)
         # We use cache for history but we need latest price.
         # Fetching history every second is bad. 
-        # Strategy: Get history (cached 60s) + Get Fast Info (Realtime)
+        # Strategy: Get history (cached) + Get Fast Info (Realtime), both concurrently
         
         # 1. Get Base Candle from History (Cached)
         # If we rely solely on cache, we might get stale data if fast_info fails.
         # But for 'latest', maybe we should try to refresh if cache is old?
         # For now keep use_cache=True to avoid rate limits.
-        base_data = self.get_historical_data(symbol, interval=interval, limit=1, source=source, use_cache=True)
-        if not base_data:
+        # 2. Realtime Price (Fast Info) diambil paralel dengan history
+        base_data, fast_info = await asyncio.gather(
+            asyncio.to_thread(self.get_historical_data, symbol, interval=interval, limit=1, source=source, use_cache=True),
+            asyncio.to_thread(self._fetch_fast_info, yf_symbol, background),
+            return_exceptions=True,
+        )
+        if isinstance(base_data, BaseException) or not base_data:
             return None
             
-        candle = base_data[-1]
+        if background and isinstance(fast_info, UpstreamUnavailable):
+            # Jangan timpa candle live dengan close dari cache; poller akan mencoba lagi
+            raise fast_info
+
+        candle = base_data.candle(-1)
         
-        # 2. Update with Realtime Price if available (Fast Info)
-        try:
-             ticker = yf.Ticker(yf_symbol)
-             # fast_info access is usually faster than history()
-             if hasattr(ticker, 'fast_info') and 'last_price' in ticker.fast_info:
-                current_price = ticker.fast_info['last_price']
-                
-                # Check for new day (Daily candle only)
-                is_new_day = False
-                if interval == '1d':
-                     last_date = candle.timestamp.date()
-                     today_date = datetime.now().date()
-                     if last_date < today_date:
-                         is_new_day = True
-
-                if is_new_day:
-                    # Create new candle for today
-                    print(f"DEBUG: Creating new daily candle for {symbol}")
-                    new_candle = MarketData(
-                        timestamp=datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
-                        open=ticker.fast_info.get('open', current_price),
-                        high=ticker.fast_info.get('day_high', current_price),
-                        low=ticker.fast_info.get('day_low', current_price),
-                        close=current_price,
-                        volume=ticker.fast_info.get('last_volume', 0)
-                    )
-                    return new_candle
-
-                if current_price and current_price > 0:
-                    print(f"DEBUG: Yahoo FastInfo {symbol} Old:{candle.close} New:{current_price}")
-                    candle.close = current_price
-                    # Update High/Low
-                    if current_price > candle.high: candle.high = current_price
-                    if current_price < candle.low: candle.low = current_price
-                    # Note: We keep the timestamp from history to avoid "oldest data" error
-                    # Make sure timestamp is timezone-aware UTC
-                    if candle.timestamp.tzinfo is None:
-                        candle.timestamp = candle.timestamp.replace(tzinfo=timezone.utc)
-        except Exception as e:
-            # print(f"DEBUG: Yahoo FastInfo Failed {e}")
-            pass
-            
-        return candle
+        # Update with Realtime Price if available
+        if isinstance(fast_info, BaseException) or fast_info is None:
+            # print(f"DEBUG: Yahoo FastInfo Failed {fast_info}")
+            return candle
 
-    def _df_to_marketdata(self, df: pd.DataFrame) -> List[MarketData]:
-        results = []
-        # Reset index to get Date/Datetime column
-        df = df.reset_index()
+        current_price = fast_info['last_price']
         
-        for _, row in df.iterrows():
-            # YFinance date column name varies ('Date' or 'Datetime')
-            ts = row.get('Datetime') or row.get('Date')
-            
-            # Ensure timestamp is datetime object
-            if isinstance(ts, pd.Timestamp):
-                ts = ts.to_pydatetime()
-            
-            # YF sometimes has timezone info, we might want to normalize or keep it
-            # Pydantic handles datetime, but frontend expects ISO string usually
+        # Check for new day (Daily candle only)
+        is_new_day = False
+        if interval == '1d':
+             last_date = candle.timestamp.date()
+             today_date = datetime.now().date()
+             if last_date < today_date:
+                 is_new_day = True
+
+        if is_new_day:
+            # Create new candle for today
+            new_candle = MarketData(
+                timestamp=datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0),
+                open=fast_info['open'],
+                high=fast_info['day_high'],
+                low=fast_info['day_low'],
+                close=current_price,
+                volume=fast_info['last_volume']
+            )
+            return new_candle
+
+        if current_price and current_price > 0:
+            candle.close = current_price
+            # Update High/Low
+            if current_price > candle.high: candle.high = current_price
+            if current_price < candle.low: candle.low = current_price
+            # Note: We keep the timestamp from history to avoid "oldest data" error
+            # Make sure timestamp is timezone-aware UTC
+            if candle.timestamp.tzinfo is None:
+                candle.timestamp = candle.timestamp.replace(tzinfo=timezone.utc)
             
-            results.append(MarketData(
-                timestamp=ts,
-                open=row['Open'],
-                high=row['High'],
-                low=row['Low'],
-                close=row['Close'],
-                volume=row['Volume']
-            ))
-        return results
+        return candle
 
 # Singleton instance
 fetcher = DataFetcher()
\ No newline at end of file
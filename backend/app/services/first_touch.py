@@ -0,0 +1,77 @@
+import numpy as np
+from .bar_series import BarSeries
+from .indicator_cache import cached
+
+# Pencarian "first touch" untuk simulasi trade: index bar pertama (>= start) yang
+# high-nya mencapai level / low-nya turun ke level, untuk banyak trade sekaligus.
+# Sparse table max (O(n log n), di-cache per series) + binary lifting: setiap
+# query O(log n) dan semua query dijalankan bersamaan sebagai operasi array.
+
+# Status hasil simulate_exits
+OPEN, WIN, LOSS = 0, 1, -1
+
+def sparse_max(values: np.ndarray) -> np.ndarray:
+    """
+    table[k, i] = max(values[i : i + 2^k]) (dipotong di akhir array). NaN diabaikan.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    levels = max(1, int(n).bit_length())
+    table = np.full((levels, n), np.nan)
+    table[0] = values
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        table[k] = table[k - 1]
+        table[k, :n - half] = np.fmax(table[k - 1, :n - half], table[k - 1, half:])
+    return table
+
+def high_table(data: BarSeries) -> np.ndarray:
+    return sparse_max(data.high)
+
+def neg_low_table(data: BarSeries) -> np.ndarray:
+    # min(low) <= level  <=>  max(-low) >= -level
+    return sparse_max(-np.asarray(data.low, dtype=np.float64))
+
+def first_at_least(table: np.ndarray, start, level) -> np.ndarray:
+    """
+    Index pertama i >= start dengan values[i] >= level (n jika tidak ada), per elemen.
+    """
+    n = table.shape[1]
+    pos = np.asarray(start, dtype=np.int64).copy()
+    level = np.asarray(level, dtype=np.float64)
+    if n == 0:
+        return np.zeros_like(pos)
+    pos, level = np.broadcast_arrays(pos, level)
+    pos = pos.copy()
+    # Lompati blok 2^k yang max-nya masih < level (NaN = belum tersentuh)
+    for k in range(table.shape[0] - 1, -1, -1):
+        step = 1 << k
+        fits = pos + step <= n
+        block = table[k, np.minimum(pos, n - 1)]
+        skip = fits & ~(block >= level)
+        pos = np.where(skip, pos + step, pos)
+    touched = (pos < n) & (table[0, np.minimum(pos, n - 1)] >= level)
+    return np.where(touched, pos, n)
+
+def first_high_at_or_above(data: BarSeries, start, level) -> np.ndarray:
+    return first_at_least(cached(high_table, data), start, level)
+
+def first_low_at_or_below(data: BarSeries, start, level) -> np.ndarray:
+    return first_at_least(cached(neg_low_table, data), start, -np.asarray(level, dtype=np.float64))
+
+def simulate_exits(data: BarSeries, start, sl, tp, long=True):
+    """
+    Exit bracket SL/TP mulai bar `start` untuk banyak trade sekaligus.
+    Return (exit_index, status): status WIN/LOSS, atau OPEN (exit_index = n) jika
+    belum tersentuh. Konservatif: jika SL dan TP tersentuh di bar yang sama, SL dulu.
+    """
+    long = np.broadcast_to(np.asarray(long, dtype=bool), np.shape(start))
+    sl = np.asarray(sl, dtype=np.float64)
+    tp = np.asarray(tp, dtype=np.float64)
+    # LONG: SL = low turun ke sl, TP = high naik ke tp; SHORT kebalikannya
+    stop = np.where(long, first_low_at_or_below(data, start, sl), first_high_at_or_above(data, start, sl))
+    target = np.where(long, first_high_at_or_above(data, start, tp), first_low_at_or_below(data, start, tp))
+    n = len(data)
+    status = np.where(stop <= target, np.where(stop < n, LOSS, OPEN), WIN)
+    exit_index = np.minimum(stop, target)
+    return exit_index, status
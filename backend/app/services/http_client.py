@@ -0,0 +1,49 @@
+import os
+import asyncio
+from typing import Optional
+import httpx
+
+# Konfigurasi pool koneksi upstream (bisa di-override lewat env)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "2"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+class HttpClients:
+    """
+    Pengelola httpx.AsyncClient bersama untuk semua request upstream (Binance, dll).
+
+    Satu client dengan connection pool + keep-alive dipakai ulang antar request,
+    jadi polling tiap detik tidak membayar TCP/TLS handshake berulang.
+    Client dibuat lazy di event loop yang sedang berjalan dan ditutup saat shutdown.
+    """
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 max_connections: int = HTTP_MAX_CONNECTIONS, max_keepalive: int = HTTP_MAX_KEEPALIVE,
+                 keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        # Client terikat ke event loop; buat ulang jika loop berganti (misal saat test)
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+# Singleton instance
+http_clients = HttpClients()
@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+import numpy as np
+from .bar_series import BarSeries
+from .single_flight import SingleFlight
+
+# Jumlah maksimum hasil indikator yang disimpan (bisa di-override lewat env)
+INDICATOR_CACHE_SIZE = int(os.getenv("INDICATOR_CACHE_SIZE", "1024"))
+
+def _freeze(value: Any) -> Any:
+    # Hasil dibagi antar pemanggil: kunci array agar tidak bisa diubah in-place
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for v in value:
+            _freeze(v)
+    return value
+
+class IndicatorCache:
+    """
+    Memoization hasil indikator per (fingerprint series, indikator, parameter).
+
+    Fingerprint = nomor series asal + rentang bar (BarSeries.fingerprint), jadi
+    strategi berbeda yang membaca series cache yang sama berbagi satu hasil.
+    LRU dengan batas jumlah entry; perhitungan konkuren untuk key yang sama
+    digabung lewat SingleFlight sehingga satu indikator tidak dihitung dua kali.
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fn: Callable[..., Any], data: BarSeries, *params) -> Any:
+        key = (data.fingerprint, fn.__module__, fn.__name__, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        return self._single_flight.do(repr(key), lambda: self._compute(key, fn, data, params))
+
+    def _compute(self, key: tuple, fn: Callable[..., Any], data: BarSeries, params: tuple) -> Any:
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        value = _freeze(fn(data, *params))
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Singleton instance
+indicator_cache = IndicatorCache()
+
+def cached(fn: Callable[..., Any], data: BarSeries, *params) -> Any:
+    """
+    Hitung fn(data, *params) lewat indicator_cache, misal cached(indicators.atr, data, 14).
+    Array hasil bersifat read-only.
+    """
+    return indicator_cache.get(fn, data, *params)
@@ -0,0 +1,274 @@
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+from .bar_series import BarSeries
+
+# Versi streaming dari indikator di indicators.py: satu bar diproses O(1) terhadap
+# panjang histori (indikator berbasis window memakai O(period) untuk window-nya).
+#
+# update(bar) memproses bar yang sudah close dan mengembalikan nilai indikator
+# di bar tersebut, sama dengan nilai batch pada index yang sama (termasuk 0
+# selama warmup). State Wilder (ATR, RSI, DMI) berjalan per bar sedangkan versi
+# batch memakai filter bentuk tertutup, jadi keduanya sama sampai pembulatan. peek(bar) menghitung nilai untuk candle yang masih berjalan
+# tanpa mengubah state. snapshot()/restore() menyimpan state sebagai dict biasa.
+#
+# `bar` cukup punya atribut high, low, close, volume (MarketData atau sejenisnya).
+
+class IndicatorState:
+    # Nama field state yang disimpan oleh snapshot(); deque disimpan sebagai list
+    _fields: Tuple[str, ...] = ()
+    _deques: Tuple[str, ...] = ()
+
+    def __init__(self, period: int):
+        self.period = period
+        self.count = 0
+
+    def update(self, bar) -> Any:
+        return self._step(bar.high, bar.low, bar.close, bar.volume)
+
+    def peek(self, bar) -> Any:
+        saved = self.snapshot()
+        try:
+            return self.update(bar)
+        finally:
+            self.restore(saved)
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = {"period": self.period, "count": self.count}
+        for name in self._fields:
+            state[name] = getattr(self, name)
+        for name in self._deques:
+            state[name] = list(getattr(self, name))
+        return state
+
+    def restore(self, state: Dict[str, Any]):
+        self.period = state["period"]
+        self.count = state["count"]
+        for name in self._fields:
+            setattr(self, name, state[name])
+        for name in self._deques:
+            setattr(self, name, deque(state[name], maxlen=getattr(self, name).maxlen))
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any]) -> "IndicatorState":
+        obj = cls(state["period"])
+        obj.restore(state)
+        return obj
+
+    @classmethod
+    def from_series(cls, data: BarSeries, period: int) -> "IndicatorState":
+        """
+        Warmup dari histori (sekali O(n)); setelah itu cukup update() per bar baru.
+        """
+        obj = cls(period)
+        for bar in zip(data.high.tolist(), data.low.tolist(), data.close.tolist(), data.volume.tolist()):
+            obj._step(*bar)
+        return obj
+
+    def _step(self, high: float, low: float, close: float, volume: float) -> Any:
+        raise NotImplementedError
+
+class AtrState(IndicatorState):
+    """
+    ATR: rata-rata TR period pertama, lalu smoothing Wilder (indicators.atr).
+    """
+    _fields = ("prev_close", "value")
+    _deques = ("warmup",)
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.prev_close: Optional[float] = None
+        self.value = 0.0
+        self.warmup = deque(maxlen=period)
+
+    def _step(self, high, low, close, volume) -> float:
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            self.warmup.append(tr)
+            return 0.0
+        if self.count == self.period:
+            self.warmup.append(tr)
+            self.value = sum(self.warmup) / self.period
+            self.warmup.clear()
+        else:
+            self.value = ((self.value * (self.period - 1)) + tr) / self.period
+        return self.value
+
+class RsiState(IndicatorState):
+    """
+    RSI Wilder (indicators.rsi).
+    """
+    _fields = ("prev_close", "avg_gain", "avg_loss")
+    _deques = ("gains", "losses")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+
+    def _step(self, high, low, close, volume) -> float:
+        prev, self.prev_close = self.prev_close, close
+        self.count += 1
+        if prev is None:
+            return 0.0
+        diff = close - prev
+        gain, loss = max(diff, 0), max(-diff, 0)
+        changes = self.count - 1
+
+        if changes <= self.period:
+            self.gains.append(gain)
+            self.losses.append(loss)
+            if changes < self.period:
+                return 0.0
+            # RSI pertama: rata-rata biasa dari `period` perubahan pertama
+            self.avg_gain = sum(self.gains) / self.period
+            self.avg_loss = sum(self.losses) / self.period
+            self.gains.clear()
+            self.losses.clear()
+            return self._rsi()
+
+        self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+        self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return self._rsi()
+
+    def _rsi(self) -> float:
+        if self.avg_loss == 0:
+            return 100.0
+        rs = self.avg_gain / self.avg_loss
+        return 100.0 - (100.0 / (1.0 + rs))
+
+class MfiState(IndicatorState):
+    """
+    Money Flow Index (indicators.mfi). Window flow disimpan di deque ukuran period.
+    """
+    _fields = ("prev_tp",)
+    _deques = ("positive", "negative")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.prev_tp: Optional[float] = None
+        self.positive = deque(maxlen=period)
+        self.negative = deque(maxlen=period)
+
+    def _step(self, high, low, close, volume) -> float:
+        tp = (high + low + close) / 3.0
+        prev, self.prev_tp = self.prev_tp, tp
+        self.count += 1
+        if prev is None:
+            return 0.0
+        flow = tp * volume
+        if tp > prev:
+            self.positive.append(flow)
+            self.negative.append(0.0)
+        else:
+            self.positive.append(0.0)
+            self.negative.append(flow)
+        if len(self.positive) < self.period:
+            return 0.0
+
+        pos_sum = sum(self.positive)
+        neg_sum = sum(self.negative)
+        if neg_sum == 0:
+            return 100.0
+        return 100.0 - (100.0 / (1.0 + pos_sum / neg_sum))
+
+class CciState(IndicatorState):
+    """
+    Commodity Channel Index dengan mean deviation (indicators.cci).
+    """
+    _deques = ("window",)
+
+    def __init__(self, period: int = 20):
+        super().__init__(period)
+        self.window = deque(maxlen=period)
+
+    def _step(self, high, low, close, volume) -> float:
+        tp = (high + low + close) / 3.0
+        self.window.append(tp)
+        self.count += 1
+        if len(self.window) < self.period:
+            return 0.0
+        mean = sum(self.window) / self.period
+        md = sum([abs(x - mean) for x in self.window]) / self.period
+        if md == 0:
+            return 0.0
+        return (tp - mean) / (0.015 * md)
+
+class DmiState(IndicatorState):
+    """
+    +DI, -DI dan ADX Wilder (indicators.dmi). update() mengembalikan (plus_di, minus_di, adx).
+    """
+    _fields = ("prev_high", "prev_low", "prev_close", "tr_smooth", "plus_smooth", "minus_smooth", "adx", "dx_count")
+    _deques = ("tr_warmup", "plus_warmup", "minus_warmup", "dx_warmup")
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self.prev_high: Optional[float] = None
+        self.prev_low: Optional[float] = None
+        self.prev_close: Optional[float] = None
+        self.tr_smooth = 0.0
+        self.plus_smooth = 0.0
+        self.minus_smooth = 0.0
+        self.adx = 0.0
+        self.dx_count = 0
+        self.tr_warmup = deque(maxlen=period)
+        self.plus_warmup = deque(maxlen=period)
+        self.minus_warmup = deque(maxlen=period)
+        self.dx_warmup = deque(maxlen=period)
+
+    def _step(self, high, low, close, volume) -> Tuple[float, float, float]:
+        prev_high, prev_low, prev_close = self.prev_high, self.prev_low, self.prev_close
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.count += 1
+        if prev_close is None:
+            return 0.0, 0.0, 0.0
+
+        period = self.period
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        up_move = high - prev_high
+        down_move = prev_low - low
+        plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+        minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+
+        moves = self.count - 1
+        if moves <= period:
+            self.tr_warmup.append(tr)
+            self.plus_warmup.append(plus_dm)
+            self.minus_warmup.append(minus_dm)
+            if moves == period:
+                # Nilai awal smoothing: jumlah biasa `period` bar pertama (belum ada output)
+                self.tr_smooth = sum(self.tr_warmup)
+                self.plus_smooth = sum(self.plus_warmup)
+                self.minus_smooth = sum(self.minus_warmup)
+                self.tr_warmup.clear()
+                self.plus_warmup.clear()
+                self.minus_warmup.clear()
+            return 0.0, 0.0, 0.0
+
+        self.tr_smooth = self.tr_smooth - (self.tr_smooth / period) + tr
+        self.plus_smooth = self.plus_smooth - (self.plus_smooth / period) + plus_dm
+        self.minus_smooth = self.minus_smooth - (self.minus_smooth / period) + minus_dm
+
+        p_di = 100 * (self.plus_smooth / self.tr_smooth) if self.tr_smooth != 0 else 0.0
+        m_di = 100 * (self.minus_smooth / self.tr_smooth) if self.tr_smooth != 0 else 0.0
+        dx = 100 * abs(p_di - m_di) / (p_di + m_di) if (p_di + m_di) != 0 else 0.0
+
+        self.dx_count += 1
+        if self.dx_count < period:
+            self.dx_warmup.append(dx)
+            return p_di, m_di, 0.0
+        if self.dx_count == period:
+            self.dx_warmup.append(dx)
+            self.adx = sum(self.dx_warmup) / period
+            self.dx_warmup.clear()
+        else:
+            self.adx = ((self.adx * (period - 1)) + dx) / period
+        return p_di, m_di, self.adx
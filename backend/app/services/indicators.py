@@ -0,0 +1,304 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+import numpy as np
+from .bar_series import BarSeries
+from .indicator_cache import cached
+
+# Indikator teknikal versi NumPy.
+#
+# Hasilnya identik (bit-per-bit) dengan helper lama di strategies/aura.py dan
+# strategies/utils.py, termasuk padding 0 di awal. Karena itu jumlah window
+# tidak memakai cumsum (selisih cumsum punya error pembulatan berbeda), tapi
+# dijumlah kolom per kolom dari kiri ke kanan seperti sum() Python: O(n*period)
+# operasi vektor, bukan O(n*period) operasi Python. Rekursi Wilder (ATR, RSI,
+# DMI/ADX) dihitung sebagai filter rekursif bentuk tertutup per chunk, sehingga
+# hasilnya sama sampai pembulatan (selisih relatif ~1e-15), bukan bit-per-bit.
+# True range dan typical price diambil lewat indicator_cache, jadi ATR/DMI dan
+# MFI/CCI pada series yang sama berbagi satu perhitungan.
+
+def rolling_sum(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Jumlah setiap window `period` (window ke-k = values[k:k+period]), dijumlah
+    berurutan seperti sum(). Panjang hasil: len(values) - period + 1.
+    """
+    n = len(values) - period + 1
+    acc = np.zeros(max(n, 0))
+    if n <= 0:
+        return acc
+    for k in range(period):
+        acc += values[k:k + n]
+    return acc
+
+def _rolling_extreme(values: np.ndarray, window: int, ufunc: np.ufunc, fill: float) -> np.ndarray:
+    # Van Herk / Gil-Werman: prefix & suffix ekstrem per blok ukuran window,
+    # setiap window = gabungan suffix satu blok dan prefix blok berikutnya. O(n) berapapun window.
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window <= 0 or n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, fill)
+    padded[:n] = values
+    grid = padded.reshape(blocks, window)
+    prefix = ufunc.accumulate(grid, axis=1).ravel()
+    suffix = ufunc.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    starts = np.arange(n - window + 1)
+    out[window - 1:] = ufunc(suffix[starts], prefix[starts + window - 1])
+    return out
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Nilai maksimum window yang berakhir di setiap bar (values[i-window+1..i]).
+    Index < window-1 berisi NaN.
+    """
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Nilai minimum window yang berakhir di setiap bar. Index < window-1 berisi NaN.
+    """
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+def _sum(values: np.ndarray) -> float:
+    # Jumlah berurutan satu array (sama dengan sum() Python)
+    return float(sum(values.tolist()))
+
+# Panjang chunk filter rekursif: a^-chunk <= e^300, jauh dari overflow float64
+_FILTER_LOG_RANGE = 300.0
+
+@lru_cache(maxsize=64)
+def _filter_powers(a: float, chunk: int) -> Tuple[np.ndarray, np.ndarray]:
+    # a^j dan a^-j untuk j = 1..chunk (dipakai ulang antar panggilan dengan period sama)
+    powers = a ** np.arange(1, chunk + 1)
+    inverse = 1 / powers
+    powers.flags.writeable = False
+    inverse.flags.writeable = False
+    return powers, inverse
+
+def _linear_filter(first, values: np.ndarray, a: float, b: float) -> np.ndarray:
+    """
+    Rekursi y_t = a * y_{t-1} + b * x_t (0 <= a < 1) dimulai dari `first`, tanpa loop per bar.
+    Per chunk: y_{s+j} = a^j * (y_s + b * cumsum(x_{s+i} / a^i)), nilai akhir chunk
+    menjadi nilai awal chunk berikutnya. Hasil: [first, y_1, ..., y_len(values)].
+    `values` boleh 2D (satu series per baris, `first` per baris) supaya beberapa
+    series dengan period sama dihitung sekaligus.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lead, n = values.shape[:-1], values.shape[-1]
+    y = np.asarray(first, dtype=np.float64)[..., None]
+    out = np.empty(lead + (n + 1,))
+    out[..., :1] = y
+    if n == 0:
+        return out
+    if a == 0:
+        out[..., 1:] = b * values
+        return out
+    chunk = max(1, min(n, int(_FILTER_LOG_RANGE / -np.log(a))))
+    powers, inverse = _filter_powers(a, chunk)
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        # y_{s+j} = a^j * (y_s + b * cumsum(x / a^i)), ditulis langsung ke output
+        block = out[..., start + 1:stop + 1]
+        np.multiply(values[..., start:stop], inverse[:stop - start], out=block)
+        np.cumsum(block, axis=-1, out=block)
+        if b != 1.0:
+            block *= b
+        block += y
+        block *= powers[:stop - start]
+        y = block[..., -1:]
+    return out
+
+def wilder(first, values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Smoothing Wilder: y = (y_prev * (period - 1) + x) / period, dimulai dari `first`.
+    Hasil: [first, y_1, ..., y_len(values)] (per baris jika values 2D).
+    """
+    return _linear_filter(first, values, (period - 1) / period, 1 / period)
+
+def _wilder_sum(first, values: np.ndarray, period: int) -> np.ndarray:
+    # Varian jumlah ter-smooth (DMI): s = s - s / period + x
+    return _linear_filter(first, values, 1 - 1 / period, 1.0)
+
+def _safe_div(num: np.ndarray, den: np.ndarray, scale: float = 1.0, default: float = 0.0) -> np.ndarray:
+    # scale * (num / den), atau default jika den == 0
+    mask = den != 0
+    if mask.all():
+        out = num / den
+        if scale != 1.0:
+            out *= scale
+        return out
+    out = np.full(np.shape(num), default, dtype=np.float64)
+    np.divide(num, den, out=out, where=mask)
+    if scale != 1.0:
+        np.multiply(out, scale, out=out, where=mask)
+    return out
+
+def _ratio_index(pos: np.ndarray, neg: np.ndarray) -> np.ndarray:
+    # 100 - 100 / (1 + pos/neg), 100 jika neg == 0 (dipakai RSI dan MFI)
+    out = np.full(len(pos), 100.0)
+    mask = neg != 0
+    out[mask] = 100.0 - (100.0 / (1.0 + pos[mask] / neg[mask]))
+    return out
+
+def typical_price(data: BarSeries) -> np.ndarray:
+    return (data.high + data.low + data.close) / 3.0
+
+def true_range(data: BarSeries) -> np.ndarray:
+    """
+    True range per bar; bar pertama memakai high - low.
+    """
+    high, low, close = data.high, data.low, data.close
+    tr = high - low
+    if len(tr) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum(np.maximum(tr[1:], np.abs(high[1:] - prev_close)), np.abs(low[1:] - prev_close))
+    return tr
+
+def gap_up(data: BarSeries) -> np.ndarray:
+    """
+    Mask gap naik tiga candle: low[i] > high[i-2] (dipakai FVG dan RBD). Index < 2 False.
+    """
+    mask = np.zeros(len(data), dtype=bool)
+    if len(data) >= 3:
+        mask[2:] = data.low[2:] > data.high[:-2]
+    return mask
+
+def gap_down(data: BarSeries) -> np.ndarray:
+    """
+    Mask gap turun tiga candle: high[i] < low[i-2]. Index < 2 False.
+    """
+    mask = np.zeros(len(data), dtype=bool)
+    if len(data) >= 3:
+        mask[2:] = data.high[2:] < data.low[:-2]
+    return mask
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.zeros(len(values))
+    if len(values) >= period:
+        out[period - 1:] = rolling_sum(values, period) / period
+    return out
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.zeros(0)
+    multiplier = 2 / (period + 1)
+    prev = float(values[0])
+    out = [prev]
+    append = out.append
+    for val in values[1:].tolist():
+        prev = (val - prev) * multiplier + prev
+        append(prev)
+    return np.array(out, dtype=np.float64)
+
+def atr(data: BarSeries, period: int = 14) -> np.ndarray:
+    """
+    ATR (SMA TR sebagai nilai awal, lalu Wilder). Index 0..period-2 berisi 0.
+    """
+    tr = cached(true_range, data)
+    if len(tr) < period:
+        return np.zeros(period)
+    first = _sum(tr[:period]) / period
+    return np.concatenate([np.zeros(period - 1), wilder(first, tr[period:], period)])
+
+def rsi(data: BarSeries, period: int = 14) -> np.ndarray:
+    """
+    RSI Wilder. Index 0..period-1 berisi 0.
+    """
+    diff = np.diff(data.close)
+    gains = np.maximum(diff, 0.0)
+    losses = np.maximum(-diff, 0.0)
+    if len(gains) < period:
+        avg_gain = avg_loss = np.zeros(1)
+    else:
+        first = [_sum(gains[:period]) / period, _sum(losses[:period]) / period]
+        avg_gain, avg_loss = wilder(first, np.stack([gains[period:], losses[period:]]), period)
+    return np.concatenate([np.zeros(period), _ratio_index(avg_gain, avg_loss)])
+
+def mfi(data: BarSeries, period: int = 14) -> np.ndarray:
+    """
+    Money Flow Index. Index 0..period-1 berisi 0.
+    """
+    tp = cached(typical_price, data)
+    raw_money_flow = tp * data.volume
+    up = tp[1:] > tp[:-1]
+    positive_flow = np.where(up, raw_money_flow[1:], 0.0)
+    negative_flow = np.where(up, 0.0, raw_money_flow[1:])
+    pos_sum = rolling_sum(positive_flow, period)
+    neg_sum = rolling_sum(negative_flow, period)
+    return np.concatenate([np.zeros(period), _ratio_index(pos_sum, neg_sum)])
+
+def dmi(data: BarSeries, period: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    +DI, -DI dan ADX (Wilder). Semua sepanjang data, padding 0 di awal.
+    """
+    n = len(data)
+    if n - 1 < period:
+        return np.zeros(n), np.zeros(n), np.zeros(n)
+
+    high, low = data.high, data.low
+    tr = cached(true_range, data)[1:]
+    up_move = high[1:] - high[:-1]
+    down_move = low[:-1] - low[1:]
+    # Baris: TR, +DM, -DM (di-smooth sekaligus)
+    moves = np.empty((3, n - 1))
+    moves[0] = tr
+    np.multiply(up_move, (up_move > down_move) & (up_move > 0), out=moves[1])
+    np.multiply(down_move, (down_move > up_move) & (down_move > 0), out=moves[2])
+
+    # Jumlah ter-smooth untuk bar period..n-2 (nilai awal = jumlah biasa, tidak ikut output)
+    first = [_sum(row[:period]) for row in moves]
+    smooth = _wilder_sum(first, moves[:, period:], period)[:, 1:]
+    p_di, m_di = _safe_div(smooth[1:], smooth[0], 100)
+    dx = _safe_div(100 * np.abs(p_di - m_di), p_di + m_di)
+
+    plus_di = np.zeros(n)
+    minus_di = np.zeros(n)
+    plus_di[period + 1:] = p_di[:n - period - 1]
+    minus_di[period + 1:] = m_di[:n - period - 1]
+
+    adx = np.zeros(n)
+    if len(dx) >= period:
+        adx_values = wilder(_sum(dx[:period]) / period, dx[period:], period)
+        start = 2 * period
+        adx[start:] = adx_values[:max(n - start, 0)]
+    return plus_di, minus_di, adx
+
+def cci(data: BarSeries, period: int = 20) -> np.ndarray:
+    """
+    Commodity Channel Index dengan mean deviation. Index 0..period-2 berisi 0.
+    """
+    tp = cached(typical_price, data)
+    n = len(tp) - period + 1
+    out = np.zeros(len(tp))
+    if n <= 0:
+        return out
+    mean = rolling_sum(tp, period) / period
+    md = np.zeros(n)
+    for k in range(period):
+        md += np.abs(tp[k:k + n] - mean)
+    md /= period
+    values = np.zeros(n)
+    mask = md != 0
+    values[mask] = (tp[period - 1:][mask] - mean[mask]) / (0.015 * md[mask])
+    out[period - 1:] = values
+    return out
+
+def simple_rsi(data: BarSeries, period: int = 14) -> Optional[float]:
+    """
+    RSI ringkas ala TechnicalAnalyzer: rata-rata `period` delta positif terakhir
+    dibanding `period` delta negatif terakhir (tanpa smoothing). None jika data kurang.
+    """
+    close = data.close
+    if len(close) <= period:
+        return None
+    deltas = np.diff(close)
+    gains = deltas[deltas > 0]
+    losses = np.abs(deltas[deltas < 0])
+    avg_gain = _sum(gains[-period:]) / period
+    avg_loss = _sum(losses[-period:]) / period
+    if avg_loss == 0:
+        return 100.0
+    return float(100 - (100 / (1 + avg_gain / avg_loss)))
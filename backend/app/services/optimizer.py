@@ -0,0 +1,318 @@
+import os
+import math
+import random
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from .bar_series import BarSeries
+from .strategies import registry
+from .trade_engine import build_orders, simulate_orders
+
+# Jumlah proses worker sweep (default = jumlah core)
+OPTIMIZER_WORKERS = int(os.getenv("OPTIMIZER_WORKERS", str(os.cpu_count() or 1)))
+# Batas jumlah kombinasi parameter per sweep
+OPTIMIZER_MAX_COMBINATIONS = int(os.getenv("OPTIMIZER_MAX_COMBINATIONS", "5000"))
+# Jumlah job (selesai) yang disimpan untuk dilihat hasilnya
+OPTIMIZER_MAX_JOBS = int(os.getenv("OPTIMIZER_MAX_JOBS", "20"))
+
+# Metrik ranking (semakin besar semakin baik)
+METRICS = ("total_pnl", "win_rate", "profit_factor", "expectancy")
+
+def check_values(name: str, values: Sequence[Any], default: Any):
+    """
+    Tolak nilai di luar range sebelum sweep jalan: parameter integer (periode/lookback)
+    harus >= 1, parameter float harus berhingga dan >= 0.
+    """
+    if isinstance(default, bool) or not isinstance(default, (int, float)):
+        return
+    for value in values:
+        if isinstance(default, int) and value < 1:
+            raise ValueError(f"Nilai {name} harus >= 1: {value}")
+        if isinstance(default, float) and not (math.isfinite(value) and value >= 0):
+            raise ValueError(f"Nilai {name} harus >= 0: {value}")
+
+def parse_space(spec: str, defaults: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    "alpha_p=10,14,20;score_threshold=0.02,0.03" -> {"alpha_p": [10, 14, 20], ...}.
+    Nilai dikonversi ke tipe default parameter strategi.
+    """
+    space: Dict[str, List[Any]] = {}
+    for part in spec.split(";"):
+        if not part.strip():
+            continue
+        name, _, values = part.partition("=")
+        name = name.strip()
+        if name not in defaults:
+            raise ValueError(f"Parameter tidak dikenal: {name} (pilihan: {', '.join(defaults)})")
+        cast = type(defaults[name])
+        try:
+            space[name] = [cast(v.strip()) for v in values.split(",") if v.strip()]
+        except ValueError:
+            raise ValueError(f"Nilai tidak valid untuk {name}: {values}")
+        if not space[name]:
+            raise ValueError(f"Nilai kosong untuk {name}")
+        check_values(name, space[name], defaults[name])
+    if not space:
+        raise ValueError("Parameter space kosong")
+    return space
+
+def combinations(space: Dict[str, Sequence[Any]], mode: str = "grid", samples: Optional[int] = None,
+                 seed: Optional[int] = 0) -> List[Dict[str, Any]]:
+    """
+    grid: semua kombinasi; random: `samples` kombinasi acak (tanpa duplikat) dari grid.
+    Diurutkan per nilai parameter supaya kombinasi yang berbagi indikator berdekatan.
+    """
+    names = list(space)
+    sizes = [len(space[name]) for name in names]
+    total = math.prod(sizes)
+    if mode == "grid":
+        picks = range(total)
+    elif mode == "random":
+        picks = sorted(random.Random(seed).sample(range(total), min(samples or total, total)))
+    else:
+        raise ValueError(f"Mode sweep tidak dikenal: {mode} (pilihan: grid, random)")
+    if len(picks) > OPTIMIZER_MAX_COMBINATIONS:
+        raise ValueError(f"Terlalu banyak kombinasi: {len(picks)} (maksimum {OPTIMIZER_MAX_COMBINATIONS})")
+
+    result = []
+    for pick in picks:
+        # Index grid -> index per parameter (parameter pertama paling lambat berubah)
+        combo = {}
+        for name, size in zip(reversed(names), reversed(sizes)):
+            pick, k = divmod(pick, size)
+            combo[name] = space[name][k]
+        result.append({name: combo[name] for name in names})
+    return result
+
+def evaluate(data: BarSeries, strategy: str, params: Dict[str, Any], initial_capital: float = 10000000,
+             exchange_rate: float = 16000) -> Dict[str, Any]:
+    """
+    Backtest satu kombinasi parameter lewat trade engine, return metrik ringkas.
+    Indikator dihitung lewat indicator_cache, jadi kombinasi dengan periode yang
+    sama memakai ulang hasilnya. Jika kombinasi gagal, error dicatat di baris
+    kombinasi itu (tanpa metrik) dan sweep tetap jalan.
+    """
+    spec = registry.get(strategy)
+    try:
+        columns = simulate_orders(data, build_orders(data, spec.detect(data, **params), spec.backtest),
+                                  initial_capital, exchange_rate)
+    except Exception as e:
+        return {"params": params, "error": f"{type(e).__name__}: {e}"}
+    stats = columns.stats()
+    pnl = columns.pnl
+    gross_win = float(pnl[pnl > 0].sum())
+    gross_loss = float(-pnl[pnl < 0].sum())
+    equity = np.cumsum(pnl)
+    drawdown = float((np.maximum.accumulate(np.maximum(equity, 0.0)) - equity).max()) if len(pnl) else 0.0
+    stats.update({
+        "profit_factor": gross_win / gross_loss if gross_loss > 0 else (math.inf if gross_win > 0 else 0.0),
+        "expectancy": stats["total_pnl"] / stats["total_trades"] if stats["total_trades"] else 0.0,
+        "max_drawdown": drawdown,
+    })
+    return {"params": params, **stats, "error": None}
+
+# --- Worker process ---
+# Bar data dibaca dari shared memory (sekali per proses), bukan di-pickle per task
+
+_worker_data: Optional[BarSeries] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+
+def _init_worker(shm_name: str, n: int, tz: Optional[str]):
+    global _worker_data, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_data = _attach_series(_worker_shm, n, tz)
+
+def _run_batch(strategy: str, batch: List[Dict[str, Any]], initial_capital: float, exchange_rate: float) -> List[Dict[str, Any]]:
+    return [evaluate(_worker_data, strategy, params, initial_capital, exchange_rate) for params in batch]
+
+def _share_series(data: BarSeries) -> shared_memory.SharedMemory:
+    # Layout: timestamp (int64) lalu open/high/low/close/volume (float64), masing-masing n elemen
+    n = len(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 6 * n * 8))
+    np.ndarray(n, dtype=np.int64, buffer=shm.buf)[:] = data.timestamp
+    for k, field in enumerate(BarSeries.FIELDS, start=1):
+        np.ndarray(n, dtype=np.float64, buffer=shm.buf, offset=k * n * 8)[:] = getattr(data, field)
+    return shm
+
+def _attach_series(shm: shared_memory.SharedMemory, n: int, tz: Optional[str]) -> BarSeries:
+    columns = [np.ndarray(n, dtype=np.int64, buffer=shm.buf)]
+    columns += [np.ndarray(n, dtype=np.float64, buffer=shm.buf, offset=k * n * 8) for k in range(1, 6)]
+    for column in columns:
+        column.flags.writeable = False
+    return BarSeries(*columns, tz=tz)
+
+class SweepJob:
+    """
+    Satu parameter sweep: progress (completed/total), status, dan tabel hasil ter-ranking.
+    status: pending, running, done, cancelled, error
+    """
+
+    def __init__(self, strategy: str, combos: List[Dict[str, Any]], metric: str, label: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.strategy = strategy
+        self.combos = combos
+        self.metric = metric
+        self.label = label
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.completed = 0
+        self.results: List[Dict[str, Any]] = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return len(self.combos)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _add(self, results: List[Dict[str, Any]]):
+        with self._lock:
+            self.results.extend(results)
+            self.completed += len(results)
+
+    def ranked(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Kombinasi yang gagal (tanpa metrik) di urutan terakhir
+            rows = sorted(self.results, key=lambda r: (r["error"] is None, r.get(self.metric, 0.0)), reverse=True)
+        rows = rows[:top] if top is not None else rows
+        return [{"rank": i + 1, **row} for i, row in enumerate(rows)]
+
+    def table(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        ranked() yang aman untuk JSON (profit factor tak hingga -> None).
+        """
+        return [{k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in row.items()}
+                for row in self.ranked(top)]
+
+    @property
+    def failed(self) -> int:
+        with self._lock:
+            return sum(1 for row in self.results if row["error"] is not None)
+
+    def to_dict(self, top: Optional[int] = 20) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "strategy": self.strategy,
+            "label": self.label,
+            "status": self.status,
+            "error": self.error,
+            "metric": self.metric,
+            "completed": self.completed,
+            "total": self.total,
+            "failed": self.failed,
+            "progress": self.completed / self.total if self.total else 1.0,
+            "results": self.table(top),
+        }
+
+def run_sweep(data: BarSeries, job: SweepJob, initial_capital: float = 10000000, exchange_rate: float = 16000,
+              workers: int = OPTIMIZER_WORKERS, on_progress: Optional[Callable[[SweepJob], None]] = None) -> SweepJob:
+    """
+    Jalankan sweep (blocking). Kombinasi dibagi per batch ke process pool; dengan
+    satu worker dijalankan langsung di proses ini. Cancel menghentikan batch yang
+    belum jalan, hasil yang sudah selesai tetap ada di job.
+    """
+    job.status = "running"
+    try:
+        if workers <= 1 or job.total <= 1:
+            for params in job.combos:
+                if job.cancelled:
+                    break
+                job._add([evaluate(data, job.strategy, params, initial_capital, exchange_rate)])
+                if on_progress:
+                    on_progress(job)
+        else:
+            _run_pool(data, job, initial_capital, exchange_rate, workers, on_progress)
+        job.status = "cancelled" if job.cancelled else "done"
+    except Exception as e:
+        job.status = "error"
+        job.error = str(e)
+        print(f"Optimizer error ({job.strategy}): {e}")
+    return job
+
+def _run_pool(data: BarSeries, job: SweepJob, initial_capital: float, exchange_rate: float, workers: int,
+              on_progress: Optional[Callable[[SweepJob], None]]):
+    # Batch berurutan: kombinasi dengan periode indikator sama jatuh ke worker yang sama (cache hit)
+    size = max(1, math.ceil(job.total / (workers * 4)))
+    batches = [job.combos[i:i + size] for i in range(0, job.total, size)]
+    shm = _share_series(data)
+    try:
+        # spawn: fork dari server yang punya banyak thread bisa deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                                 initargs=(shm.name, len(data), data.tz)) as pool:
+            pending = {pool.submit(_run_batch, job.strategy, batch, initial_capital, exchange_rate) for batch in batches}
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not future.cancelled():
+                        job._add(future.result())
+                if on_progress and done:
+                    on_progress(job)
+                if job.cancelled:
+                    for future in pending:
+                        future.cancel()
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    break
+    finally:
+        shm.close()
+        shm.unlink()
+
+class Optimizer:
+    """
+    Menjalankan SweepJob di background thread dan menyimpan job terakhir (untuk progress/cancel).
+    """
+
+    def __init__(self, workers: int = OPTIMIZER_WORKERS, max_jobs: int = OPTIMIZER_MAX_JOBS):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, SweepJob] = {}
+
+    def start(self, data: BarSeries, strategy: str, space: Dict[str, Sequence[Any]], mode: str = "grid",
+              samples: Optional[int] = None, metric: str = "total_pnl", initial_capital: float = 10000000,
+              exchange_rate: float = 16000, label: str = "") -> SweepJob:
+        spec = registry.get(strategy)
+        if spec is None or spec.backtest is None:
+            raise ValueError(f"Strategi tidak bisa di-backtest: {strategy}")
+        unknown = set(space) - set(spec.params)
+        if unknown:
+            raise ValueError(f"Parameter tidak dikenal untuk {spec.name}: {', '.join(sorted(unknown))}")
+        for name, values in space.items():
+            check_values(name, values, spec.params[name])
+        if metric not in METRICS:
+            raise ValueError(f"Metrik tidak dikenal: {metric} (pilihan: {', '.join(METRICS)})")
+
+        job = SweepJob(spec.name, combinations(space, mode, samples), metric, label)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [k for k, j in self._jobs.items() if j.status in ("done", "cancelled", "error")]
+            for key in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[key]
+        threading.Thread(target=run_sweep, args=(data, job, initial_capital, exchange_rate, self.workers),
+                         daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[SweepJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SweepJob]:
+        job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [job.to_dict(top=1) for job in self._jobs.values()]
+
+# Singleton instance
+optimizer = Optimizer()
@@ -6,10 +6,29 @@ from datetime import datetime
 from typing import List, Dict, Optional
 from app.models.schemas import PaperTrade, PaperTradingStatus
 from app.services.fetcher import fetcher
-from app.services.strategies import Strategies
+from app.services.strategies import registry
+from app.services.aura_engine import aura_engines
 
 DATA_FILE = "paper_trades.json"
 
+# Aturan entry per strategi (StrategySpec.paper_entry): (sinyal terakhir, waktu bar terakhir, harga) -> BUY?
+def _entry_breakout(last_signal, latest_ts, current_price) -> bool:
+    if (latest_ts - last_signal.timestamp).total_seconds() >= 3600:
+        return False
+    return current_price > last_signal.metadata["targets"]["long"]["entry"]
+
+def _entry_fvg_retest(last_signal, latest_ts, current_price) -> bool:
+    return current_price <= last_signal.metadata["fvg_top"]
+
+def _entry_signal(last_signal, latest_ts, current_price) -> bool:
+    return last_signal.type == "BULLISH" and (latest_ts - last_signal.timestamp).total_seconds() < 3600
+
+ENTRY_RULES = {
+    "breakout": _entry_breakout,
+    "fvg_retest": _entry_fvg_retest,
+    "signal": _entry_signal,
+}
+
 class PaperTradingService:
     def __init__(self):
         self.is_running = False
@@ -107,10 +126,12 @@ class PaperTradingService:
         while self.is_running:
             try:
                 # 1. Fetch Latest Data (Run in Executor to avoid blocking)
+                spec = registry.get(self.active_strategy or "")
+                limit = max(50, spec.warmup) if spec else 50
                 data = await loop.run_in_executor(None, lambda: fetcher.get_historical_data(
                     self.active_symbol, 
                     interval=self.interval, 
-                    limit=50, 
+                    limit=limit, 
                     source="BINANCE" if self.active_symbol in ["BTC", "ETH", "SOL"] else "YAHOO"
                 ))
                 
@@ -118,8 +139,8 @@ class PaperTradingService:
                     await asyncio.sleep(5)
                     continue
 
-                latest_candle = data[-1]
-                current_price = latest_candle.close
+                latest_ts = data.datetime_at(-1)
+                current_price = float(data.close[-1])
 
                 # 2. Manage Active Trade
                 if self.active_trade:
@@ -168,22 +189,15 @@ class PaperTradingService:
                 # 3. Check for New Entry
                 if not self.active_trade:
                     signal = None
-                    if self.active_strategy == "POPGUN":
-                        signals = Strategies.detect_popgun(data)
-                        if signals:
-                            last_signal = signals[-1]
-                            if (latest_candle.timestamp - last_signal.timestamp).total_seconds() < 3600:
-                                targets = last_signal.metadata["targets"]["long"]
-                                if current_price > targets["entry"]:
-                                    signal = "BUY"
-                    
-                    elif self.active_strategy == "FVG":
-                        signals = Strategies.detect_fvg(data)
-                        if signals:
-                            last_signal = signals[-1]
-                            fvg_top = last_signal.metadata["fvg_top"]
-                            if current_price <= fvg_top:
-                                signal = "BUY"
+                    rule = ENTRY_RULES.get(spec.paper_entry) if spec else None
+                    if rule:
+                        if spec.incremental:
+                            # Incremental: tiap tick hanya memproses bar baru, histori terus bertambah
+                            signals = aura_engines.update(self.active_symbol, self.interval, data, anchored=False)
+                        else:
+                            signals = spec.detect(data)
+                        if signals and rule(signals[-1], latest_ts, current_price):
+                            signal = "BUY"
 
                     if signal == "BUY":
                          invest_amount_idr = self.current_balance * 0.1
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional, Sequence
+from .bar_series import BarSeries
+from .indicator_cache import cached
+from . import indicators
+from .aura_engine import aura_engines
+from .volume_profile import volume_profiles
+from .strategies import Strategies, registry
+
+# Semua strategi di registry + volume_surprise_indicator (seri analyze_volume_surprise)
+PIPELINE_STRATEGIES = tuple(spec.slug for spec in registry.specs()) + ("volume_surprise_indicator",)
+
+def parse_strategies(strategies: Optional[str]) -> List[str]:
+    """
+    "popgun,fvg" -> ["popgun", "fvg"]; kosong/None = semua strategi.
+    """
+    if not strategies:
+        return list(PIPELINE_STRATEGIES)
+    names = []
+    for name in strategies.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PIPELINE_STRATEGIES:
+            raise ValueError(f"Strategi tidak dikenal: {name} (pilihan: {', '.join(PIPELINE_STRATEGIES)})")
+        if name not in names:
+            names.append(name)
+    return names
+
+def evaluate_strategies(data: BarSeries, strategies: Sequence[str], key: Optional[str] = None,
+                        interval: str = "1d", baseline: str = "mean", period: Optional[str] = None) -> Dict[str, List[Any]]:
+    """
+    Jalankan beberapa strategi atas satu BarSeries.
+
+    Intermediate bersama (true range, typical price, ATR, gap mask) dihitung sekali
+    lewat indicator_cache lalu dibaca semua strategi; analisis volume dipakai
+    bersama oleh sinyal dan seri indikator Volume Surprise. Dengan `key`
+    (misal "YAHOO_BBCA"), Aura dan Volume Surprise memakai engine/profil
+    incremental yang sama dengan endpoint per strategi, jadi hasilnya identik.
+    """
+    selected = set(strategies)
+    results: Dict[str, List[Any]] = {}
+
+    # Intermediate bersama: ATR dipakai RBD & Aura, gap mask dipakai FVG & RBD
+    if selected & {"rbd", "aura"}:
+        cached(indicators.atr, data, 14)
+    if selected & {"fvg", "rbd"}:
+        cached(indicators.gap_up, data)
+
+    for name in strategies:
+        spec = registry.get(name)
+        if spec is None or name == "volume_surprise":
+            continue
+        if spec.incremental and key is not None:
+            results[name] = aura_engines.update(f"{key}_{period}", interval, data)
+        else:
+            results[name] = spec.detect(data)
+
+    if selected & {"volume_surprise", "volume_surprise_indicator"}:
+        expected = volume_profiles.expected_volume(f"{key}_{period}", interval, data, baseline=baseline) if key is not None else None
+        analysis = Strategies.analyze_volume_surprise(data, expected=expected, baseline=baseline)
+        if "volume_surprise" in selected:
+            results["volume_surprise"] = Strategies.detect_volume_surprise(data, analysis=analysis)
+        if "volume_surprise_indicator" in selected:
+            results["volume_surprise_indicator"] = analysis
+
+    # Urutan output mengikuti urutan permintaan
+    return {name: results[name] for name in strategies}
@@ -0,0 +1,200 @@
+import os
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from .bar_series import BarSeries
+from .strategies import registry
+from .trade_engine import STATUS_NAMES, build_orders, simulate_orders, WIN, LOSS
+
+# Jumlah proses worker untuk generate sinyal + simulasi per simbol (default = jumlah core)
+PORTFOLIO_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", str(os.cpu_count() or 1)))
+# Di bawah total bar ini dijalankan serial (biaya start proses worker lebih besar dari hasilnya)
+PORTFOLIO_PARALLEL_MIN_BARS = int(os.getenv("PORTFOLIO_PARALLEL_MIN_BARS", "200000"))
+
+def symbol_trades(strategy: str, data: BarSeries, expiry: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Kandidat trade satu simbol (semua sinyal, tanpa batas modal) dalam bentuk kolom.
+    Modal dialokasikan kemudian oleh PortfolioBacktester saat merge.
+    """
+    spec = registry.get(strategy)
+    columns = simulate_orders(data, build_orders(data, spec.detect(data), spec.backtest, expiry=expiry))
+    return {
+        "entry_ts": data.timestamp[columns.entry_index],
+        "exit_ts": data.timestamp[columns.exit_index],
+        "entry_price": columns.entry_price,
+        "exit_price": columns.exit_price,
+        "long": columns.long,
+        "status": columns.status,
+        "pnl_percent": columns.pnl_percent,
+    }
+
+def _symbol_task(strategy: str, symbol: str, data: BarSeries, expiry: Optional[int]) -> Tuple[str, Dict[str, np.ndarray]]:
+    return symbol, symbol_trades(strategy, data, expiry)
+
+class PortfolioBacktester:
+    """
+    Backtest satu strategi atas banyak simbol dengan satu pool modal.
+
+    Kandidat trade per simbol dihitung paralel (process pool), lalu semua event
+    entry/exit di-merge berurutan waktu. Exit diproses sebelum entry pada waktu yang
+    sama (modal dilepas dulu). Entry dilewati jika posisi terbuka sudah max_positions,
+    simbol masih punya posisi terbuka, atau kas habis. Alokasi per trade =
+    position_size x equity (kas + modal di posisi terbuka), dibatasi kas.
+
+    Equity curve (dan max drawdown) dihitung mark-to-market: posisi terbuka dinilai
+    dengan close terakhir simbolnya di setiap timestamp gabungan semua simbol.
+    """
+
+    def __init__(self, initial_capital: float = 100000000, max_positions: int = 10,
+                 position_size: Optional[float] = None, workers: int = PORTFOLIO_WORKERS):
+        if max_positions < 1:
+            raise ValueError("max_positions minimal 1")
+        self.initial_capital = initial_capital
+        self.max_positions = max_positions
+        self.position_size = position_size if position_size is not None else 1.0 / max_positions
+        if not 0 < self.position_size <= 1:
+            raise ValueError("position_size harus di antara 0 dan 1")
+        self.workers = workers
+
+    def candidates(self, strategy: str, datasets: Dict[str, BarSeries], expiry: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        datasets = {symbol: data for symbol, data in datasets.items() if data}
+        total_bars = sum(len(data) for data in datasets.values())
+        if self.workers <= 1 or len(datasets) <= 1 or total_bars < PORTFOLIO_PARALLEL_MIN_BARS:
+            return {symbol: symbol_trades(strategy, data, expiry) for symbol, data in datasets.items()}
+        # spawn: fork dari server yang punya banyak thread bisa deadlock
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(datasets)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_symbol_task, strategy, symbol, data, expiry) for symbol, data in datasets.items()]
+            return dict(future.result() for future in futures)
+
+    def run(self, strategy: str, datasets: Dict[str, BarSeries], expiry: Optional[int] = None) -> Dict[str, Any]:
+        spec = registry.get(strategy)
+        if spec is None or spec.backtest is None:
+            raise ValueError(f"Strategi tidak bisa di-backtest: {strategy}")
+        candidates = self.candidates(spec.name, datasets, expiry)
+        tzinfo = {symbol: self._tzinfo(datasets[symbol]) for symbol in candidates}
+
+        # Merge semua kandidat, urut waktu entry (urutan simbol input untuk waktu yang sama)
+        events = []
+        for order, (symbol, cols) in enumerate(candidates.items()):
+            for k in range(len(cols["entry_ts"])):
+                events.append((int(cols["entry_ts"][k]), order, k, symbol))
+        events.sort()
+
+        cash = float(self.initial_capital)
+        invested = 0.0
+        open_heap: List[Tuple[int, int, float, float, str]] = [] # (exit_ts, seq, allocation, pnl, symbol)
+        open_symbols = set()
+        trades = []
+        positions = [] # (symbol, entry_ts, exit_ts, allocation, pnl, entry_price, long) trade yang diambil
+        skipped = 0
+
+        def close_until(ts: int):
+            nonlocal cash, invested
+            while open_heap and open_heap[0][0] <= ts:
+                exit_ts, _, allocation, pnl, symbol = heapq.heappop(open_heap)
+                cash += allocation + pnl
+                invested -= allocation
+                open_symbols.discard(symbol)
+
+        for seq, (entry_ts, _, k, symbol) in enumerate(events):
+            close_until(entry_ts)
+            if len(open_heap) >= self.max_positions or symbol in open_symbols:
+                skipped += 1
+                continue
+            allocation = min(cash, (cash + invested) * self.position_size)
+            if allocation <= 0:
+                skipped += 1
+                continue
+            cols = candidates[symbol]
+            pnl = allocation * float(cols["pnl_percent"][k]) / 100
+            exit_ts = int(cols["exit_ts"][k])
+            cash -= allocation
+            invested += allocation
+            open_symbols.add(symbol)
+            heapq.heappush(open_heap, (exit_ts, seq, allocation, pnl, symbol))
+            positions.append((symbol, entry_ts, exit_ts, allocation, pnl, float(cols["entry_price"][k]), bool(cols["long"][k])))
+            trades.append({
+                "symbol": symbol,
+                "entry_date": datetime.fromtimestamp(entry_ts, tz=tzinfo[symbol]),
+                "exit_date": datetime.fromtimestamp(exit_ts, tz=tzinfo[symbol]),
+                "entry_price": float(cols["entry_price"][k]),
+                "exit_price": float(cols["exit_price"][k]),
+                "position": "LONG" if cols["long"][k] else "SHORT",
+                "status": STATUS_NAMES[int(cols["status"][k])],
+                "invested": allocation,
+                "pnl": pnl,
+                "pnl_percent": float(cols["pnl_percent"][k]),
+            })
+        close_until(np.iinfo(np.int64).max)
+
+        timeline, equity = self.equity_curve({symbol: datasets[symbol] for symbol in candidates}, positions)
+        return self._summary(spec.name, candidates, trades, timeline, equity, skipped)
+
+    def equity_curve(self, datasets: Dict[str, BarSeries],
+                     positions: List[Tuple[str, int, int, float, float, float, bool]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Equity mark-to-market di setiap timestamp bar (gabungan semua simbol).
+        PnL trade masuk equity sejak exit_ts; sebelum itu (entry_ts <= t < exit_ts)
+        posisi dinilai dengan close terakhir simbolnya pada t.
+        """
+        if not datasets:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        timeline = np.unique(np.concatenate([data.timestamp for data in datasets.values()]))
+        realized = np.zeros(len(timeline) + 1)
+        unrealized = np.zeros(len(timeline))
+        for symbol, entry_ts, exit_ts, allocation, pnl, entry_price, long in positions:
+            start, end = np.searchsorted(timeline, [entry_ts, exit_ts])
+            realized[end] += pnl
+            if end > start:
+                data = datasets[symbol]
+                # Close terakhir simbol pada t (simbol lain bisa punya bar di jam yang tidak ada di simbol ini)
+                close = data.close[np.searchsorted(data.timestamp, timeline[start:end], side="right") - 1]
+                unrealized[start:end] += allocation * (close - entry_price) / entry_price * (1.0 if long else -1.0)
+        return timeline, self.initial_capital + np.cumsum(realized[:-1]) + unrealized
+
+    def _summary(self, strategy: str, candidates: Dict[str, Dict[str, np.ndarray]], trades: List[Dict[str, Any]],
+                 timeline: np.ndarray, equity_curve: np.ndarray, skipped: int) -> Dict[str, Any]:
+        wins = sum(1 for t in trades if t["status"] == STATUS_NAMES[WIN])
+        losses = sum(1 for t in trades if t["status"] == STATUS_NAMES[LOSS])
+        total_pnl = sum(t["pnl"] for t in trades)
+        equity = np.r_[self.initial_capital, equity_curve]
+        peak = np.maximum.accumulate(equity)
+        max_drawdown = float(((peak - equity) / peak).max() * 100)
+
+        per_symbol: Dict[str, Dict[str, Any]] = {symbol: {"trades": 0, "wins": 0, "pnl": 0.0} for symbol in candidates}
+        for t in trades:
+            row = per_symbol[t["symbol"]]
+            row["trades"] += 1
+            row["wins"] += t["status"] == "WIN"
+            row["pnl"] += t["pnl"]
+
+        return {
+            "strategy": strategy,
+            "symbols": len(candidates),
+            "initial_capital": self.initial_capital,
+            "final_equity": self.initial_capital + total_pnl,
+            "total_pnl": total_pnl,
+            "return_percent": total_pnl / self.initial_capital * 100,
+            "total_trades": len(trades),
+            "wins": wins,
+            "losses": losses,
+            "win_rate": (wins / len(trades) * 100) if trades else 0,
+            "skipped_signals": skipped,
+            "max_drawdown_percent": max_drawdown,
+            "max_positions": self.max_positions,
+            "position_size": self.position_size,
+            "per_symbol": per_symbol,
+            "equity_curve": [{"timestamp": ts, "equity": e} for ts, e in zip(timeline.tolist(), equity_curve.tolist())],
+            "trades": trades,
+        }
+
+    @staticmethod
+    def _tzinfo(data: BarSeries):
+        if not data.tz or data.tz == "UTC":
+            return timezone.utc
+        return ZoneInfo(data.tz)
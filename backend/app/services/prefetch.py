@@ -0,0 +1,140 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from .bar_cache import candle_ttl
+from .fetcher import fetcher
+
+# Konfigurasi prefetch (bisa di-override lewat env)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+PREFETCH_INTERVALS = [i.strip() for i in os.getenv("PREFETCH_INTERVALS", "1d").split(",") if i.strip()]
+# Simbol tambahan di luar default scan (comma separated)
+PREFETCH_SYMBOLS = [s.strip() for s in os.getenv("PREFETCH_SYMBOLS", "").split(",") if s.strip()]
+# Batas tidur loop scheduler, supaya watchlist baru cepat terambil
+PREFETCH_MAX_SLEEP = 30.0
+# Jeda sebelum mencoba ulang job yang gagal
+PREFETCH_RETRY = 30.0
+
+class Watchlist:
+    def __init__(self, name: str, symbols: List[str], intervals: List[str], source: str = "YAHOO"):
+        self.name = name
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.source = source
+
+class PrefetchScheduler:
+    """
+    Menjaga cache DataFetcher tetap hangat untuk simbol-simbol di watchlist.
+
+    Setiap pasangan (source, interval) menjadi satu job yang me-refresh semua
+    simbolnya lewat satu bulk download, dijadwalkan tepat setelah candle interval
+    tersebut close (sama dengan TTL cache). Job dijalankan di worker pool terbatas
+    dan satu job tidak pernah berjalan dobel. Karena cache menyajikan entry basi
+    sambil refresh, request user untuk simbol yang di-watch tidak pernah miss.
+    """
+
+    def __init__(self, fetcher, workers: int = PREFETCH_WORKERS):
+        self.fetcher = fetcher
+        self.workers = workers
+        self.watchlists: Dict[str, Watchlist] = {}
+        self._next_run: Dict[Tuple[str, str], float] = {}
+        self._running: Set[Tuple[str, str]] = set()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.runs = 0
+        self.failures = 0
+
+    def add_watchlist(self, name: str, symbols: List[str], intervals: List[str] = ("1d",), source: str = "YAHOO"):
+        self.watchlists[name] = Watchlist(name, symbols, intervals, source)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def remove_watchlist(self, name: str):
+        self.watchlists.pop(name, None)
+
+    def jobs(self) -> Dict[Tuple[str, str], List[str]]:
+        """
+        Gabungkan semua watchlist menjadi job (source, interval) -> daftar simbol unik.
+        """
+        jobs: Dict[Tuple[str, str], List[str]] = {}
+        for wl in self.watchlists.values():
+            for interval in wl.intervals:
+                symbols = jobs.setdefault((wl.source, interval), [])
+                symbols.extend(s for s in wl.symbols if s not in symbols)
+        return jobs
+
+    async def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._task = None
+        self._pool = None
+        self._running.clear()
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.time()
+            jobs = self.jobs()
+            for job, symbols in jobs.items():
+                if job in self._running or self._next_run.get(job, 0) > now:
+                    continue
+                self._running.add(job)
+                future = loop.run_in_executor(self._pool, self._run_job, job, symbols)
+                future.add_done_callback(lambda f, job=job: self._job_done(job, f))
+
+            pending = [t for job, t in self._next_run.items() if job in jobs and job not in self._running]
+            delay = min([PREFETCH_MAX_SLEEP] + [t - time.time() for t in pending])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    def _run_job(self, job: Tuple[str, str], symbols: List[str]):
+        source, interval = job
+        # use_cache=False: selalu ambil upstream, hasilnya menimpa entry cache yang sama dengan request user
+        results = self.fetcher.get_bulk_historical_data(symbols, interval=interval, limit=1, source=source, use_cache=False)
+        missing = [s for s in symbols if not results.get(s)]
+        if missing:
+            print(f"Prefetch {interval}: no data for {', '.join(missing)}")
+
+    def _job_done(self, job: Tuple[str, str], future):
+        self._running.discard(job)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.failures += 1
+            print(f"Prefetch {job[1]} ({job[0]}) failed: {error}")
+            self._next_run[job] = time.time() + PREFETCH_RETRY
+        else:
+            self.runs += 1
+            # Jadwal berikutnya: tepat setelah candle berjalan close
+            self._next_run[job] = time.time() + candle_ttl(job[1])
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "watchlists": {name: {"symbols": wl.symbols, "intervals": wl.intervals, "source": wl.source} for name, wl in self.watchlists.items()},
+            "next_run": {f"{source}_{interval}": self._next_run.get((source, interval)) for source, interval in self.jobs()},
+            "runs": self.runs,
+            "failures": self.failures,
+        }
+
+# Singleton instance
+prefetcher = PrefetchScheduler(fetcher)
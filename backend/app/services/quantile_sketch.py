@@ -0,0 +1,146 @@
+import math
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterable, List, Optional
+import numpy as np
+
+# Sketch kuantil KLL (Karnin, Lang, Liberty): memory terbatas O(k log(n/k)),
+# update O(1) amortized, dan bisa di-merge (hasil merge = sketch dari gabungan data).
+# Selama jumlah item <= k belum ada kompaksi, jadi kuantil masih eksak.
+
+# Faktor penyusutan kapasitas per level (nilai standar KLL)
+_C = 2.0 / 3.0
+
+class KLLSketch:
+    def __init__(self, k: int = 64, seed: Optional[int] = 0):
+        self.k = k
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._size = 0
+        self._capacity = self._level_capacity(0)
+        # Pilihan item ganjil/genap saat kompaksi; seed tetap supaya hasil reproducible
+        self._rng = random.Random(seed)
+        self._sorted = None # Cache (items, cumulative weights) untuk quantile()
+
+    def _level_capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (_C ** depth))))
+
+    def _total_capacity(self) -> int:
+        return sum(self._level_capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value: float):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        self._sorted = None
+        if self._size > self._capacity:
+            self._compress()
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.update(value)
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            items = self.compactors[level]
+            if len(items) >= self._level_capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                # Sisakan satu item jika ganjil, setengah sisanya naik level dengan bobot dua kali
+                items.sort()
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self._rng.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = keep
+                self._size = sum(len(c) for c in self.compactors)
+                self._capacity = self._total_capacity()
+                if self._size <= self._capacity:
+                    break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """
+        Gabungkan `other` ke sketch ini (in place) dan return self.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._size = sum(len(c) for c in self.compactors)
+        self._capacity = self._total_capacity()
+        self._sorted = None
+        if self._size > self._capacity:
+            self._compress()
+        return self
+
+    def copy(self) -> "KLLSketch":
+        obj = KLLSketch(self.k, seed=None)
+        obj.n = self.n
+        obj.compactors = [list(c) for c in self.compactors]
+        obj._size = self._size
+        obj._capacity = self._capacity
+        obj._rng.setstate(self._rng.getstate())
+        return obj
+
+    def scaled(self, factor: float) -> "KLLSketch":
+        """
+        Salinan dengan semua nilai dikali `factor` (kuantil ikut terskala, factor > 0).
+        """
+        obj = self.copy()
+        obj.compactors = [[v * factor for v in c] for c in obj.compactors]
+        return obj
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _cdf_table(self):
+        if self._sorted is None:
+            weighted = sorted((v, 1 << level) for level, items in enumerate(self.compactors) for v in items)
+            self._sorted = ([v for v, _ in weighted], list(accumulate(w for _, w in weighted)))
+        return self._sorted
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Nilai terkecil dengan rank >= q * n (q=0.5 median, q=0.9 persentil 90). None jika kosong.
+        """
+        if self.n == 0:
+            return None
+        if len(self.compactors) == 1:
+            # Belum ada kompaksi: semua bobot 1, cukup urutkan
+            if self._sorted is None:
+                self._sorted = (sorted(self.compactors[0]), None)
+            values = self._sorted[0]
+            return values[min(max(int(math.ceil(q * len(values))) - 1, 0), len(values) - 1)]
+        values, cumulative = self._cdf_table()
+        index = min(bisect_left(cumulative, q * cumulative[-1]), len(values) - 1)
+        return values[index]
+
+    def to_array(self) -> np.ndarray:
+        """
+        Serialisasi ke satu array float: [k, n, jumlah level, panjang per level..., item...].
+        """
+        header = [self.k, self.n, len(self.compactors)] + [len(c) for c in self.compactors]
+        return np.array(header + [v for c in self.compactors for v in c], dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, seed: Optional[int] = 0) -> "KLLSketch":
+        values = array.tolist()
+        k, n, levels = int(values[0]), int(values[1]), int(values[2])
+        obj = cls(k, seed)
+        obj.n = n
+        obj.compactors = []
+        pos = 3 + levels
+        for length in values[3:3 + levels]:
+            obj.compactors.append(values[pos:pos + int(length)])
+            pos += int(length)
+        obj._size = sum(len(c) for c in obj.compactors)
+        obj._capacity = obj._total_capacity()
+        return obj
+
+def merge_sketches(sketches: Iterable[KLLSketch], k: int = 64) -> KLLSketch:
+    merged = KLLSketch(k)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
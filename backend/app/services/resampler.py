@@ -0,0 +1,103 @@
+from typing import Optional
+import numpy as np
+from .bar_series import BarSeries
+from .bar_cache import interval_seconds
+
+DAY = 86400
+
+# Sesi bursa: timezone + jam buka (detik sejak tengah malam lokal) sebagai anchor bucket intraday
+SESSIONS = {
+    "IDX": ("Asia/Jakarta", 9 * 3600),
+    "US": ("America/New_York", 9 * 3600 + 30 * 60),
+    "CRYPTO": ("UTC", 0), # 24/7, bucket sejajar UTC seperti kline Binance
+}
+
+def session_for_symbol(yf_symbol: str) -> str:
+    """
+    Tebak sesi bursa dari ticker Yahoo.
+    """
+    if yf_symbol.endswith(".JK") or yf_symbol == "^JKSE":
+        return "IDX"
+    if yf_symbol.endswith("-USD"):
+        return "CRYPTO"
+    return "US"
+
+def _bucket_keys(local: np.ndarray, interval: str, anchor: int) -> np.ndarray:
+    """
+    Hitung awal bucket (detik waktu lokal) untuk setiap bar.
+    """
+    interval = interval.lower()
+    if interval.endswith("mo"):
+        months = int(interval[:-2] or 1)
+        month_index = (local // DAY).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        month_index = month_index // months * months
+        return month_index.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) * DAY
+
+    step = interval_seconds(interval)
+    if interval.endswith("wk"):
+        # Minggu dimulai Senin (epoch day 0 = Kamis, jadi geser 4 hari)
+        days = local // DAY
+        return ((days - 4) // (step // DAY) * (step // DAY) + 4) * DAY
+
+    if step >= DAY:
+        return local // step * step
+
+    day_start = local // DAY * DAY
+    return day_start + anchor + (local - day_start - anchor) // step * step
+
+def resample(series: BarSeries, interval: str, session: str = "CRYPTO") -> BarSeries:
+    """
+    Bangun series timeframe lebih tinggi dari series yang lebih halus.
+
+    Agregasi OHLCV standar (open pertama, high max, low min, close terakhir,
+    volume dijumlah). Bucket intraday sejajar dengan jam buka sesi (IDX 09:00,
+    US 09:30, crypto 00:00 UTC); harian ke atas mengikuti tanggal lokal bursa,
+    mingguan mulai Senin, bulanan mulai tanggal 1.
+    Bucket terakhir disertakan walaupun belum lengkap (candle berjalan, seperti bar
+    terakhir yfinance); bar dianggap close jika timestamp + interval sudah lewat.
+    """
+    if len(series) == 0:
+        return series
+
+    tz, anchor = SESSIONS.get(session, SESSIONS["CRYPTO"])
+    tz = series.tz or tz
+    index = series.to_datetime_index()
+    if tz and tz != "UTC":
+        index = index.tz_convert(tz)
+    local = index.tz_localize(None).as_unit("s").asi8
+    offset = local - series.timestamp # Offset UTC per bar (ikut DST)
+
+    keys = _bucket_keys(local, interval, anchor)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+
+    return BarSeries(
+        keys[starts] - offset[starts],
+        series.open[starts],
+        np.maximum.reduceat(series.high, starts),
+        np.minimum.reduceat(series.low, starts),
+        series.close[ends - 1],
+        np.add.reduceat(series.volume, starts),
+        tz=series.tz,
+    )
+
+def resample_base(interval: str, period_window: Optional[float]) -> Optional[str]:
+    """
+    Pilih interval base untuk membangun `interval`, atau None jika diambil langsung.
+    period_window: panjang window period dalam detik (None = max).
+    Harian ke atas dibangun dari 1d; intraday dari base intraday paling halus yang
+    masih dalam batas lookback yfinance dan habis membagi interval target.
+    """
+    interval = interval.lower()
+    if interval == "1d":
+        return None
+
+    target = interval_seconds(interval)
+    if interval.endswith("wk") or interval.endswith("mo") or target >= DAY:
+        return "1d"
+
+    for base, max_window in (("1m", 5 * DAY), ("5m", 58 * DAY), ("1h", 729 * DAY)):
+        step = interval_seconds(base)
+        if period_window is not None and period_window <= max_window and target % step == 0:
+            return None if base == interval else base
+    return None
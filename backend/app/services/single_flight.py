@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+class SingleFlight:
+    """
+    Menggabungkan pemanggilan konkuren untuk key yang sama.
+
+    Caller pertama (leader) menjalankan fungsi; caller lain dengan key yang sama
+    menunggu hasil leader tersebut alih-alih memanggil upstream sendiri.
+    Exception dari leader juga diteruskan ke semua caller yang menunggu.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.coalesced = 0 # Jumlah caller yang ikut menunggu hasil leader
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._inflight
@@ -1,38 +1,40 @@
-from typing import List
-from app.models.schemas import MarketData, StrategySignal
+from typing import List, Optional
+import numpy as np
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
+from .registry import registry, StrategySpec
 
-from .popgun import detect_popgun
-from .fvg import detect_fvg
-from .rbd import detect_rbd
-from .aura import detect_aura
-from .volume_surprise import detect_volume_surprise, analyze_volume_surprise
-from .utils import calculate_atr
+# Modul strategi di-load lazy lewat registry (tidak di-import saat startup)
 
 class Strategies:
     @staticmethod
-    def detect_popgun(data: List[MarketData]) -> List[StrategySignal]:
-        return detect_popgun(data)
+    def detect_popgun(data: BarSeries) -> List[StrategySignal]:
+        return registry.get("POPGUN").detect(data)
 
     @staticmethod
-    def detect_fvg(data: List[MarketData]) -> List[StrategySignal]:
-        return detect_fvg(data)
+    def detect_fvg(data: BarSeries) -> List[StrategySignal]:
+        return registry.get("FVG").detect(data)
 
     @staticmethod
-    def detect_rbd(data: List[MarketData]) -> List[StrategySignal]:
-        return detect_rbd(data)
+    def detect_rbd(data: BarSeries) -> List[StrategySignal]:
+        return registry.get("RBD").detect(data)
     
     @staticmethod
-    def detect_aura(data: List[MarketData]) -> List[StrategySignal]:
-        return detect_aura(data)
+    def detect_aura(data: BarSeries) -> List[StrategySignal]:
+        return registry.get("AURA").detect(data)
     
     @staticmethod
-    def detect_volume_surprise(data: List[MarketData]) -> List[StrategySignal]:
-        return detect_volume_surprise(data)
+    def detect_volume_surprise(data: BarSeries, expected: Optional[np.ndarray] = None, baseline: str = "mean",
+                               analysis: Optional[List[dict]] = None) -> List[StrategySignal]:
+        from .volume_surprise import detect_volume_surprise
+        return detect_volume_surprise(data, expected=expected, baseline=baseline, analysis=analysis)
 
     @staticmethod
-    def analyze_volume_surprise(data: List[MarketData]) -> List[dict]:
-        return analyze_volume_surprise(data)
+    def analyze_volume_surprise(data: BarSeries, expected: Optional[np.ndarray] = None, baseline: str = "mean") -> List[dict]:
+        from .volume_surprise import analyze_volume_surprise
+        return analyze_volume_surprise(data, expected=expected, baseline=baseline)
 
     @staticmethod
-    def _calculate_atr(data: List[MarketData], period: int = 14) -> List[float]:
+    def _calculate_atr(data: BarSeries, period: int = 14) -> List[float]:
+        from .utils import calculate_atr
         return calculate_atr(data, period)
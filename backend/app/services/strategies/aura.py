@@ -1,346 +1,164 @@
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
-from app.models.schemas import MarketData, StrategySignal
-from .utils import calculate_atr
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
+from app.services import indicators
+from app.services.indicator_cache import cached
 
 # --- Helper Functions ---
+# Implementasi vektor ada di app.services.indicators; fungsi di sini dipertahankan
+# untuk kompatibilitas (return list seperti sebelumnya).
 
 def calculate_sma(data: List[float], period: int) -> List[float]:
-    sma_values = []
-    for i in range(len(data)):
-        if i < period - 1:
-            sma_values.append(0.0)
-        else:
-            window = data[i - period + 1 : i + 1]
-            sma_values.append(sum(window) / period)
-    return sma_values
+    return indicators.sma(data, period).tolist()
 
 def calculate_ema(data: List[float], period: int) -> List[float]:
-    ema_values = []
-    multiplier = 2 / (period + 1)
-    for i, val in enumerate(data):
-        if i == 0:
-            ema_values.append(val)
-        else:
-            ema = (val - ema_values[-1]) * multiplier + ema_values[-1]
-            ema_values.append(ema)
-    return ema_values
-
-def calculate_rsi(data: List[MarketData], period: int = 14) -> List[float]:
-    rsi_values = []
-    gains = []
-    losses = []
-    
-    for i in range(1, len(data)):
-        diff = data[i].close - data[i-1].close
-        gains.append(max(diff, 0))
-        losses.append(max(-diff, 0))
-        
-    avg_gain = sum(gains[:period]) / period if len(gains) >= period else 0
-    avg_loss = sum(losses[:period]) / period if len(losses) >= period else 0
-    
-    # Pad first 'period' values
-    rsi_values.extend([0.0] * period)
-    
-    if avg_loss == 0:
-        first_rsi = 100.0
-    else:
-        rs = avg_gain / avg_loss
-        first_rsi = 100.0 - (100.0 / (1.0 + rs))
-    rsi_values.append(first_rsi)
-    
-    for i in range(period, len(gains)):
-        gain = gains[i]
-        loss = losses[i]
-        
-        avg_gain = (avg_gain * (period - 1) + gain) / period
-        avg_loss = (avg_loss * (period - 1) + loss) / period
-        
-        if avg_loss == 0:
-            rsi = 100.0
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100.0 - (100.0 / (1.0 + rs))
-        rsi_values.append(rsi)
-        
-    return rsi_values
-
-def calculate_mfi(data: List[MarketData], period: int = 14) -> List[float]:
-    mfi_values = []
-    typical_prices = [(d.high + d.low + d.close) / 3.0 for d in data]
-    raw_money_flow = [tp * d.volume for tp, d in zip(typical_prices, data)]
-    
-    positive_flow = []
-    negative_flow = []
-    
-    for i in range(1, len(typical_prices)):
-        if typical_prices[i] > typical_prices[i-1]:
-            positive_flow.append(raw_money_flow[i])
-            negative_flow.append(0.0)
-        else:
-            positive_flow.append(0.0)
-            negative_flow.append(raw_money_flow[i])
-            
-    # Pad
-    mfi_values.extend([0.0] * period)
-    
-    for i in range(period - 1, len(positive_flow)):
-        pos_sum = sum(positive_flow[i-period+1 : i+1])
-        neg_sum = sum(negative_flow[i-period+1 : i+1])
-        
-        if neg_sum == 0:
-            mfi = 100.0
-        else:
-            mr = pos_sum / neg_sum
-            mfi = 100.0 - (100.0 / (1.0 + mr))
-        mfi_values.append(mfi)
-        
-    return mfi_values
-
-def calculate_dmi(data: List[MarketData], period: int = 14) -> Tuple[List[float], List[float], List[float]]:
-    plus_di = []
-    minus_di = []
-    adx = []
-    
-    tr_list = []
-    plus_dm_list = []
-    minus_dm_list = []
-    
-    for i in range(1, len(data)):
-        curr = data[i]
-        prev = data[i-1]
-        
-        tr = max(curr.high - curr.low, abs(curr.high - prev.close), abs(curr.low - prev.close))
-        tr_list.append(tr)
-        
-        up_move = curr.high - prev.high
-        down_move = prev.low - curr.low
-        
-        if up_move > down_move and up_move > 0:
-            plus_dm_list.append(up_move)
-        else:
-            plus_dm_list.append(0.0)
-            
-        if down_move > up_move and down_move > 0:
-            minus_dm_list.append(down_move)
-        else:
-            minus_dm_list.append(0.0)
-            
-    if len(tr_list) < period:
-        return [0.0]*len(data), [0.0]*len(data), [0.0]*len(data)
-        
-    # Smoothed sums (Wilder's)
-    # First value is simple sum
-    atr_smooth = sum(tr_list[:period])
-    plus_dm_smooth = sum(plus_dm_list[:period])
-    minus_dm_smooth = sum(minus_dm_list[:period])
-    
-    # Pad output to match data length
-    # data[0] has no prev, so we start at index 1 for calculation
-    # but we need to return list of len(data)
-    
-    # We will build lists that align with `data` indices
-    # indices 0..period are 0.0
-    plus_di = [0.0] * (period + 1) 
-    minus_di = [0.0] * (period + 1)
-    
-    dx_list = []
-    
-    # Calculate DI for the rest
-    for i in range(period, len(tr_list)):
-        atr_smooth = atr_smooth - (atr_smooth / period) + tr_list[i]
-        plus_dm_smooth = plus_dm_smooth - (plus_dm_smooth / period) + plus_dm_list[i]
-        minus_dm_smooth = minus_dm_smooth - (minus_dm_smooth / period) + minus_dm_list[i]
-        
-        p_di = 100 * (plus_dm_smooth / atr_smooth) if atr_smooth != 0 else 0
-        m_di = 100 * (minus_dm_smooth / atr_smooth) if atr_smooth != 0 else 0
-        
-        plus_di.append(p_di)
-        minus_di.append(m_di)
-        
-        dx = 100 * abs(p_di - m_di) / (p_di + m_di) if (p_di + m_di) != 0 else 0
-        dx_list.append(dx)
-        
-    # Calculate ADX
-    # First ADX is average of first 'period' DX values
-    adx = [0.0] * (period + 1 + period - 1) # Padding
-    
-    if len(dx_list) >= period:
-        curr_adx = sum(dx_list[:period]) / period
-        adx.append(curr_adx)
-        
-        for i in range(period, len(dx_list)):
-            curr_adx = ((curr_adx * (period - 1)) + dx_list[i]) / period
-            adx.append(curr_adx)
-            
-    # Resize all to len(data)
-    plus_di = plus_di[:len(data)] + [0.0]*(len(data)-len(plus_di))
-    minus_di = minus_di[:len(data)] + [0.0]*(len(data)-len(minus_di))
-    adx = adx[:len(data)] + [0.0]*(len(data)-len(adx))
-    
-    return plus_di, minus_di, adx
-
-def calculate_cci(data: List[MarketData], period: int = 20) -> List[float]:
-    cci_values = []
-    tp = [(d.high + d.low + d.close) / 3.0 for d in data]
-    
-    sma_tp = calculate_sma(tp, period)
-    
-    for i in range(len(data)):
-        if i < period - 1:
-            cci_values.append(0.0)
-            continue
-            
-        window_tp = tp[i-period+1 : i+1]
-        mean = sma_tp[i]
-        md = sum([abs(x - mean) for x in window_tp]) / period
-        
-        if md == 0:
-            cci = 0.0
-        else:
-            cci = (tp[i] - mean) / (0.015 * md)
-        cci_values.append(cci)
-        
-    return cci_values
+    return indicators.ema(data, period).tolist()
 
-# --- Main Strategy ---
+def calculate_rsi(data: BarSeries, period: int = 14) -> List[float]:
+    return cached(indicators.rsi, data, period).tolist()
+
+def calculate_mfi(data: BarSeries, period: int = 14) -> List[float]:
+    return cached(indicators.mfi, data, period).tolist()
+
+def calculate_dmi(data: BarSeries, period: int = 14) -> Tuple[List[float], List[float], List[float]]:
+    plus_di, minus_di, adx = cached(indicators.dmi, data, period)
+    return plus_di.tolist(), minus_di.tolist(), adx.tolist()
+
+def calculate_cci(data: BarSeries, period: int = 20) -> List[float]:
+    return cached(indicators.cci, data, period).tolist()
+
+# --- State Machine ---
 
-def detect_aura(data: List[MarketData]) -> List[StrategySignal]:
+# Parameters
+ALPHA_P = 14
+MAGIC_P = 20
+ADX_P = 14
+RSI_P = 14
+MIN_BARS = 50 # detect_aura tidak menghasilkan sinyal untuk data lebih pendek
+SCORE_THRESHOLD = 0.03 # Ambang Lorentzian score (lihat AuraState.step)
+
+class AuraState:
     """
-    Aura V14 Strategy Implementation (Revised)
-    Based on Triple Consensus:
-    1. Alpha Trend (MFI-based Trailing Stop)
-    2. Magic Trend (CCI-based Momentum)
-    3. Lorentzian Score (Proxy using RSI/MFI/ADX Weighted Momentum)
+    State Aura V14 yang dibawa antar bar (alpha_trend, alpha_dir, last_signal_type).
+    step() memproses satu bar dengan nilai indikator di bar tersebut; dipakai oleh
+    detect_aura (replay penuh) dan AuraEngine (incremental) sehingga keduanya identik.
     """
-    signals = []
-    if len(data) < 50:
-        return signals
+    _fields = ("index", "alpha_trend", "alpha_dir", "last_signal_type")
+
+    def __init__(self, score_threshold: float = SCORE_THRESHOLD):
+        self.score_threshold = score_threshold
+        self.index = 0 # Index bar berikutnya
+        self.alpha_trend = 0.0
+        self.alpha_dir = 0 # 1 = Bullish, -1 = Bearish
+        # Track previous signal to avoid duplicates
+        self.last_signal_type: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def restore(self, state: Dict[str, Any]):
+        for name in self._fields:
+            setattr(self, name, state[name])
+
+    def step(self, high: float, low: float, close: float, mfi: float, atr: float,
+             cci: float, adx: float, rsi: float) -> Optional[Tuple[str, bool, float]]:
+        """
+        Proses satu bar; return (signal_type, is_reentry, score) jika bar ini memicu sinyal.
+        """
+        i = self.index
+        self.index += 1
+        if i == 0:
+            return None
 
-    # Parameters
-    alpha_p = 14
-    magic_p = 20
-    adx_p = 14
-    
-    # 1. Indicators
-    mfi = calculate_mfi(data, alpha_p)
-    atr = calculate_atr(data, alpha_p)
-    cci = calculate_cci(data, magic_p)
-    _, _, adx = calculate_dmi(data, adx_p)
-    rsi = calculate_rsi(data, 14)
-    
-    # State Vectors
-    alpha_trend = [0.0] * len(data)
-    alpha_dir = [0] * len(data) # 1 = Bullish, -1 = Bearish
-    
-    # Track previous signal to avoid duplicates
-    last_signal_type = None 
-    
-    # Loop
-    for i in range(1, len(data)):
         # --- A. Alpha Trend Logic ---
         # Logic: If MFI >= 50, use Low-ATR (Bullish Zone). Else High+ATR (Bearish Zone).
         # Then Trail: If Bullish Zone, maintain or increase level. If Bearish Zone, maintain or decrease.
-        
-        prev_at = alpha_trend[i-1]
-        prev_dir = alpha_dir[i-1]
-        
+        prev_at = self.alpha_trend
+        prev_dir = self.alpha_dir
+
         # 1. Determine Zone and Raw Stop
-        if mfi[i] >= 50:
-            raw_stop = data[i].low - atr[i]
+        if mfi >= 50:
+            raw_stop = low - atr
             zone_bull = True
         else:
-            raw_stop = data[i].high + atr[i]
+            raw_stop = high + atr
             zone_bull = False
-            
+
         # 2. Update Trend and Level
         if i < 20: # Warmup
-            alpha_trend[i] = raw_stop
-            alpha_dir[i] = 1 if zone_bull else -1
-        else:
-            if zone_bull:
-                if prev_dir == 1:
-                    # Already Bullish, Trail Up
-                    alpha_trend[i] = max(raw_stop, prev_at)
-                    alpha_dir[i] = 1
-                else:
-                    # Was Bearish, Switch to Bullish if Price > Prev Bear Level?
-                    # Or strictly follow MFI zone?
-                    # Standard Alpha Trend strictly follows MFI zone for direction switch
-                    alpha_trend[i] = raw_stop
-                    alpha_dir[i] = 1
-            else: # Bearish Zone
-                if prev_dir == -1:
-                    # Already Bearish, Trail Down
-                    alpha_trend[i] = min(raw_stop, prev_at)
-                    alpha_dir[i] = -1
-                else:
-                    # Was Bullish, Switch to Bearish
-                    alpha_trend[i] = raw_stop
-                    alpha_dir[i] = -1
+            self.alpha_trend = raw_stop
+            self.alpha_dir = 1 if zone_bull else -1
+        elif zone_bull:
+            # Already Bullish: Trail Up. Was Bearish: switch (Standard Alpha Trend strictly follows MFI zone)
+            self.alpha_trend = max(raw_stop, prev_at) if prev_dir == 1 else raw_stop
+            self.alpha_dir = 1
+        else: # Bearish Zone
+            # Already Bearish: Trail Down. Was Bullish: switch to Bearish
+            self.alpha_trend = min(raw_stop, prev_at) if prev_dir == -1 else raw_stop
+            self.alpha_dir = -1
+        alpha_trend = self.alpha_trend
+        alpha_dir = self.alpha_dir
 
         # --- B. Magic Trend Logic ---
         # Simple CCI filter
-        magic_bull = cci[i] > 0
-        magic_bear = cci[i] < 0
-        
+        magic_bull = cci > 0
+        magic_bear = cci < 0
+
         # --- C. Lorentzian Score (Momentum Proxy) ---
         # Normalize indicators to -1..1 range approx
         # RSI: (50..100) -> 0..1, (0..50) -> -1..0
-        norm_rsi = (rsi[i] - 50) / 50.0
-        
+        norm_rsi = (rsi - 50) / 50.0
+
         # MFI: Same
-        norm_mfi = (mfi[i] - 50) / 50.0
-        
+        norm_mfi = (mfi - 50) / 50.0
+
         # ADX: Strength multiplier (0..1)
         # Standard trend strength starts at 25.
         # We saturate at 25 to allow moderate trends to contribute fully.
-        adx_factor = min(adx[i] / 25.0, 1.0) 
-        
+        adx_factor = min(adx / 25.0, 1.0)
+
         # Composite Score
         # We want Strong Momentum
         score = (norm_rsi + norm_mfi) * adx_factor
-        
+
         # Thresholds
-        # Relaxed to 0.05 to allow signals in moderate trends, 
+        # Relaxed to 0.05 to allow signals in moderate trends,
         # relying on Alpha and Magic trends for primary direction.
         # Further relaxed to 0.03 to increase signal frequency as per user feedback
-        lorentz_bull = score > 0.03
-        lorentz_bear = score < -0.03
-        
+        lorentz_bull = score > self.score_threshold
+        lorentz_bear = score < -self.score_threshold
+
         # --- D. Triple Consensus ---
         # All three must agree
-        
-        is_buy = (alpha_dir[i] == 1) and magic_bull and lorentz_bull
-        is_sell = (alpha_dir[i] == -1) and magic_bear and lorentz_bear
-        
+        is_buy = (alpha_dir == 1) and magic_bull and lorentz_bull
+        is_sell = (alpha_dir == -1) and magic_bear and lorentz_bear
+
         # --- Re-Entry Logic (Bounce off Alpha Trend Line) ---
         is_reentry_buy = False
         is_reentry_sell = False
-        
-        if alpha_dir[i] == 1 and magic_bull:
+
+        if alpha_dir == 1 and magic_bull:
              # If price dipped near Alpha Trend line and closed above
              # Check if Low <= Alpha Trend * 1.005 (0.5% buffer)
-             if data[i].low <= alpha_trend[i] * 1.005 and data[i].close > alpha_trend[i]:
-                 # Only if we are already in a Bullish state or just confirmed it
+             if low <= alpha_trend * 1.005 and close > alpha_trend:
                  is_reentry_buy = True
 
-        if alpha_dir[i] == -1 and magic_bear:
+        if alpha_dir == -1 and magic_bear:
              # If price rallied near Alpha Trend line and closed below
-             if data[i].high >= alpha_trend[i] * 0.995 and data[i].close < alpha_trend[i]:
+             if high >= alpha_trend * 0.995 and close < alpha_trend:
                  is_reentry_sell = True
 
         # --- E. Signal Generation ---
         # Only trigger on CHANGE of consensus state or trend start
-        
         current_signal = None
         is_reentry = False
-        
+
         if is_buy:
             current_signal = "BULLISH"
         elif is_sell:
             current_signal = "BEARISH"
-        
+
         # Check Re-entry if no primary signal change
         if not current_signal:
             if is_reentry_buy:
@@ -349,73 +167,77 @@ def detect_aura(data: List[MarketData]) -> List[StrategySignal]:
             elif is_reentry_sell:
                 current_signal = "BEARISH"
                 is_reentry = True
-            
-        # Debounce: Only emit if different from last emitted signal
-        # And ensure we don't emit continuously (only on entry)
-        
-        # Actually, for visualization we might want to know the state.
-        # But StrategySignal is an event.
-        
-        should_emit = False
-        if current_signal:
-             if current_signal != last_signal_type:
-                 should_emit = True
-             elif is_reentry:
-                 # Re-entry signals can be emitted even if same direction
-                 # But we should limit frequency (e.g. not every candle)
-                 # For now, let's emit them. Frontend handles clustering?
-                 # Or maybe just emit if previous signal was long ago?
-                 # Let's emit them.
-                 should_emit = True
-
-        if should_emit:
-            # New Signal
-            signal_name = "Aura V14 Buy" if current_signal == "BULLISH" else "Aura V14 Sell"
-            if is_reentry:
-                signal_name += " (Re-entry)"
-                
-            if current_signal == "BULLISH":
-                signals.append(StrategySignal(
-                    name=signal_name,
-                    timestamp=data[i].timestamp,
-                    type="BULLISH",
-                    price=data[i].close,
-                    metadata={
-                        "sl": alpha_trend[i], # Use Alpha Trend line as SL
-                        "tp": data[i].close + (data[i].close - alpha_trend[i]) * 1.5, # 1.5R
-                        "reason": f"Alpha+Magic+Lorentz (Score: {score:.2f})"
-                    }
-                ))
-            else:
-                signals.append(StrategySignal(
-                    name=signal_name,
-                    timestamp=data[i].timestamp,
-                    type="BEARISH",
-                    price=data[i].close,
-                    metadata={
-                        "sl": alpha_trend[i],
-                        "tp": data[i].close - (alpha_trend[i] - data[i].close) * 1.5,
-                        "reason": f"Alpha+Magic+Lorentz (Score: {score:.2f})"
-                    }
-                ))
-            
-            # Update last signal type ONLY if it's a primary signal (not re-entry)
-            # Or should we update it always?
-            # If we have Buy -> Re-entry Buy -> Sell.
-            # If we don't update, then Buy -> Re-entry Buy -> Buy (ignored) -> Sell.
-            # If we update, Buy -> Re-entry Buy -> Re-entry Buy...
-            # We want to avoid spamming Re-entries.
-            # So maybe only emit re-entry if `last_signal_type` matches but it's been a while?
-            # Let's just update `last_signal_type` so subsequent identical signals are debounced by the `!=` check
-            # UNLESS it's a re-entry, which bypasses the check.
-            
-            if not is_reentry:
-                last_signal_type = current_signal
-            else:
-                # For re-entry, we don't change the "major trend" state.
-                # But we might want to prevent back-to-back re-entries?
-                # The logic `if current_signal != last_signal_type` handles the major switch.
-                # `elif is_reentry` handles the minor ones.
-                pass
+
+        # Debounce: Only emit if different from last emitted signal.
+        # Re-entry signals bypass the check and can be emitted in the same direction.
+        if not current_signal:
+            return None
+        if current_signal == self.last_signal_type and not is_reentry:
+            return None
+
+        # Update last signal type ONLY for primary signals: re-entry doesn't change
+        # the "major trend" state, so subsequent identical signals stay debounced.
+        if not is_reentry:
+            self.last_signal_type = current_signal
+        return current_signal, is_reentry, score
+
+def aura_signal(timestamp: datetime, close: float, alpha_trend: float, signal_type: str,
+                is_reentry: bool, score: float) -> StrategySignal:
+    signal_name = "Aura V14 Buy" if signal_type == "BULLISH" else "Aura V14 Sell"
+    if is_reentry:
+        signal_name += " (Re-entry)"
+
+    if signal_type == "BULLISH":
+        tp = close + (close - alpha_trend) * 1.5 # 1.5R
+    else:
+        tp = close - (alpha_trend - close) * 1.5
+    return StrategySignal(
+        name=signal_name,
+        timestamp=timestamp,
+        type=signal_type,
+        price=close,
+        metadata={
+            "sl": alpha_trend, # Use Alpha Trend line as SL
+            "tp": tp,
+            "reason": f"Alpha+Magic+Lorentz (Score: {score:.2f})"
+        }
+    )
+
+# --- Main Strategy ---
+
+def detect_aura(data: BarSeries, alpha_p: int = ALPHA_P, magic_p: int = MAGIC_P,
+                score_threshold: float = SCORE_THRESHOLD) -> List[StrategySignal]:
+    """
+    Aura V14 Strategy Implementation (Revised)
+    Based on Triple Consensus:
+    1. Alpha Trend (MFI-based Trailing Stop)
+    2. Magic Trend (CCI-based Momentum)
+    3. Lorentzian Score (Proxy using RSI/MFI/ADX Weighted Momentum)
+    Replay penuh; untuk update per bar lihat app.services.aura_engine.
+    alpha_p: periode MFI/ATR (Alpha Trend), magic_p: periode CCI (Magic Trend),
+    score_threshold: ambang Lorentzian score.
+    """
+    signals = []
+    if len(data) < MIN_BARS:
+        return signals
+
+    # 1. Indicators
+    # Lewat indicator_cache: ATR dipakai bersama RBD, RSI/MFI/ADX bersama pemanggil lain
+    mfi = cached(indicators.mfi, data, alpha_p).tolist()
+    atr = cached(indicators.atr, data, alpha_p).tolist()
+    cci = cached(indicators.cci, data, magic_p).tolist()
+    _, _, adx = cached(indicators.dmi, data, ADX_P)
+    adx = adx.tolist()
+    rsi = cached(indicators.rsi, data, RSI_P).tolist()
+
+    high = data.high.tolist()
+    low = data.low.tolist()
+    close = data.close.tolist()
+
+    state = AuraState(score_threshold)
+    for i in range(len(data)):
+        hit = state.step(high[i], low[i], close[i], mfi[i], atr[i], cci[i], adx[i], rsi[i])
+        if hit:
+            signals.append(aura_signal(data.datetime_at(i), close[i], state.alpha_trend, *hit))
 
     return signals
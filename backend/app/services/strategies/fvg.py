@@ -1,7 +1,24 @@
 from typing import List
-from app.models.schemas import MarketData, StrategySignal
+import numpy as np
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
+from app.services import indicators
+from app.services.indicator_cache import cached
 
-def detect_fvg(data: List[MarketData]) -> List[StrategySignal]:
+def fvg_mask(data: BarSeries) -> np.ndarray:
+    """
+    Mask Bullish FVG untuk seluruh series sekaligus (index i = candle ketiga).
+    """
+    mask = np.zeros(len(data), dtype=bool)
+    if len(data) < 3:
+        return mask
+    # 1. Middle candle bullish, 2. Low candle ketiga di atas High candle pertama
+    is_bullish_middle = data.close[1:-1] > data.open[1:-1]
+    gap_exists = cached(indicators.gap_up, data)[2:]
+    mask[2:] = is_bullish_middle & gap_exists
+    return mask
+
+def detect_fvg(data: BarSeries) -> List[StrategySignal]:
     """
     Detects Bullish Fair Value Gaps (FVG).
     Pattern:
@@ -17,35 +34,28 @@ def detect_fvg(data: List[MarketData]) -> List[StrategySignal]:
     if len(data) < 3:
         return signals
 
-    for i in range(2, len(data)):
-        first = data[i-2]
-        middle = data[i-1]
-        third = data[i]
+    hits = np.flatnonzero(fvg_mask(data))
+    if len(hits) == 0:
+        return signals
+
+    fvg_top = data.low[hits]
+    fvg_bottom = data.high[hits - 2]
+    mid_price = ((fvg_top + fvg_bottom) / 2).tolist()
+    fvg_top = fvg_top.tolist()
+    fvg_bottom = fvg_bottom.tolist()
+    prices = data.close[hits].tolist()
+    timestamps = data.datetimes(hits)
 
-        # Bullish FVG
-        # 1. Middle candle should be bullish (optional but typical for strong FVG)
-        is_bullish_middle = middle.close > middle.open
-        
-        # 2. Gap Exists
-        gap_exists = third.low > first.high
-        
-        if is_bullish_middle and gap_exists:
-            # Valid Bullish FVG
-            fvg_top = third.low
-            fvg_bottom = first.high
-            
-            # Check if gap is significant (optional threshold, e.g., > 0.1% price)
-            # For now, we take all gaps.
-            
-            signals.append(StrategySignal(
-                name="Bullish FVG",
-                timestamp=third.timestamp, # Signal confirmed at close of 3rd candle
-                type="BULLISH",
-                price=third.close,
-                metadata={
-                    "fvg_top": fvg_top,
-                    "fvg_bottom": fvg_bottom,
-                    "mid_price": (fvg_top + fvg_bottom) / 2
-                }
-            ))
+    for n in range(len(hits)):
+        signals.append(StrategySignal(
+            name="Bullish FVG",
+            timestamp=timestamps[n], # Signal confirmed at close of 3rd candle
+            type="BULLISH",
+            price=prices[n],
+            metadata={
+                "fvg_top": fvg_top[n],
+                "fvg_bottom": fvg_bottom[n],
+                "mid_price": mid_price[n]
+            }
+        ))
     return signals
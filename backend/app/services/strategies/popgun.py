@@ -1,64 +1,78 @@
 from typing import List, Dict
-from app.models.schemas import MarketData, StrategySignal
+import numpy as np
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
 
-def detect_popgun(data: List[MarketData]) -> List[StrategySignal]:
+def popgun_mask(data: BarSeries) -> np.ndarray:
+    """
+    Mask bar PopGun untuk seluruh series sekaligus (index i = bar popgun).
+    Bar[i-2] = mother, Bar[i-1] = inside, Bar[i] = popgun.
+    """
+    high, low = data.high, data.low
+    mask = np.zeros(len(data), dtype=bool)
+    if len(data) < 3:
+        return mask
+
+    # Inside Bar: Bar[i-1] di dalam range Bar[i-2]
+    is_inside = (high[1:-1] <= high[:-2]) & (low[1:-1] >= low[:-2])
+    # PopGun Bar: range lebih besar dari inside bar dan menembus high/low-nya
+    inside_range = high[1:-1] - low[1:-1]
+    popgun_range = high[2:] - low[2:]
+    is_larger = popgun_range > inside_range
+    broke_out = (high[2:] > high[1:-1]) | (low[2:] < low[1:-1])
+
+    mask[2:] = is_inside & is_larger & broke_out
+    return mask
+
+def detect_popgun(data: BarSeries) -> List[StrategySignal]:
     signals = []
     if len(data) < 3:
         return signals
 
-    for i in range(2, len(data)):
-        mother = data[i-2]
-        inside = data[i-1]
-        popgun = data[i]
+    hits = np.flatnonzero(popgun_mask(data))
+    if len(hits) == 0:
+        return signals
+
+    # Target dihitung sekaligus untuk semua hit
+    pg_high = data.high[hits]
+    pg_low = data.low[hits]
+    pg_height = pg_high - pg_low
+    long_tp = [(pg_high + (k * pg_height)).tolist() for k in (1.0, 2.0, 3.0)]
+    short_tp = [(pg_low - (k * pg_height)).tolist() for k in (1.0, 2.0, 3.0)]
+    pg_high = pg_high.tolist()
+    pg_low = pg_low.tolist()
+    prices = data.close[hits].tolist()
+    timestamps = data.datetimes(hits)
 
-        # Check for Inside Bar (Bar[i-1] inside Bar[i-2])
-        is_inside = inside.high <= mother.high and inside.low >= mother.low
-        
-        if is_inside:
-            inside_range = inside.high - inside.low
-            popgun_range = popgun.high - popgun.low
-            
-            # Check for PopGun Bar (Bar[i] bigger than Bar[i-1])
-            # And typically breaks out of the inside bar's range
-            is_larger = popgun_range > inside_range
-            
-            # Check if it broke the inside bar's high or low
-            broke_high = popgun.high > inside.high
-            broke_low = popgun.low < inside.low
-            
-            if is_larger and (broke_high or broke_low):
-                # Valid PopGun Pattern
-                pg_height = popgun.high - popgun.low
-                
-                # Calculate Targets
-                targets = {
-                    "long": {
-                        "entry": popgun.high,
-                        "tp1": popgun.high + (1.0 * pg_height),
-                        "tp2": popgun.high + (2.0 * pg_height),
-                        "tp3": popgun.high + (3.0 * pg_height),
-                        "sl": popgun.low
-                    },
-                    "short": {
-                        "entry": popgun.low,
-                        "tp1": popgun.low - (1.0 * pg_height),
-                        "tp2": popgun.low - (2.0 * pg_height),
-                        "tp3": popgun.low - (3.0 * pg_height),
-                        "sl": popgun.high
-                    }
-                }
+    for n, i in enumerate(hits.tolist()):
+        targets = {
+            "long": {
+                "entry": pg_high[n],
+                "tp1": long_tp[0][n],
+                "tp2": long_tp[1][n],
+                "tp3": long_tp[2][n],
+                "sl": pg_low[n]
+            },
+            "short": {
+                "entry": pg_low[n],
+                "tp1": short_tp[0][n],
+                "tp2": short_tp[1][n],
+                "tp3": short_tp[2][n],
+                "sl": pg_high[n]
+            }
+        }
 
-                signals.append(StrategySignal(
-                    name="PopGun",
-                    timestamp=popgun.timestamp,
-                    type="NEUTRAL",  # Neutral until breakout confirms direction
-                    price=popgun.close,
-                    metadata={
-                        "mother_idx": i-2,
-                        "inside_idx": i-1,
-                        "popgun_idx": i,
-                        "targets": targets
-                    }
-                ))
+        signals.append(StrategySignal(
+            name="PopGun",
+            timestamp=timestamps[n],
+            type="NEUTRAL",  # Neutral until breakout confirms direction
+            price=prices[n],
+            metadata={
+                "mother_idx": i-2,
+                "inside_idx": i-1,
+                "popgun_idx": i,
+                "targets": targets
+            }
+        ))
     
     return signals
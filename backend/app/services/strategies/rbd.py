@@ -1,130 +1,107 @@
-from typing import List, Optional
-from datetime import datetime, timezone
-import math
-from app.models.schemas import MarketData, StrategySignal
-from .utils import calculate_atr
+from typing import List
+import numpy as np
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
+from app.services import indicators
+from app.services.indicator_cache import cached
 
-def detect_rbd(data: List[MarketData]) -> List[StrategySignal]:
+def _first_per_segment(qualify: np.ndarray, segment: np.ndarray) -> np.ndarray:
+    """
+    Posisi bar pertama yang lolos di setiap segmen (FVG dikonsumsi oleh sinyal pertama).
+    """
+    positions = np.flatnonzero(qualify)
+    _, first = np.unique(segment[positions], return_index=True)
+    return positions[first]
+
+def _forward_fill(values: np.ndarray, has_value: np.ndarray, default) -> np.ndarray:
+    # Nilai terakhir yang di-set sampai bar ini (default sebelum ada nilai)
+    last = np.maximum.accumulate(np.where(has_value, np.arange(len(values)), -1))
+    return np.where(last >= 0, values[np.maximum(last, 0)], default)
+
+def detect_rbd(data: BarSeries, lookback: int = 20, atr_mult: float = 1.0) -> List[StrategySignal]:
     """
     Replaced with High-Prob SMC: MSS + FVG Retest Strategy.
     Original RBD function name kept for compatibility.
+    lookback: jumlah candle sebelumnya untuk highest high / lowest low (MSS).
+    atr_mult: jarak SL dalam ATR (TP = 3x jarak SL).
     """
     signals = []
     if len(data) < 25:
         return signals
 
-    # Parameters
-    lookback = 20
-    atr_mult = 2.0
-    use_timer = True
-    
     # ATR Calculation
-    atr_values = calculate_atr(data, period=14)
-    
-    # State Variables
-    bull_structure = False
-    bear_structure = False
+    atr = cached(indicators.atr, data, 14)
     
-    bull_fvg_top: Optional[float] = None
-    bear_fvg_bot: Optional[float] = None
-    
-    # Helper for Time Filter (NY Session 07:30 - 12:00)
-    # Only apply time filter if data interval is intraday (less than 1 day)
-    # Since we don't have interval info here, we can infer from timestamp diffs, 
-    # but simplest is to just DISABLE it for now as it causes issues on Weekly/Daily.
-    # The user complained about 0% win rate on Weekly.
-    
-    def is_in_time(ts: datetime):
-        # Disable time filter for now to ensure signals on higher timeframes
-        return True
+    # Time filter (NY Session 07:30 - 12:00) sengaja tidak dipakai: menyebabkan
+    # masalah di Weekly/Daily (0% win rate). Interval tidak diketahui di sini.
+
+    n = len(data)
+    high, low, close = data.high, data.low, data.close
+    bars = np.arange(lookback, n)
+    if len(bars) == 0:
+        return signals
+    c = close[lookback:]
+
+    # 1. Structure (MSS)
+    # Highest High / Lowest Low of previous 'lookback' candles (excluding current),
+    # Window: [i-lookback, ..., i-1] -> rolling window yang berakhir di i-1
+    high_h = indicators.rolling_max(high, lookback)[lookback - 1:n - 1]
+    low_l = indicators.rolling_min(low, lookback)[lookback - 1:n - 1]
+    # Break of Structure (close crossover/crossunder); bearish menang jika keduanya terjadi
+    event = np.where(c < low_l, -1, np.where(c > high_h, 1, 0))
+    structure = _forward_fill(event, event != 0, 0)
+    bull_structure = structure == 1
+    bear_structure = structure == -1
+
+    # 2. FVG Detection (i, i-1, i-2)
+    # Bull FVG: Low[0] > High[2] AND Close[1] > High[2] (Valid gap up)
+    bull_fvg = cached(indicators.gap_up, data)[lookback:] & (close[bars - 1] > high[bars - 2])
+    # Bear FVG: High[0] < Low[2] AND Close[1] < Low[2] (Valid gap down)
+    bear_fvg = cached(indicators.gap_down, data)[lookback:] & (close[bars - 1] < low[bars - 2])
+    bull_fvg_top = _forward_fill(high[bars - 2], bull_fvg, np.nan)
+    bear_fvg_bot = _forward_fill(low[bars - 2], bear_fvg, np.nan)
 
-    for i in range(lookback, len(data)):
-        current = data[i]
-        prev = data[i-1]
-        
-        # 1. Update Structure (MSS)
-        # Calculate Highest High / Lowest Low of previous 'lookback' candles (excluding current)
-        # Window: [i-lookback, ..., i-1]
-        window = data[i-lookback:i]
-        high_h = max(c.high for c in window)
-        low_l = min(c.low for c in window)
-        
-        # Check Crossover/Crossunder of CLOSE
-        
-        # Logic: Break of Structure
-        if current.close > high_h:
-            bull_structure = True
-            bear_structure = False
-            
-        if current.close < low_l:
-            bear_structure = True
-            bull_structure = False
-            
-        # 2. FVG Detection
-        # Needs i, i-1, i-2
-        c0 = data[i]   # Current
-        c1 = data[i-1] # Previous
-        c2 = data[i-2] # 2 bars ago
-        
-        # Bull FVG: Low[0] > High[2] AND Close[1] > High[2] (Valid gap up)
-        if c0.low > c2.high and c1.close > c2.high:
-            bull_fvg_top = c2.high
-            
-        # Bear FVG: High[0] < Low[2] AND Close[1] < Low[2] (Valid gap down)
-        if c0.high < c2.low and c1.close < c2.low:
-            bear_fvg_bot = c2.low
-            
-        # 3. High Probability Signals (Retest)
-        atr = atr_values[i] if i < len(atr_values) else 0
-        if atr == 0: continue # Skip if ATR not ready
+    # 3. High Probability Signals (Retest), skip jika ATR belum siap
+    atr_ready = atr[bars] != 0
+    # Buy: Bull Structure + Low menyentuh FVG Top dan close di atasnya
+    bull_hit = bull_structure & atr_ready & (low[bars] <= bull_fvg_top) & (c > bull_fvg_top)
+    # Sell: Bear Structure + High menyentuh FVG Bottom dan close di bawahnya
+    bear_hit = bear_structure & atr_ready & (high[bars] >= bear_fvg_bot) & (c < bear_fvg_bot)
 
-        # Buy Signal: Bull Structure + Price Retests Bull FVG
-        # We want to catch the bounce.
-        # Strict Retest: Low touches FVG Top.
-        if bull_structure and bull_fvg_top is not None:
-             # Check if price dipped into FVG zone (below top) but closed above?
-             # Or just simple retest logic: Low < FVG Top
-             if current.low <= bull_fvg_top and current.close > bull_fvg_top:
-                 # Signal!
-                 sl = current.low - (atr * 1.0) # Tighten SL
-                 tp = current.close + (atr * 3.0) # Reward 3:1 approx
-                 
-                 signals.append(StrategySignal(
-                    name="SMC Buy",
-                    timestamp=current.timestamp,
-                    type="BULLISH",
-                    price=current.close,
-                    metadata={
-                        "sl": sl,
-                        "tp": tp,
-                        "reason": "MSS + FVG Retest",
-                        "pivot_type": "DBR" # Legacy compatibility
-                    }
-                 ))
-                 # Reset to avoid spamming signals on same FVG?
-                 # Better to keep it active until structure breaks?
-                 # For now, consume the FVG to ensure unique signals
-                 bull_fvg_top = None
+    # Satu sinyal per FVG: FVG dikonsumsi oleh retest pertama
+    buys = _first_per_segment(bull_hit, np.cumsum(bull_fvg))
+    sells = _first_per_segment(bear_hit, np.cumsum(bear_fvg))
 
-        # Sell Signal: Bear Structure + Price Retests Bear FVG
-        if bear_structure and bear_fvg_bot is not None:
-            if current.high >= bear_fvg_bot and current.close < bear_fvg_bot:
-                # Signal!
-                sl = current.high + (atr * 1.0)
-                tp = current.close - (atr * 3.0)
-                
-                signals.append(StrategySignal(
-                    name="SMC Sell",
-                    timestamp=current.timestamp,
-                    type="BEARISH",
-                    price=current.close,
-                    metadata={
-                        "sl": sl,
-                        "tp": tp,
-                        "reason": "MSS + FVG Retest",
-                        "pivot_type": "RBD" # Legacy compatibility
-                    }
-                ))
-                bear_fvg_bot = None
+    # Urutan seperti scan per bar: berdasarkan bar, Buy sebelum Sell di bar yang sama
+    hits = sorted([(int(p), 0) for p in buys] + [(int(p), 1) for p in sells])
+    for pos, side in hits:
+        i = pos + lookback
+        atr_i = float(atr[i])
+        if side == 0:
+            signals.append(StrategySignal(
+                name="SMC Buy",
+                timestamp=data.datetime_at(i),
+                type="BULLISH",
+                price=float(close[i]),
+                metadata={
+                    "sl": float(low[i]) - (atr_i * atr_mult), # Tighten SL
+                    "tp": float(close[i]) + (atr_i * atr_mult * 3.0), # Reward 3:1 approx
+                    "reason": "MSS + FVG Retest",
+                    "pivot_type": "DBR" # Legacy compatibility
+                }
+            ))
+        else:
+            signals.append(StrategySignal(
+                name="SMC Sell",
+                timestamp=data.datetime_at(i),
+                type="BEARISH",
+                price=float(close[i]),
+                metadata={
+                    "sl": float(high[i]) + (atr_i * atr_mult),
+                    "tp": float(close[i]) - (atr_i * atr_mult * 3.0),
+                    "reason": "MSS + FVG Retest",
+                    "pivot_type": "RBD" # Legacy compatibility
+                }
+            ))
 
     return signals
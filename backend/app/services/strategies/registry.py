@@ -0,0 +1,121 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models.schemas import StrategySignal
+from app.services.bar_series import BarSeries
+
+class StrategySpec:
+    """
+    Metadata satu strategi. Modul strategi baru di-import saat pertama kali dipakai.
+
+    - warmup: jumlah bar minimum sebelum strategi bisa menghasilkan sinyal
+    - params: parameter (dan default) yang bisa di-override lewat detect(**params)
+    - indicators: indikator yang dibaca (nama indicators.*, dengan parameter)
+    - incremental: punya engine incremental (lihat aura_engine)
+    - backtest: order model di trade_engine.ORDER_MODELS (None = belum didukung)
+    - paper_entry: aturan entry paper trader (None = belum didukung)
+    """
+
+    def __init__(self, name: str, module: str, function: str, title: str, warmup: int,
+                 params: Optional[Dict[str, Any]] = None, indicators: Tuple[str, ...] = (),
+                 incremental: bool = False, backtest: Optional[str] = None, paper_entry: Optional[str] = None):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.title = title
+        self.warmup = warmup
+        self.params = dict(params or {})
+        self.indicators = indicators
+        self.incremental = incremental
+        self.backtest = backtest
+        self.paper_entry = paper_entry
+        self._detector: Optional[Callable[..., List[StrategySignal]]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def slug(self) -> str:
+        return self.name.lower()
+
+    @property
+    def loaded(self) -> bool:
+        return self._detector is not None
+
+    def import_module(self):
+        return importlib.import_module(f"{__package__}.{self.module}")
+
+    def load(self) -> Callable[..., List[StrategySignal]]:
+        if self._detector is None:
+            with self._lock:
+                if self._detector is None:
+                    self._detector = getattr(self.import_module(), self.function)
+        return self._detector
+
+    def detect(self, data: BarSeries, **params) -> List[StrategySignal]:
+        unknown = set(params) - set(self.params)
+        if unknown:
+            raise ValueError(f"Parameter tidak dikenal untuk {self.name}: {', '.join(sorted(unknown))}")
+        return self.load()(data, **{**self.params, **params})
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "slug": self.slug,
+            "title": self.title,
+            "warmup": self.warmup,
+            "params": self.params,
+            "indicators": list(self.indicators),
+            "incremental": self.incremental,
+            "backtest": self.backtest is not None,
+            "paper_trading": self.paper_entry is not None,
+            "loaded": self.loaded,
+        }
+
+class StrategyRegistry:
+    def __init__(self):
+        self._specs: Dict[str, StrategySpec] = {}
+
+    def register(self, spec: StrategySpec) -> StrategySpec:
+        self._specs[spec.name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[StrategySpec]:
+        """
+        Cari strategi berdasarkan nama ("POPGUN") atau slug ("popgun").
+        """
+        return self._specs.get(name.upper())
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def specs(self) -> List[StrategySpec]:
+        return list(self._specs.values())
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [spec.metadata() for spec in self._specs.values()]
+
+# Singleton instance
+registry = StrategyRegistry()
+
+registry.register(StrategySpec(
+    "POPGUN", "popgun", "detect_popgun", "PopGun (inside bar breakout)",
+    warmup=3, backtest="breakout", paper_entry="breakout",
+))
+registry.register(StrategySpec(
+    "FVG", "fvg", "detect_fvg", "Bullish Fair Value Gap",
+    warmup=3, indicators=("gap_up",), backtest="fvg_retest", paper_entry="fvg_retest",
+))
+registry.register(StrategySpec(
+    "RBD", "rbd", "detect_rbd", "SMC: MSS + FVG Retest",
+    warmup=25, params={"lookback": 20, "atr_mult": 1.0},
+    indicators=("atr:14", "gap_up", "gap_down", "rolling_max", "rolling_min"), backtest="bracket",
+))
+registry.register(StrategySpec(
+    "AURA", "aura", "detect_aura", "Aura V14 (Alpha + Magic + Lorentzian)",
+    warmup=50, params={"alpha_p": 14, "magic_p": 20, "score_threshold": 0.03},
+    indicators=("mfi:alpha_p", "atr:alpha_p", "cci:magic_p", "dmi:14", "rsi:14"),
+    incremental=True, backtest="bracket", paper_entry="signal",
+))
+registry.register(StrategySpec(
+    "VOLUME_SURPRISE", "volume_surprise", "detect_volume_surprise", "Volume Surprise (seasonal volume)",
+    warmup=50, params={"baseline": "mean", "surprise_threshold": 1.5}, indicators=("volume_profile",), backtest="bracket",
+))
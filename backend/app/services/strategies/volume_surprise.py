@@ -1,61 +1,60 @@
 from typing import List, Dict, Optional, Any
-from collections import defaultdict
-from datetime import datetime
-from ...models.schemas import MarketData, StrategySignal
+import numpy as np
+from ...models.schemas import StrategySignal
+from ..bar_series import BarSeries
+from ..volume_profile import SeasonalityProfile, baseline_quantile, slot_ids
 
-def analyze_volume_surprise(data: List[MarketData], lookback_periods: int = 20) -> List[Dict[str, Any]]:
+def analyze_volume_surprise(data: BarSeries, lookback_periods: int = 20, expected: Optional[np.ndarray] = None,
+                            baseline: str = "mean") -> List[Dict[str, Any]]:
     """
     Analyzes volume data and calculates expected volume based on time-based grouping.
     Returns a list of dictionaries containing analysis for each candle.
+    expected: expected volume per bar dari volume_profiles (profil persisten); jika None
+    profil dibangun dari data ini saja.
+    baseline: "mean" (rata-rata lookback_periods volume slot), "median" atau "pNN"
+    (kuantil sketch seluruh histori slot, tahan terhadap spike tunggal).
     """
     results = []
     if not data:
         return results
 
-    # Group volumes by "Period Key"
-    # Key strategy: Group by (Weekday, Hour, Minute) to capture time-of-day seasonality.
-    volume_history = defaultdict(list)
-    
-    for i in range(len(data)):
-        current = data[i]
-        key = f"{current.timestamp.weekday()}-{current.timestamp.hour}-{current.timestamp.minute}"
-        history = volume_history[key]
+    if expected is None:
+        # Group volumes by slot (Weekday, Hour, Minute) to capture time-of-day seasonality.
+        # Slot dengan histori < 3 memakai rata-rata 20 bar terakhir tanpa melihat slot.
+        profile = SeasonalityProfile(lookback_periods, quantile=baseline_quantile(baseline))
+        expected = profile.process(slot_ids(data), data.volume)
 
-        # Calculate expected volume
-        expected_volume = 0.0
-        if len(history) >= 3:
-            # Use average of last N matching periods
-            relevant_history = history[-lookback_periods:]
-            expected_volume = sum(relevant_history) / len(relevant_history)
-        else:
-            # Not enough history for this specific time slot.
-            # Fallback: Use simple moving average of last 20 periods regardless of time
-            if i >= 20:
-                prev_vols = [d.volume for d in data[i-20:i]]
-                expected_volume = sum(prev_vols) / 20
-            else:
-                expected_volume = current.volume # No history, no surprise possible
+    timestamps = data.datetimes()
+    open_ = data.open.tolist()
+    high = data.high.tolist()
+    low = data.low.tolist()
+    close = data.close.tolist()
+    volume = data.volume.tolist()
+    expected = expected.tolist()
 
+    for i in range(len(data)):
         results.append({
-            "timestamp": current.timestamp,
-            "volume": current.volume,
-            "expected_volume": expected_volume,
-            "close": current.close,
-            "open": current.open,
-            "high": current.high,
-            "low": current.low,
-            "is_bullish": current.close > current.open
+            "timestamp": timestamps[i],
+            "volume": volume[i],
+            "expected_volume": expected[i],
+            "close": close[i],
+            "open": open_[i],
+            "high": high[i],
+            "low": low[i],
+            "is_bullish": close[i] > open_[i]
         })
 
-        # Update volume history for this key
-        volume_history[key].append(current.volume)
-    
     return results
 
-def detect_volume_surprise(data: List[MarketData]) -> List[StrategySignal]:
+def detect_volume_surprise(data: BarSeries, expected: Optional[np.ndarray] = None, baseline: str = "mean",
+                           analysis: Optional[List[Dict[str, Any]]] = None, surprise_threshold: float = 1.5) -> List[StrategySignal]:
     """
     Volume Surprise Strategy based on LuxAlgo logic.
     Detects when current volume significantly exceeds the expected volume for that specific time/day.
+    expected, baseline: lihat analyze_volume_surprise.
+    analysis: hasil analyze_volume_surprise yang sudah ada (dipakai ulang, tidak dihitung lagi).
+    surprise_threshold: rasio volume / expected minimum untuk sinyal (default 1.5,
+    diturunkan dari 2.0 untuk menangkap lebih banyak volume event signifikan).
     """
     signals = []
     if len(data) < 50:
@@ -63,10 +62,9 @@ def detect_volume_surprise(data: List[MarketData]) -> List[StrategySignal]:
 
     # Configuration
     lookback_periods = 20 
-    surprise_threshold = 1.5 # Lowered from 2.0 to 1.5 to catch more significant volume events
     min_volume = 1000 # Minimum volume filter to avoid low liquidity noise
 
-    analysis_results = analyze_volume_surprise(data, lookback_periods)
+    analysis_results = analysis if analysis is not None else analyze_volume_surprise(data, lookback_periods, expected, baseline)
 
     for i, res in enumerate(analysis_results):
         current_volume = res["volume"]
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import numpy as np
+from ..models.schemas import MarketData
+from .bar_series import BarSeries
+from .upstream import UpstreamUnavailable
+
+try:
+    import websockets
+except ImportError:  # Tanpa websockets, semua feed memakai poller
+    websockets = None
+
+# Konfigurasi streaming (bisa di-override lewat env)
+STREAM_RING_SIZE = int(os.getenv("STREAM_RING_SIZE", "500"))
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "1"))
+# Batas interval poll saat upstream sibuk (poll ditolak -> interval feed digandakan sampai batas
+# ini). Dijaga di bawah STREAM_MAX_AGE supaya candle live tidak dianggap basi.
+STREAM_POLL_MAX_INTERVAL = float(os.getenv("STREAM_POLL_MAX_INTERVAL", "10"))
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "60"))
+STREAM_MAX_AGE = float(os.getenv("STREAM_MAX_AGE", "30"))
+BINANCE_WS = os.getenv("BINANCE_WS", "wss://stream.binance.com:9443/ws")
+
+class BarRing:
+    """
+    Ring buffer ukuran tetap untuk N bar terakhir satu symbol/interval.
+    Bar dengan timestamp sama dengan bar terakhir menimpa (update candle berjalan).
+    push berjalan di event loop sedangkan to_series/snapshot dipanggil dari thread
+    pool, jadi keduanya dijaga satu lock (slot tidak ditimpa saat sedang di-copy).
+    """
+
+    def __init__(self, size: int = STREAM_RING_SIZE):
+        self.size = size
+        self.timestamp = np.zeros(size, dtype=np.int64)
+        self.ohlcv = np.zeros((5, size), dtype=np.float64)
+        self.count = 0
+        self.head = 0 # Posisi tulis berikutnya
+        self.version = 0 # Bertambah setiap push (untuk cache hasil merge)
+        self._lock = threading.Lock()
+
+    def push(self, ts: int, open: float, high: float, low: float, close: float, volume: float):
+        with self._lock:
+            last = (self.head - 1) % self.size
+            if self.count > 0 and ts < self.timestamp[last]:
+                return # Bar lebih lama dari yang sudah ada, abaikan
+            replace = self.count > 0 and self.timestamp[last] == ts
+            pos = last if replace else self.head
+            self.timestamp[pos] = ts
+            self.ohlcv[:, pos] = (open, high, low, close, volume)
+            if not replace:
+                self.head = (self.head + 1) % self.size
+                self.count = min(self.count + 1, self.size)
+            self.version += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def snapshot(self, tz: Optional[str] = None) -> Tuple[int, BarSeries]:
+        """
+        Copy isi ring (urut dari bar paling lama ke terbaru) beserta versinya.
+        """
+        with self._lock:
+            order = (np.arange(self.count) + self.head - self.count) % self.size
+            return self.version, BarSeries(self.timestamp[order], *self.ohlcv[:, order], tz=tz)
+
+    def to_series(self, tz: Optional[str] = None) -> BarSeries:
+        return self.snapshot(tz)[1]
+
+class LiveFeed:
+    """
+    State satu subscription upstream: candle yang sedang berjalan + ring bar closed.
+    """
+
+    def __init__(self, key: str, ring_size: int = STREAM_RING_SIZE):
+        self.key = key
+        self.ring = BarRing(ring_size)
+        self.live: Optional[MarketData] = None
+        self.updated_at = 0.0
+        self.last_read = time.time()
+        self.task: Optional[asyncio.Task] = None
+        # (fingerprint series, versi ring, hasil) merge terakhir
+        self.merged: Optional[Tuple[tuple, int, BarSeries]] = None
+
+    def apply(self, candle: MarketData, closed: bool = False):
+        ts = int(candle.timestamp.timestamp())
+        if self.live is not None and int(self.live.timestamp.timestamp()) < ts:
+            # Candle baru dimulai: candle sebelumnya dianggap sudah close
+            prev = self.live
+            self.ring.push(int(prev.timestamp.timestamp()), prev.open, prev.high, prev.low, prev.close, prev.volume)
+        if closed:
+            self.ring.push(ts, candle.open, candle.high, candle.low, candle.close, candle.volume)
+        self.live = candle
+        self.updated_at = time.time()
+
+class StreamManager:
+    """
+    Satu subscription upstream per symbol/interval, dibagi oleh semua pembaca.
+
+    Crypto memakai WebSocket kline Binance; sisanya (atau jika WebSocket gagal)
+    memakai poller yang memanggil fungsi REST setiap STREAM_POLL_INTERVAL detik
+    (diperlambat sampai STREAM_POLL_MAX_INTERVAL selama upstream menolak poll).
+    Pembaca (get_latest_candle) hanya melakukan lookup memory, dan bar closed di
+    ring digabung ke histori lewat merge_recent. Feed yang tidak dibaca selama
+    STREAM_IDLE_TIMEOUT detik dihentikan otomatis.
+    """
+
+    def __init__(self, ring_size: int = STREAM_RING_SIZE, poll_interval: float = STREAM_POLL_INTERVAL,
+                 idle_timeout: float = STREAM_IDLE_TIMEOUT, max_age: float = STREAM_MAX_AGE,
+                 ws_url: str = BINANCE_WS, max_poll_interval: float = STREAM_POLL_MAX_INTERVAL):
+        self.ring_size = ring_size
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(max_poll_interval, poll_interval)
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.ws_url = ws_url
+        self.feeds: Dict[str, LiveFeed] = {}
+
+    def latest(self, key: str) -> Optional[MarketData]:
+        """
+        Candle berjalan terbaru dari memory, atau None jika belum ada / sudah terlalu lama.
+        """
+        feed = self.feeds.get(key)
+        if feed is None:
+            return None
+        feed.last_read = time.time()
+        if feed.live is None or time.time() - feed.updated_at > self.max_age:
+            return None
+        return feed.live.model_copy()
+
+    def recent_bars(self, key: str, tz: Optional[str] = None) -> Optional[BarSeries]:
+        feed = self.feeds.get(key)
+        if feed is None:
+            return None
+        return feed.ring.to_series(tz)
+
+    def merge_recent(self, key: str, series: BarSeries) -> BarSeries:
+        """
+        Tambahkan bar closed dari ring feed `key` yang belum ada di `series` (histori
+        dari cache), sehingga chart tidak menunggu refresh cache untuk bar yang baru
+        close. Bar ring menggantikan bar terakhir series jika timestamp-nya sama; bar
+        ring yang lebih lama dari bar terakhir series diabaikan.
+        """
+        feed = self.feeds.get(key)
+        if feed is None or len(feed.ring) == 0 or len(series) == 0:
+            return series
+        merged = feed.merged
+        if merged is not None and merged[0] == series.fingerprint and merged[1] == feed.ring.version:
+            return merged[2]
+        version, ring = feed.ring.snapshot(series.tz)
+        newer = ring[int(np.searchsorted(ring.timestamp, series.timestamp[-1], side="left")):]
+        result = series.concat(newer)
+        # Hasil yang sama dipakai ulang selama ring tidak berubah (indicator_cache tetap hit)
+        feed.merged = (series.fingerprint, version, result)
+        return result
+
+    def subscribe(self, key: str, poll: Callable[[], Awaitable[Optional[MarketData]]], ws_stream: Optional[str] = None):
+        """
+        Mulai feed untuk key jika belum berjalan. Harus dipanggil dari event loop.
+        poll: fungsi async yang mengambil candle terbaru via REST.
+        ws_stream: nama stream Binance (misal "btcusdt@kline_1m") jika tersedia.
+        """
+        feed = self.feeds.get(key)
+        if feed is not None and feed.task is not None and not feed.task.done():
+            feed.last_read = time.time()
+            return
+        feed = LiveFeed(key, self.ring_size)
+        self.feeds[key] = feed
+        feed.task = asyncio.create_task(self._run(feed, poll, ws_stream))
+
+    async def _run(self, feed: LiveFeed, poll, ws_stream: Optional[str]):
+        try:
+            if ws_stream and websockets is not None:
+                try:
+                    await self._run_ws(feed, ws_stream)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Stream {feed.key} WebSocket failed, falling back to polling: {e}")
+            if not self._is_idle(feed):
+                await self._run_poll(feed, poll)
+        finally:
+            if self.feeds.get(feed.key) is feed:
+                del self.feeds[feed.key]
+
+    def _is_idle(self, feed: LiveFeed) -> bool:
+        return time.time() - feed.last_read > self.idle_timeout
+
+    async def _run_ws(self, feed: LiveFeed, ws_stream: str):
+        async with websockets.connect(f"{self.ws_url}/{ws_stream}") as ws:
+            while not self._is_idle(feed):
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=self.max_age)
+                except asyncio.TimeoutError:
+                    continue
+                data = json.loads(message)
+                k = data.get("k")
+                if not k:
+                    continue
+                feed.apply(MarketData(
+                    timestamp=datetime.fromtimestamp(k["t"] / 1000, tz=timezone.utc),
+                    open=float(k["o"]),
+                    high=float(k["h"]),
+                    low=float(k["l"]),
+                    close=float(k["c"]),
+                    volume=float(k["v"])
+                ), closed=bool(k.get("x")))
+
+    async def _run_poll(self, feed: LiveFeed, poll):
+        delay = self.poll_interval
+        while not self._is_idle(feed):
+            try:
+                candle = await poll()
+                if candle is not None:
+                    feed.apply(candle)
+                delay = self.poll_interval
+            except UpstreamUnavailable:
+                # Upstream sibuk / circuit open: perlambat feed ini, jangan berebut token dengan fetch data
+                delay = min(delay * 2, self.max_poll_interval)
+            except Exception as e:
+                print(f"Stream {feed.key} poll failed: {e}")
+            await asyncio.sleep(delay)
+
+    async def stop_all(self):
+        tasks = [f.task for f in self.feeds.values() if f.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.feeds.clear()
@@ -0,0 +1,274 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.models.schemas import StrategySignal, BacktestSummary, TradeResult
+from .bar_series import BarSeries
+from .first_touch import first_high_at_or_above, first_low_at_or_below, simulate_exits, WIN, LOSS
+
+# Trade engine generik: sinyal strategi apa pun dinormalisasi menjadi order spec
+# (tipe entry, harga entry, SL, TP, arah, expiry), lalu semua order disimulasikan
+# sekaligus lewat first_touch dan hasilnya dikembalikan sebagai kolom array.
+
+ENTRY_MARKET, ENTRY_STOP, ENTRY_LIMIT = 0, 1, 2
+STATUS_NAMES = {WIN: "WIN", LOSS: "LOSS", 0: "OPEN"}
+
+def _bracket_valid(entry: float, sl: float, tp: float, long: bool) -> bool:
+    # SL dan TP harus di sisi yang benar dari entry, kalau tidak status WIN/LOSS tidak sesuai PnL
+    return sl < entry < tp if long else tp < entry < sl
+
+# Order model per strategi (StrategySpec.backtest): sinyal -> (tipe entry, entry, sl, tp, long) atau None (skip)
+def _order_breakout(signal: StrategySignal) -> Optional[Tuple[int, float, float, float, bool]]:
+    # PopGun: stop order di atas inside bar, target TP1 (Long Setup)
+    targets = signal.metadata.get("targets")
+    if not targets:
+        return None
+    long_setup = targets["long"]
+    if not _bracket_valid(long_setup["entry"], long_setup["sl"], long_setup["tp1"], True):
+        return None
+    return ENTRY_STOP, long_setup["entry"], long_setup["sl"], long_setup["tp1"], True
+
+def _order_fvg_retest(signal: StrategySignal) -> Optional[Tuple[int, float, float, float, bool]]:
+    # FVG: buy limit di top FVG, stop di bottom, target 1.5R
+    entry, stop_loss = signal.metadata["fvg_top"], signal.metadata["fvg_bottom"]
+    risk = entry - stop_loss
+    if risk <= 0:
+        return None
+    return ENTRY_LIMIT, entry, stop_loss, entry + (1.5 * risk), True
+
+def _order_bracket(signal: StrategySignal) -> Optional[Tuple[int, float, float, float, bool]]:
+    # Entry di close candle sinyal dengan SL/TP dari metadata (RBD, Aura, Volume Surprise)
+    sl, tp = signal.metadata.get("sl"), signal.metadata.get("tp")
+    if not sl or not tp or signal.type not in ("BULLISH", "BEARISH"):
+        return None
+    long = signal.type == "BULLISH"
+    if not _bracket_valid(signal.price, sl, tp, long):
+        return None
+    return ENTRY_MARKET, signal.price, sl, tp, long
+
+ORDER_MODELS: Dict[str, Callable[[StrategySignal], Optional[Tuple[int, float, float, float, bool]]]] = {
+    "breakout": _order_breakout,
+    "fvg_retest": _order_fvg_retest,
+    "bracket": _order_bracket,
+}
+
+class Orders:
+    """
+    Order spec ternormalisasi dalam bentuk kolom (satu elemen per order).
+
+    - signal_index: bar sinyal; start: bar pertama setelah sinyal (entry pending / exit dicek mulai sini)
+    - entry_type: ENTRY_MARKET (fill di close bar sinyal), ENTRY_STOP, ENTRY_LIMIT
+    - expiry: jumlah bar entry pending berlaku sejak start (-1 = sampai data habis)
+    """
+
+    def __init__(self, signal_index: np.ndarray, start: np.ndarray, entry_type: np.ndarray, entry_price: np.ndarray,
+                 sl: np.ndarray, tp: np.ndarray, long: np.ndarray, expiry: np.ndarray):
+        self.signal_index = signal_index
+        self.start = start
+        self.entry_type = entry_type
+        self.entry_price = entry_price
+        self.sl = sl
+        self.tp = tp
+        self.long = long
+        self.expiry = expiry
+
+    def __len__(self) -> int:
+        return len(self.signal_index)
+
+def build_orders(data: BarSeries, signals: List[StrategySignal], model: str, expiry: Optional[int] = None) -> Orders:
+    """
+    Normalisasi sinyal menjadi Orders lewat ORDER_MODELS[model]. Sinyal yang tidak ada
+    di data atau ada di bar terakhir (tidak bisa disimulasikan) dilewati.
+    """
+    order_model = ORDER_MODELS[model]
+    timestamps = data.timestamp
+    signal_ts = [int(signal.timestamp.timestamp()) for signal in signals]
+    positions = (np.searchsorted(timestamps, signal_ts, side="right") - 1).tolist()
+    last = len(data) - 1
+    rows = []
+    for signal, ts, idx in zip(signals, signal_ts, positions):
+        if idx < 0 or idx >= last or int(timestamps[idx]) != ts:
+            continue
+        order = order_model(signal)
+        if order is not None:
+            rows.append((idx, ts) + order)
+
+    columns = list(zip(*rows)) if rows else [()] * 7
+    signal_index = np.array(columns[0], dtype=np.int64)
+    # Bar pertama setelah sinyal dengan timestamp lebih besar (cegah fill/exit di candle duplikat)
+    start = np.maximum(signal_index + 1, np.searchsorted(timestamps, np.array(columns[1], dtype=np.int64), side="right"))
+    return Orders(
+        signal_index=signal_index,
+        start=start.astype(np.int64),
+        entry_type=np.array(columns[2], dtype=np.int8),
+        entry_price=np.array(columns[3], dtype=np.float64),
+        sl=np.array(columns[4], dtype=np.float64),
+        tp=np.array(columns[5], dtype=np.float64),
+        long=np.array(columns[6], dtype=bool),
+        expiry=np.full(len(rows), -1 if expiry is None else expiry, dtype=np.int64),
+    )
+
+class TradeColumns:
+    """
+    Hasil simulasi per trade dalam bentuk kolom array (hanya order yang ter-fill).
+    Exit bar OPEN = bar terakhir (ditutup di close terakhir).
+    """
+
+    def __init__(self, data: BarSeries, entry_index: np.ndarray, exit_index: np.ndarray, entry_price: np.ndarray,
+                 exit_price: np.ndarray, long: np.ndarray, status: np.ndarray, pnl: np.ndarray,
+                 pnl_percent: np.ndarray, invested: np.ndarray, realized_value: np.ndarray, exchange_rate: float = 16000):
+        self.data = data
+        self.exchange_rate = exchange_rate
+        self.entry_index = entry_index
+        self.exit_index = exit_index
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+        self.long = long
+        self.status = status
+        self.pnl = pnl
+        self.pnl_percent = pnl_percent
+        self.invested = invested
+        self.realized_value = realized_value
+
+    def __len__(self) -> int:
+        return len(self.entry_index)
+
+    def window(self, start: int, end: int) -> "TradeColumns":
+        """
+        Trade dengan entry di bar [start, end); trade yang belum exit sebelum `end`
+        ditutup OPEN di close bar end - 1 (seperti backtest yang datanya berakhir di sana).
+        """
+        select = (self.entry_index >= start) & (self.entry_index < end)
+        exit_index, exit_price, status = self.exit_index[select], self.exit_price[select], self.status[select]
+        cut = exit_index >= end
+        exit_index = np.where(cut, end - 1, exit_index)
+        exit_price = np.where(cut, self.data.close[end - 1] if end > 0 else np.nan, exit_price)
+        status = np.where(cut, 0, status)
+        entry_price, long, invested = self.entry_price[select], self.long[select], self.invested[select]
+        pnl_percent, pnl = _pnl(entry_price, exit_price, long, invested, self.exchange_rate)
+        return TradeColumns(
+            data=self.data,
+            entry_index=self.entry_index[select],
+            exit_index=exit_index,
+            entry_price=entry_price,
+            exit_price=exit_price,
+            long=long,
+            status=status,
+            pnl=pnl,
+            pnl_percent=pnl_percent * 100,
+            invested=invested,
+            realized_value=invested + pnl,
+            exchange_rate=self.exchange_rate,
+        )
+
+    def stats(self) -> Dict[str, float]:
+        total = len(self)
+        wins = int(np.count_nonzero(self.status == WIN))
+        losses = int(np.count_nonzero(self.status == LOSS))
+        return {
+            "total_trades": total,
+            "wins": wins,
+            "losses": losses,
+            "win_rate": (wins / total * 100) if total > 0 else 0,
+            "total_pnl": sum(self.pnl.tolist()),
+        }
+
+    def to_trades(self) -> List[TradeResult]:
+        entry_dates = self.data.datetimes(self.entry_index)
+        exit_dates = self.data.datetimes(self.exit_index)
+        statuses = [STATUS_NAMES[s] for s in self.status.tolist()]
+        positions = ["LONG" if l else "SHORT" for l in self.long.tolist()]
+        return [
+            TradeResult(
+                entry_date=entry_date,
+                exit_date=exit_date,
+                entry_price=entry_price,
+                exit_price=exit_price,
+                position=position,
+                status=status,
+                pnl=pnl,
+                pnl_percent=pnl_percent,
+                invested=invested,
+                realized_value=realized_value,
+            )
+            for entry_date, exit_date, entry_price, exit_price, position, status, pnl, pnl_percent, invested, realized_value
+            in zip(entry_dates, exit_dates, self.entry_price.tolist(), self.exit_price.tolist(), positions, statuses,
+                   self.pnl.tolist(), self.pnl_percent.tolist(), self.invested.tolist(), self.realized_value.tolist())
+        ]
+
+    def summary(self, strategy: str) -> BacktestSummary:
+        return BacktestSummary(strategy=strategy, trades=self.to_trades(), **self.stats())
+
+    def to_dict(self) -> Dict[str, list]:
+        """
+        Kolom sebagai list (JSON friendly), tanggal dalam ISO format.
+        """
+        return {
+            "entry_date": [d.isoformat() for d in self.data.datetimes(self.entry_index)],
+            "exit_date": [d.isoformat() for d in self.data.datetimes(self.exit_index)],
+            "entry_price": self.entry_price.tolist(),
+            "exit_price": self.exit_price.tolist(),
+            "position": ["LONG" if l else "SHORT" for l in self.long.tolist()],
+            "status": [STATUS_NAMES[s] for s in self.status.tolist()],
+            "pnl": self.pnl.tolist(),
+            "pnl_percent": self.pnl_percent.tolist(),
+            "invested": self.invested.tolist(),
+            "realized_value": self.realized_value.tolist(),
+        }
+
+def _pnl(entry_price: np.ndarray, exit_price: np.ndarray, long: np.ndarray, invested: np.ndarray,
+         exchange_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+    # (pnl fraksi, pnl IDR): Invested (IDR) -> USD -> PnL -> IDR
+    pnl_percent = (exit_price - entry_price) / entry_price * np.where(long, 1.0, -1.0)
+    return pnl_percent, invested / exchange_rate * pnl_percent * exchange_rate
+
+def simulate_orders(data: BarSeries, orders: Orders, initial_capital: float = 10000000,
+                    exchange_rate: float = 16000) -> TradeColumns:
+    """
+    Simulasi semua order sekaligus:
+    - MARKET fill di close bar sinyal; STOP fill saat harga menembus entry (gap melewati
+      TP langsung WIN di open); LIMIT fill saat harga kembali ke entry.
+    - Setelah fill, SL/TP dicek mulai bar fill (market: bar berikutnya), SL dulu jika
+      keduanya tersentuh di bar yang sama (konservatif). Belum tersentuh = OPEN di close terakhir.
+    - Modal per trade = initial_capital (IDR), dikonversi lewat exchange_rate.
+    """
+    n = len(data)
+    long = orders.long
+    market = orders.entry_type == ENTRY_MARKET
+    stop = orders.entry_type == ENTRY_STOP
+    # STOP long / LIMIT short: harga naik ke entry; STOP short / LIMIT long: harga turun ke entry
+    rising = stop == long
+    touch_up = first_high_at_or_above(data, orders.start, orders.entry_price)
+    touch_down = first_low_at_or_below(data, orders.start, orders.entry_price)
+    fill = np.where(market, orders.signal_index, np.where(rising, touch_up, touch_down))
+    expired = ~market & (orders.expiry >= 0) & (fill - orders.start >= orders.expiry)
+    filled = (fill < n) & ~expired
+
+    fill, long, market, stop = fill[filled], long[filled], market[filled], stop[filled]
+    entry_price, sl, tp = orders.entry_price[filled], orders.sl[filled], orders.tp[filled]
+    exit_index, status = simulate_exits(data, np.where(market, orders.start[filled], fill), sl, tp, long)
+
+    exit_price = np.where(status == LOSS, sl, np.where(status == WIN, tp, data.close[-1] if n else np.nan))
+    exit_index = np.where(status == 0, n - 1, exit_index)
+    # STOP yang gap melewati TP: langsung WIN di open bar fill (simplified)
+    if n:
+        open_fill = data.open[np.minimum(fill, n - 1)]
+        gap = stop & np.where(long, open_fill > tp, open_fill < tp)
+        exit_price = np.where(gap, open_fill, exit_price)
+        exit_index = np.where(gap, fill, exit_index)
+        status = np.where(gap, WIN, status)
+
+    invested = np.full(len(fill), float(initial_capital))
+    pnl_percent, pnl = _pnl(entry_price, exit_price, long, invested, exchange_rate)
+    return TradeColumns(
+        data=data,
+        entry_index=fill,
+        exit_index=exit_index,
+        entry_price=entry_price,
+        exit_price=exit_price,
+        long=long,
+        status=status,
+        pnl=pnl,
+        pnl_percent=pnl_percent * 100,
+        invested=invested,
+        realized_value=invested + pnl,
+        exchange_rate=exchange_rate,
+    )
@@ -0,0 +1,261 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Konfigurasi governance upstream (bisa di-override lewat env)
+YAHOO_RATE = float(os.getenv("YAHOO_RATE", "4"))  # request/detik
+YAHOO_BURST = float(os.getenv("YAHOO_BURST", "8"))
+BINANCE_RATE = float(os.getenv("BINANCE_RATE", "15"))
+BINANCE_BURST = float(os.getenv("BINANCE_BURST", "30"))
+# Token yang selalu disisakan untuk fetch data: request prioritas rendah (polling live)
+# hanya jalan jika bucket masih punya token di atas cadangan ini, dan tidak pernah menunggu
+YAHOO_POLL_RESERVE = float(os.getenv("YAHOO_POLL_RESERVE", "4"))
+BINANCE_POLL_RESERVE = float(os.getenv("BINANCE_POLL_RESERVE", "10"))
+# Lama maksimum menunggu token/backoff sebelum request ditolak (shed)
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "1"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "60"))
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+
+class UpstreamUnavailable(Exception):
+    """
+    Request ditolak tanpa menyentuh upstream (circuit open atau antrean rate limit terlalu lama).
+    """
+
+class UpstreamError(Exception):
+    """
+    Upstream membalas dengan status error (429/5xx) yang tidak dilempar oleh client-nya sendiri.
+    """
+
+    def __init__(self, status: int, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+def error_status(error: BaseException) -> Optional[int]:
+    """
+    Ambil status HTTP dari exception upstream (httpx, yfinance, UpstreamError), jika ada.
+    """
+    status = getattr(error, "status", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    if status is None and ("Too Many Requests" in str(error) or "Rate limited" in str(error)):
+        status = 429
+    return status
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Ambil satu token; return lama tunggu (detik) sampai token tersebut tersedia.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def take_spare(self, reserve: float) -> bool:
+        """
+        Ambil satu token hanya jika sisanya tetap >= reserve (tanpa antre).
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens - 1 < reserve:
+            return False
+        self.tokens -= 1
+        return True
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class HostGuard:
+    """
+    Governance untuk satu host upstream: token bucket, backoff adaptif pada 429/5xx,
+    dan circuit breaker (closed -> open setelah BREAKER_THRESHOLD kegagalan beruntun,
+    half-open setelah BREAKER_RESET detik: satu request percobaan menentukan
+    apakah circuit kembali closed).
+
+    Request prioritas rendah (polling live) memakai bucket yang sama tapi hanya
+    mengambil token di atas `reserve`, sehingga polling tidak bisa membuat fetch
+    histori menunggu / ditolak; jika tidak ada token sisa, request langsung ditolak.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_wait: float = UPSTREAM_MAX_WAIT,
+                 threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET,
+                 reserve: float = 0.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0 # Kegagalan beruntun
+        self.opened_at = 0.0
+        self.backoff = 0.0
+        self.blocked_until = 0.0
+        self._probing = False
+        # Counter
+        self.calls = 0
+        self.throttled = 0
+        self.shed = 0
+        self.deferred = 0 # Request prioritas rendah yang ditolak karena bucket sibuk
+        self.errors = 0
+        self.served_stale = 0
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def acquire(self, low_priority: bool = False) -> float:
+        """
+        Izin untuk satu request: return lama tunggu sebelum boleh memanggil upstream,
+        atau raise UpstreamUnavailable jika request harus ditolak.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < self.reset_timeout:
+                    self.shed += 1
+                    raise UpstreamUnavailable(f"{self.name}: circuit open")
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open":
+                if self._probing:
+                    self.shed += 1
+                    raise UpstreamUnavailable(f"{self.name}: circuit half-open, probe in flight")
+                self._probing = True
+
+            if low_priority:
+                if now < self.blocked_until or not self.bucket.take_spare(self.reserve):
+                    self._probing = False
+                    self.deferred += 1
+                    raise UpstreamUnavailable(f"{self.name}: busy, low-priority request deferred")
+                self.calls += 1
+                return 0.0
+
+            wait = max(self.bucket.reserve(), self.blocked_until - now)
+            if wait > self.max_wait:
+                self.bucket.refund()
+                self._probing = False
+                self.shed += 1
+                raise UpstreamUnavailable(f"{self.name}: rate limited, retry in {wait:.1f}s")
+            if wait > 0:
+                self.throttled += 1
+            self.calls += 1
+            return wait
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.backoff = 0.0
+            self.state = "closed"
+            self._probing = False
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self.errors += 1
+            self._probing = False
+            status = error_status(error)
+            if status is not None and 400 <= status < 500 and status != 429:
+                # Error klien (simbol salah, dll) bukan tanda upstream bermasalah
+                if self.state == "half_open":
+                    self.state = "closed"
+                return
+
+            if status == 429 or (status is not None and status >= 500):
+                # Backoff adaptif: dobel setiap kali, hormati Retry-After jika ada
+                self.backoff = min(UPSTREAM_BACKOFF_MAX, max(UPSTREAM_BACKOFF_BASE, self.backoff * 2))
+                retry_after = getattr(error, "retry_after", None) or self.backoff
+                self.blocked_until = time.monotonic() + retry_after
+
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    print(f"Circuit {self.name} open after {self.failures} failures: {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        # Request dibatalkan sebelum ada hasil: lepaskan slot probe half-open
+        with self._lock:
+            self._probing = False
+
+    def record_stale(self):
+        with self._lock:
+            self.served_stale += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "backoff": self.backoff,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "shed": self.shed,
+                "deferred": self.deferred,
+                "errors": self.errors,
+                "served_stale": self.served_stale,
+            }
+
+class UpstreamGuard:
+    """
+    Registry HostGuard per host. Semua panggilan upstream di fetcher lewat call()/acall().
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, HostGuard] = {
+            "yahoo": HostGuard("yahoo", YAHOO_RATE, YAHOO_BURST, reserve=YAHOO_POLL_RESERVE),
+            "binance": HostGuard("binance", BINANCE_RATE, BINANCE_BURST, reserve=BINANCE_POLL_RESERVE),
+        }
+
+    def host(self, name: str) -> HostGuard:
+        return self.hosts[name]
+
+    def call(self, name: str, fn: Callable[[], Any], low_priority: bool = False) -> Any:
+        guard = self.hosts[name]
+        wait = guard.acquire(low_priority)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            result = fn()
+        except Exception as e:
+            guard.record_failure(e)
+            raise
+        guard.record_success()
+        return result
+
+    async def acall(self, name: str, fn: Callable[[], Awaitable[Any]], low_priority: bool = False) -> Any:
+        guard = self.hosts[name]
+        wait = guard.acquire(low_priority)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            guard.release()
+            raise
+        except Exception as e:
+            guard.record_failure(e)
+            raise
+        guard.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: guard.stats() for name, guard in self.hosts.items()}
+
+# Singleton instance
+upstream = UpstreamGuard()
@@ -0,0 +1,406 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .bar_series import BarSeries
+from .bar_cache import interval_seconds
+from .quantile_sketch import KLLSketch, merge_sketches
+
+# Lokasi penyimpanan profil volume (bisa di-override lewat env VOLUME_PROFILE_DIR)
+DEFAULT_PROFILE_DIR = os.getenv("VOLUME_PROFILE_DIR", "volume_profiles")
+# Jumlah bar terakhir yang expected volume-nya disimpan per profil
+PROFILE_HISTORY = int(os.getenv("VOLUME_PROFILE_HISTORY", "5000"))
+# Jumlah profil maksimum di memory (LRU, profil yang dibuang dibaca ulang dari disk)
+VOLUME_PROFILE_MAX = int(os.getenv("VOLUME_PROFILE_MAX", "500"))
+
+SLOTS_PER_WEEK = 7 * 24 * 60
+# Ukuran sketch kuantil per slot (memory ~ k log(n/k) item, rank error ~1-2% untuk k=64)
+SKETCH_K = int(os.getenv("VOLUME_SKETCH_K", "64"))
+
+def baseline_quantile(baseline: str) -> Optional[float]:
+    """
+    Baseline expected volume: "mean" (rata-rata ring, None), "median" (0.5) atau "pNN" (NN/100).
+    """
+    baseline = baseline.lower()
+    if baseline == "mean":
+        return None
+    if baseline == "median":
+        return 0.5
+    if baseline.startswith("p") and baseline[1:].isdigit() and 0 < int(baseline[1:]) < 100:
+        return int(baseline[1:]) / 100
+    raise ValueError(f"Baseline tidak dikenal: {baseline} (gunakan mean, median atau p1..p99)")
+
+def slot_ids(data: BarSeries) -> np.ndarray:
+    """
+    Slot musiman per bar: weekday * 1440 + hour * 60 + minute (waktu lokal exchange), 0..10079.
+    """
+    index = data.to_datetime_index()
+    return np.asarray(index.weekday * 1440 + index.hour * 60 + index.minute, dtype=np.int64)
+
+class SeasonalityProfile:
+    """
+    Histori volume per slot musiman dalam ring buffer ukuran tetap.
+
+    Setiap slot yang pernah muncul mendapat satu baris ring (lookback volume
+    terakhir) beserta jumlah berjalan, sehingga rata-rata slot dan rata-rata
+    `fallback` bar terakhir (tanpa melihat slot) didapat O(1) per bar. State
+    disimpan sebagai list Python (loop per bar jauh lebih cepat daripada scalar
+    NumPy) dan dikonversi ke array saat disimpan.
+
+    Dengan `quantile` (misal 0.5), setiap slot juga punya KLLSketch atas seluruh
+    histori slot tersebut dan expected volume = kuantil sketch, sehingga spike
+    tunggal tidak menggeser baseline dan memory tetap terbatas.
+    """
+
+    def __init__(self, lookback: int = 20, fallback: int = 20, min_history: int = 3,
+                 quantile: Optional[float] = None, sketch_k: int = SKETCH_K):
+        self.lookback = lookback
+        self.fallback = fallback
+        self.min_history = min_history
+        self.quantile = quantile
+        self.sketch_k = sketch_k
+        self.sketches: List[KLLSketch] = []
+        # slot id -> baris; hanya slot yang muncul di data yang memakai ring
+        self.rows = [-1] * SLOTS_PER_WEEK
+        self.ring: List[List[float]] = []
+        self.filled: List[int] = [] # Jumlah volume yang pernah masuk per baris
+        self.sums: List[float] = []
+        self.recent = [0.0] * fallback
+        self.recent_count = 0
+        self.recent_sum = 0.0
+
+    def expected(self, slot: int) -> Optional[float]:
+        """
+        Expected volume untuk bar berikutnya di slot ini: rata-rata `lookback` volume
+        terakhir slot tersebut, atau rata-rata `fallback` bar terakhir jika histori
+        slot kurang dari min_history. None jika keduanya belum cukup.
+        """
+        row = self.rows[slot]
+        if row >= 0 and self.filled[row] >= self.min_history:
+            if self.quantile is not None:
+                return self.sketches[row].quantile(self.quantile)
+            return self.sums[row] / min(self.filled[row], self.lookback)
+        if self.recent_count >= self.fallback:
+            return self.recent_sum / self.fallback
+        return None
+
+    def push(self, slot: int, volume: float):
+        row = self.rows[slot]
+        if row < 0:
+            row = self.rows[slot] = len(self.ring)
+            self.ring.append([0.0] * self.lookback)
+            self.filled.append(0)
+            self.sums.append(0.0)
+            if self.quantile is not None:
+                self.sketches.append(KLLSketch(self.sketch_k))
+        if self.quantile is not None:
+            self.sketches[row].update(volume)
+        ring = self.ring[row]
+        pos = self.filled[row] % self.lookback
+        if pos == 0 and self.filled[row] > 0:
+            # Ring penuh satu putaran: hitung ulang jumlah dari isi ring supaya error pembulatan tidak menumpuk
+            self.sums[row] = sum(ring)
+        self.sums[row] += volume - ring[pos]
+        ring[pos] = volume
+        self.filled[row] += 1
+
+        pos = self.recent_count % self.fallback
+        if pos == 0 and self.recent_count > 0:
+            self.recent_sum = sum(self.recent)
+        self.recent_sum += volume - self.recent[pos]
+        self.recent[pos] = volume
+        self.recent_count += 1
+
+    def process(self, slots: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+        """
+        Expected volume setiap bar (dihitung sebelum bar tersebut masuk profil), lalu
+        masukkan bar ke profil. Bar tanpa histori cukup memakai volumenya sendiri.
+        """
+        out = []
+        append = out.append
+        expected_for, push = self.expected, self.push
+        for slot, volume in zip(slots.tolist(), volumes.tolist()):
+            expected = expected_for(slot)
+            append(volume if expected is None else expected)
+            push(slot, volume)
+        return np.array(out, dtype=np.float64)
+
+    def peek(self, slots: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+        # Expected volume tanpa mengubah profil (untuk candle yang masih berjalan)
+        out = [self.expected(s) for s in slots.tolist()]
+        return np.array([v if e is None else e for e, v in zip(out, volumes.tolist())], dtype=np.float64)
+
+    def slot_sketch(self, slot: int) -> Optional[KLLSketch]:
+        row = self.rows[slot]
+        return self.sketches[row] if row >= 0 and self.sketches else None
+
+    def overall_sketch(self) -> KLLSketch:
+        """
+        Distribusi volume semua slot (gabungan sketch per slot).
+        """
+        return merge_sketches(self.sketches, self.sketch_k)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        sketches = [s.to_array() for s in self.sketches]
+        return {
+            "config": np.array([self.lookback, self.fallback, self.min_history, self.recent_count, self.sketch_k], dtype=np.int64),
+            "quantile": np.array([np.nan if self.quantile is None else self.quantile]),
+            "sketch_lengths": np.array([len(a) for a in sketches], dtype=np.int64),
+            "sketch_data": np.concatenate(sketches) if sketches else np.zeros(0),
+            "rows": np.array(self.rows, dtype=np.int64),
+            "ring": np.array(self.ring, dtype=np.float64).reshape(-1, self.lookback),
+            "filled": np.array(self.filled, dtype=np.int64),
+            "sums": np.array(self.sums, dtype=np.float64),
+            "recent": np.array(self.recent, dtype=np.float64),
+            "recent_sum": np.array([self.recent_sum]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "SeasonalityProfile":
+        lookback, fallback, min_history, recent_count, sketch_k = (int(v) for v in arrays["config"])
+        quantile = float(arrays["quantile"][0])
+        obj = cls(lookback, fallback, min_history, None if np.isnan(quantile) else quantile, sketch_k)
+        ends = np.cumsum(arrays["sketch_lengths"])
+        obj.sketches = [KLLSketch.from_array(arrays["sketch_data"][end - length:end])
+                        for end, length in zip(ends.tolist(), arrays["sketch_lengths"].tolist())]
+        obj.rows = arrays["rows"].tolist()
+        obj.ring = arrays["ring"].tolist()
+        obj.filled = arrays["filled"].tolist()
+        obj.sums = arrays["sums"].tolist()
+        obj.recent = arrays["recent"].tolist()
+        obj.recent_count = recent_count
+        obj.recent_sum = float(arrays["recent_sum"][0])
+        return obj
+
+class VolumeProfile:
+    """
+    Profil musiman satu symbol/interval + expected volume bar-bar yang sudah diproses.
+    """
+
+    def __init__(self, profile: SeasonalityProfile, timestamp: np.ndarray, expected: np.ndarray):
+        self.profile = profile
+        self.timestamp = timestamp
+        self.expected = expected
+        self.seq = 0 # Bertambah setiap update, versi yang sudah ditulis ke disk = saved_seq
+        self.saved_seq = 0
+        self.save_lock = threading.Lock()
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self.timestamp[-1]) if len(self.timestamp) else None
+
+class VolumeProfileStore:
+    """
+    Profil Volume Surprise per symbol/interval yang di-update incremental.
+
+    Bar yang sudah close masuk ke profil sekali saja (dan disimpan ke disk sebagai
+    .npz), candle yang masih berjalan hanya dibaca. Jika data meminta bar yang lebih
+    tua dari histori profil, profil dibangun ulang dari data tersebut.
+
+    Profil di memory dibatasi max_profiles (LRU). Update dilakukan di bawah lock
+    global, tapi penulisan ke disk memakai snapshot array dan berjalan setelah lock
+    dilepas (berurutan per profil), jadi request lain tidak menunggu disk.
+
+    Key profil (di memory dan nama file) selalu menyertakan interval dan baseline.
+    Expected volume sebuah bar bergantung pada histori yang masuk profil sebelum bar
+    itu, jadi caller yang memakai period berbeda sebaiknya menyertakan period di key
+    (seperti aura_engines) supaya hasil tidak bergantung pada urutan request.
+    """
+
+    def __init__(self, root: str = DEFAULT_PROFILE_DIR, lookback: int = 20, history: int = PROFILE_HISTORY,
+                 max_profiles: int = VOLUME_PROFILE_MAX):
+        self.root = root
+        self.lookback = lookback
+        self.history = history
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, VolumeProfile]" = OrderedDict()
+        self.rebuilds = 0
+        self.updates = 0
+
+    @staticmethod
+    def _key(key: str, interval: str, baseline: str) -> str:
+        return f"{key}_{interval}_{baseline.lower()}"
+
+    def _path(self, key: str) -> str:
+        safe_key = "".join(c if c.isalnum() or c in ".-_" else "_" for c in key.upper())
+        return os.path.join(self.root, f"{safe_key}.npz")
+
+    def _load(self, key: str) -> Optional[VolumeProfile]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as f:
+                arrays = {name: f[name] for name in f.files}
+            profile = SeasonalityProfile.from_arrays(arrays)
+            if profile.lookback != self.lookback:
+                return None
+            return VolumeProfile(profile, arrays["timestamp"], arrays["expected"])
+        except Exception as e:
+            print(f"VolumeProfile read failed {key}: {e}")
+            return None
+
+    @staticmethod
+    def _snapshot(entry: VolumeProfile) -> Dict[str, np.ndarray]:
+        # Dipanggil di bawah lock global: to_arrays membuat array baru, timestamp/expected
+        # selalu diganti (bukan diubah in-place), jadi snapshot aman ditulis setelah lock dilepas
+        return {"timestamp": entry.timestamp, "expected": entry.expected, **entry.profile.to_arrays()}
+
+    def _save(self, key: str, entry: VolumeProfile, seq: int, arrays: Dict[str, np.ndarray]):
+        with entry.save_lock:
+            if seq <= entry.saved_seq:
+                return # Versi yang lebih baru sudah ditulis
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                path = self._path(key)
+                # Tulis ke file sementara lalu rename supaya reader tidak melihat file setengah jadi
+                tmp_file = path[:-len(".npz")] + ".tmp.npz"
+                np.savez(tmp_file, **arrays)
+                os.replace(tmp_file, path)
+                entry.saved_seq = seq
+            except Exception as e:
+                print(f"VolumeProfile write failed {key}: {e}")
+
+    def _flush(self, pending: List[Tuple[str, VolumeProfile, int, Dict[str, np.ndarray]]]):
+        # Dipanggil tanpa lock global
+        for key, entry, seq, arrays in pending:
+            self._save(key, entry, seq, arrays)
+
+    def _lookup(self, entry: VolumeProfile, timestamp: np.ndarray) -> Optional[np.ndarray]:
+        # Expected volume tersimpan untuk `timestamp`, None jika ada bar yang tidak dikenal
+        if len(timestamp) == 0:
+            return np.zeros(0)
+        pos = np.searchsorted(entry.timestamp, timestamp)
+        if pos.max() >= len(entry.timestamp) or not np.array_equal(entry.timestamp[pos], timestamp):
+            return None
+        return entry.expected[pos]
+
+    def _update(self, key: str, interval: str, data: BarSeries, quantile: Optional[float],
+                now: Optional[float], pending: list) -> Tuple[VolumeProfile, np.ndarray]:
+        """
+        Update profil `key` (harus di bawah lock global). Snapshot yang perlu ditulis ke
+        disk ditambahkan ke `pending` untuk ditulis lewat _flush setelah lock dilepas.
+        """
+        now = time.time() if now is None else now
+        ts = np.asarray(data.timestamp, dtype=np.int64)
+        # Bar close jika waktu buka + panjang interval sudah lewat
+        closed_end = int(np.searchsorted(ts, now - interval_seconds(interval), side="right"))
+
+        entry = self._profiles.get(key)
+        if entry is None:
+            entry = self._load(key)
+
+        known = None
+        if entry is not None:
+            last_ts = entry.last_ts
+            new_start = len(ts) if last_ts is None else int(np.searchsorted(ts, last_ts, side="right"))
+            known = self._lookup(entry, ts[:new_start])
+        if known is None:
+            # Belum ada profil atau data lebih tua dari histori profil: bangun ulang
+            if entry is not None:
+                self.rebuilds += 1
+            entry = VolumeProfile(SeasonalityProfile(self.lookback, quantile=quantile), np.zeros(0, dtype=np.int64), np.zeros(0))
+            new_start = 0
+            known = np.zeros(0)
+
+        parts = [known]
+        slots = slot_ids(data[new_start:]) if new_start < len(ts) else np.zeros(0, dtype=np.int64)
+        closed = max(closed_end - new_start, 0)
+        if closed > 0:
+            fresh = entry.profile.process(slots[:closed], data.volume[new_start:new_start + closed])
+            # Simpan minimal sepanjang data supaya request yang sama tidak memicu rebuild
+            keep = max(self.history, len(ts))
+            entry.timestamp = np.concatenate([entry.timestamp, ts[new_start:new_start + closed]])[-keep:]
+            entry.expected = np.concatenate([entry.expected, fresh])[-keep:]
+            parts.append(fresh)
+            self.updates += 1
+            entry.seq += 1
+            pending.append((key, entry, entry.seq, self._snapshot(entry)))
+        if new_start + closed < len(ts):
+            parts.append(entry.profile.peek(slots[closed:], data.volume[new_start + closed:]))
+
+        self._profiles[key] = entry
+        self._profiles.move_to_end(key)
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return entry, np.concatenate(parts)
+
+    def expected_volume(self, key: str, interval: str, data: BarSeries, baseline: str = "mean",
+                        now: Optional[float] = None) -> np.ndarray:
+        """
+        Expected volume untuk setiap bar di `data` (sejajar dengan data).
+        baseline: "mean", "median" atau "pNN" (lihat baseline_quantile).
+        """
+        quantile = baseline_quantile(baseline)
+        if len(data) == 0:
+            return np.zeros(0)
+        pending = []
+        with self._lock:
+            expected = self._update(self._key(key, interval, baseline), interval, data, quantile, now, pending)[1]
+        self._flush(pending)
+        return expected
+
+    def sector_surprise(self, datasets: Dict[str, BarSeries], interval: str, baseline: str = "median",
+                        key_prefix: str = "", now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Volume Surprise level sektor pada bar terakhir setiap simbol.
+
+        Volume tiap simbol dinormalisasi dengan median volumenya sendiri (supaya
+        simbol besar tidak mendominasi), sketch slot bar terakhir semua simbol
+        di-merge menjadi baseline sektor, lalu rata-rata volume relatif saat ini
+        dibandingkan dengan kuantil baseline tersebut.
+        """
+        quantile = baseline_quantile(baseline)
+        if quantile is None:
+            raise ValueError("Baseline sektor harus berupa kuantil (median atau pNN)")
+
+        symbols: Dict[str, Dict[str, Any]] = {}
+        relative = []
+        merged = KLLSketch(SKETCH_K)
+        pending = []
+        with self._lock:
+            for symbol, data in datasets.items():
+                if not data:
+                    continue
+                entry, expected = self._update(self._key(f"{key_prefix}{symbol}", interval, baseline), interval, data, quantile, now, pending)
+                profile = entry.profile
+                volume = float(data.volume[-1])
+                expected_volume = float(expected[-1])
+                symbols[symbol] = {
+                    "timestamp": data.datetime_at(-1),
+                    "volume": volume,
+                    "expected_volume": expected_volume,
+                    "ratio": volume / expected_volume if expected_volume > 0 else None,
+                }
+                norm = profile.overall_sketch().quantile(0.5)
+                sketch = profile.slot_sketch(int(slot_ids(data[-1:])[0]))
+                if norm and sketch is not None:
+                    merged.merge(sketch.scaled(1.0 / norm))
+                    relative.append(volume / norm)
+        self._flush(pending)
+
+        sector_relative = sum(relative) / len(relative) if relative else None
+        expected_relative = merged.quantile(quantile)
+        return {
+            "baseline": baseline,
+            "relative_volume": sector_relative,
+            "expected_relative_volume": expected_relative,
+            "ratio": sector_relative / expected_relative if sector_relative is not None and expected_relative else None,
+            "symbols": symbols,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "profiles": len(self._profiles),
+                "max_profiles": self.max_profiles,
+                "slots": sum(len(e.profile.ring) for e in self._profiles.values()),
+                "updates": self.updates,
+                "rebuilds": self.rebuilds,
+            }
+
+# Singleton instance
+volume_profiles = VolumeProfileStore()
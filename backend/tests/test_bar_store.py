@@ -0,0 +1,86 @@
+import os
+import shutil
+import threading
+import numpy as np
+from app.services.bar_series import BarSeries
+from app.services.bar_store import BarStore
+
+START = 1704067200 # 2024-01-01 00:00 UTC
+STEP = 3600
+
+def make_series(first: int, count: int, value: float = 0.0) -> BarSeries:
+    ts = START + STEP * np.arange(first, first + count, dtype=np.int64)
+    price = np.full(count, value) if value else 100 + np.arange(first, first + count, dtype=np.float64)
+    return BarSeries(ts, price, price, price, price, price, tz="UTC")
+
+def test_concurrent_merges_keep_all_bars(tmp_path):
+    for attempt in range(30):
+        store = BarStore(root=str(tmp_path / str(attempt)))
+        store.save("BBCA.JK", "1h", make_series(100, 40), since=START + STEP * 100)
+        barrier = threading.Barrier(2)
+
+        # Full fetch (period panjang) dan tail fetch jalan bersamaan: urutan apa pun
+        # harus berakhir dengan bar 0..149 dan since dari full fetch
+        def full():
+            barrier.wait()
+            store.merge("BBCA.JK", "1h", make_series(0, 150), since=START)
+
+        def tail():
+            barrier.wait()
+            store.merge("BBCA.JK", "1h", make_series(140, 10))
+
+        threads = [threading.Thread(target=full), threading.Thread(target=tail)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        series, meta = store.load("BBCA.JK", "1h")
+        np.testing.assert_array_equal(series.timestamp, make_series(0, 150).timestamp)
+        assert meta["since"] == START
+
+def test_reader_never_sees_torn_version(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    store.save("BBCA.JK", "1h", make_series(0, 50, value=1.0), since=START)
+    done = threading.Event()
+    torn = []
+
+    def writer():
+        # Panjang sama tiap versi: lolos cek rows, jadi hanya publish atomik yang mencegah bar campuran
+        for k in range(2, 200):
+            store.save("BBCA.JK", "1h", make_series(k, 50, value=float(k)), since=START)
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        stored = store.load("BBCA.JK", "1h")
+        assert stored is not None
+        series, _ = stored
+        k = series.open[0]
+        if k > 1 and series.timestamp[0] != START + STEP * int(k):
+            torn.append(k)
+        for col in (series.high, series.low, series.close, series.volume):
+            if not np.all(col == k):
+                torn.append(k)
+    thread.join()
+    assert not torn
+
+def test_reads_legacy_flat_layout(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    path = store._path("BBCA.JK", "1h")
+    store.save("BBCA.JK", "1h", make_series(0, 10), since=START)
+
+    # Pindahkan versi aktif ke layout lama (kolom langsung di folder symbol/interval)
+    version = store._current_version(path)
+    for name in os.listdir(os.path.join(path, version)):
+        shutil.move(os.path.join(path, version, name), os.path.join(path, name))
+    shutil.rmtree(os.path.join(path, version))
+    os.remove(os.path.join(path, BarStore.POINTER))
+
+    series, meta = store.load("BBCA.JK", "1h")
+    assert meta["rows"] == 10
+    merged = store.merge("BBCA.JK", "1h", make_series(5, 10))
+    assert len(merged) == 15
+    assert not os.path.exists(os.path.join(path, "meta.json"))
+    assert len(store.load("BBCA.JK", "1h")[0]) == 15
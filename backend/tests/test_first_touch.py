@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from app.services.bar_series import BarSeries
+from app.services.first_touch import LOSS, OPEN, WIN, first_at_least, simulate_exits, sparse_max
+
+def bars(high, low) -> BarSeries:
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    ts = 1704067200 + 3600 * np.arange(len(high), dtype=np.int64)
+    mid = (high + low) / 2
+    return BarSeries(ts, mid, high, low, mid, np.ones(len(high)), tz="UTC")
+
+def naive_first_at_least(values, start, level):
+    for i in range(start, len(values)):
+        if values[i] >= level:
+            return i
+    return len(values)
+
+def naive_exit(data: BarSeries, start, sl, tp, long):
+    # Loop exit backtester lama: SL dicek dulu (konservatif), lalu TP
+    for i in range(start, len(data)):
+        if (data.low[i] <= sl) if long else (data.high[i] >= sl):
+            return i, LOSS
+        if (data.high[i] >= tp) if long else (data.low[i] <= tp):
+            return i, WIN
+    return len(data), OPEN
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 7, 64, 257])
+def test_first_at_least_matches_loop(n):
+    rng = np.random.default_rng(n)
+    values = rng.normal(0, 1, n)
+    values[rng.uniform(size=n) < 0.1] = np.nan # NaN tidak pernah tersentuh
+    start = rng.integers(0, n + 1, 200)
+    level = rng.normal(0, 1.5, 200)
+    expected = [naive_first_at_least(values, s, l) for s, l in zip(start, level)]
+    np.testing.assert_array_equal(first_at_least(sparse_max(values), start, level), expected)
+
+def test_first_at_least_empty_and_single():
+    assert first_at_least(sparse_max(np.zeros(0)), [0, 0], [1.0, -1.0]).tolist() == [0, 0]
+    table = sparse_max(np.array([5.0]))
+    assert first_at_least(table, [0, 0, 1], [5.0, 6.0, 0.0]).tolist() == [0, 1, 1]
+
+def test_same_bar_sl_and_tp_is_loss():
+    data = bars([100, 110, 100], [100, 90, 100])
+    exit_index, status = simulate_exits(data, [1, 1], [95, 105], [105, 95], long=[True, False])
+    assert exit_index.tolist() == [1, 1]
+    assert status.tolist() == [LOSS, LOSS]
+
+def test_single_bar_and_untouched():
+    data = bars([101], [99])
+    exit_index, status = simulate_exits(data, [0, 0, 1], [98, 99, 90], [102, 110, 110], long=True)
+    assert exit_index.tolist() == [1, 0, 1]
+    assert status.tolist() == [OPEN, LOSS, OPEN]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_simulate_exits_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(rng.normal(0, 0.01, 300).cumsum())
+    data = bars(close * (1 + rng.uniform(0, 0.01, 300)), close * (1 - rng.uniform(0, 0.01, 300)))
+    start = rng.integers(0, 301, 500)
+    long = rng.uniform(size=500) < 0.5
+    entry = close[np.minimum(start, 299)]
+    risk = entry * rng.uniform(0.001, 0.05, 500)
+    sl = np.where(long, entry - risk, entry + risk)
+    tp = np.where(long, entry + 1.5 * risk, entry - 1.5 * risk)
+
+    exit_index, status = simulate_exits(data, start, sl, tp, long)
+    expected = [naive_exit(data, *args) for args in zip(start, sl, tp, long)]
+    assert list(zip(exit_index.tolist(), status.tolist())) == expected
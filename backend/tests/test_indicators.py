@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from app.services import indicators
+from app.services.bar_series import BarSeries
+from app.services.indicator_state import AtrState, DmiState, RsiState
+
+def make_series(count: int, seed: int = 0) -> BarSeries:
+    rng = np.random.default_rng(seed)
+    ts = 1704067200 + 3600 * np.arange(count, dtype=np.int64)
+    close = 100 + rng.normal(0, 1, count).cumsum()
+    high = close + rng.uniform(0, 2, count)
+    low = close - rng.uniform(0, 2, count)
+    return BarSeries(ts, close, high, low, close, rng.uniform(1e5, 1e6, count), tz="UTC")
+
+def reference_wilder(first: float, values: np.ndarray, period: int) -> np.ndarray:
+    out = [first]
+    for x in values.tolist():
+        out.append((out[-1] * (period - 1) + x) / period)
+    return np.array(out)
+
+@pytest.mark.parametrize("period", [1, 2, 14, 200])
+def test_wilder_matches_recursion(period):
+    # Cukup panjang untuk melewati beberapa chunk filter
+    values = np.random.default_rng(period).uniform(0, 1e9, 20000)
+    values[5000:6000] = 0.0
+    got = indicators.wilder(3.5, values, period)
+    np.testing.assert_allclose(got, reference_wilder(3.5, values, period), rtol=1e-12)
+
+@pytest.mark.parametrize("count", [0, 1, 13, 14, 15, 16, 28, 29, 30, 300, 10000])
+def test_wilder_indicators_match_streaming(count):
+    # State streaming menjalankan rekursi Wilder per bar
+    data = make_series(count, seed=count)
+    bars = data.to_marketdata()
+    for cls, fn in [(AtrState, indicators.atr), (RsiState, indicators.rsi)]:
+        state = cls(14)
+        streamed = [state.update(bar) for bar in bars]
+        batch = fn(data, 14)
+        m = min(len(batch), count)
+        np.testing.assert_allclose(batch[:m], streamed[:m], rtol=1e-12, atol=1e-9)
+    state = DmiState(14)
+    streamed = np.array([state.update(bar) for bar in bars]).reshape(-1, 3).T
+    for got, expected in zip(indicators.dmi(data, 14), streamed):
+        assert len(got) == count
+        np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-9)
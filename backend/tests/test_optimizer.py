@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from app.services.bar_series import BarSeries
+from app.services.optimizer import SweepJob, combinations, evaluate, parse_space, run_sweep
+from app.services.strategies import registry
+
+def random_walk(count: int, seed: int) -> BarSeries:
+    rng = np.random.default_rng(seed)
+    ts = 1704067200 + 3600 * np.arange(count, dtype=np.int64)
+    close = 100 * np.exp(rng.normal(0, 0.01, count).cumsum())
+    open = np.r_[close[0], close[:-1]]
+    high = np.maximum(open, close) * (1 + rng.uniform(0, 0.01, count))
+    low = np.minimum(open, close) * (1 - rng.uniform(0, 0.01, count))
+    return BarSeries(ts, open, high, low, close, rng.uniform(1e5, 1e6, count), tz="UTC")
+
+def by_params(rows):
+    return sorted(rows, key=lambda r: sorted(r["params"].items()))
+
+@pytest.mark.parametrize("strategy, spec", [("RBD", "lookback=0,20"), ("AURA", "alpha_p=0"),
+                                            ("RBD", "atr_mult=-1"), ("AURA", "score_threshold=nan")])
+def test_parse_space_rejects_out_of_range(strategy, spec):
+    with pytest.raises(ValueError):
+        parse_space(spec, registry.get(strategy).params)
+
+def test_failed_combination_is_recorded_per_row():
+    data = random_walk(500, seed=1)
+    job = SweepJob("VOLUME_SURPRISE", [{"baseline": "p150"}, {"baseline": "median"}], "total_pnl")
+    run_sweep(data, job, workers=1)
+    assert job.status == "done"
+    rows = job.table()
+    assert [row["params"]["baseline"] for row in rows] == ["median", "p150"]
+    assert rows[0]["error"] is None
+    assert rows[1]["error"].startswith("ValueError")
+    assert job.to_dict()["failed"] == 1
+
+def test_process_pool_matches_inline_run():
+    data = random_walk(1500, seed=2)
+    combos = combinations(parse_space("lookback=10,20,30;atr_mult=0.5,1.0", registry.get("RBD").params))
+    inline = run_sweep(data, SweepJob("RBD", combos, "total_pnl"), workers=1)
+    pooled = run_sweep(data, SweepJob("RBD", combos, "total_pnl"), workers=2)
+    assert pooled.status == "done"
+    assert pooled.completed == len(combos)
+    assert by_params(pooled.results) == by_params(inline.results)
+
+def test_cancel_keeps_finished_results():
+    data = random_walk(1500, seed=3)
+    combos = combinations(parse_space("lookback=5,10,15,20,25,30,35,40;atr_mult=0.5,1.0,1.5", registry.get("RBD").params))
+    job = SweepJob("RBD", combos, "total_pnl")
+    # Cancel setelah batch pertama selesai
+    run_sweep(data, job, workers=2, on_progress=lambda j: j.cancel())
+    assert job.status == "cancelled"
+    assert 0 < job.completed < job.total
+    assert len(job.results) == job.completed
@@ -0,0 +1,41 @@
+import numpy as np
+from app.services.bar_series import BarSeries
+from app.services.portfolio import PortfolioBacktester
+
+def random_walk(count: int, seed: int, step: int = 3600) -> BarSeries:
+    rng = np.random.default_rng(seed)
+    ts = 1704067200 + step * np.arange(count, dtype=np.int64)
+    close = 100 * np.exp(rng.normal(0, 0.01, count).cumsum())
+    open = np.r_[close[0], close[:-1]]
+    high = np.maximum(open, close) * (1 + rng.uniform(0, 0.01, count))
+    low = np.minimum(open, close) * (1 - rng.uniform(0, 0.01, count))
+    return BarSeries(ts, open, high, low, close, rng.uniform(1e5, 1e6, count), tz="UTC")
+
+def test_equity_curve_marks_open_positions_to_market():
+    # Simbol kedua punya bar setiap 2 jam: close-nya dibawa ke timestamp yang tidak ia punya
+    datasets = {"A": random_walk(1500, seed=1), "B": random_walk(750, seed=2, step=7200)}
+    backtester = PortfolioBacktester(initial_capital=1e6, max_positions=2, workers=1)
+    result = backtester.run("RBD", datasets)
+    assert result["total_trades"] > 0
+
+    timeline = np.array([row["timestamp"] for row in result["equity_curve"]])
+    equity = np.array([row["equity"] for row in result["equity_curve"]])
+    expected = np.full(len(timeline), 1e6)
+    for trade in result["trades"]:
+        entry_ts, exit_ts = trade["entry_date"].timestamp(), trade["exit_date"].timestamp()
+        data = datasets[trade["symbol"]]
+        sign = 1.0 if trade["position"] == "LONG" else -1.0
+        for i, ts in enumerate(timeline):
+            if ts >= exit_ts:
+                expected[i] += trade["pnl"]
+            elif ts >= entry_ts:
+                close = data.close[np.searchsorted(data.timestamp, ts, side="right") - 1]
+                expected[i] += trade["invested"] * (close - trade["entry_price"]) / trade["entry_price"] * sign
+    np.testing.assert_allclose(equity, expected, rtol=1e-12)
+    assert np.isclose(equity[-1], result["final_equity"])
+
+    # Drawdown memperhitungkan rugi yang belum direalisasi, jadi minimal sama dengan drawdown di titik exit
+    exits = np.isin(timeline, [t["exit_date"].timestamp() for t in result["trades"]])
+    realized = np.r_[1e6, equity[exits]]
+    realized_drawdown = ((np.maximum.accumulate(realized) - realized) / np.maximum.accumulate(realized)).max() * 100
+    assert result["max_drawdown_percent"] >= realized_drawdown
@@ -0,0 +1,28 @@
+import numpy as np
+from app.services.bar_cache import interval_seconds
+from app.services.bar_series import BarSeries
+from app.services.fetcher import DataFetcher
+
+START = 1704067200 # 2024-01-01 00:00 UTC
+
+def test_use_cache_false_refetches_base_of_derived_interval(monkeypatch):
+    fetcher = DataFetcher()
+    calls = []
+
+    def fake_fetch(yf_symbol, interval, period):
+        calls.append(interval)
+        step = interval_seconds(interval)
+        count = 30 * 86400 // step
+        price = np.full(count, 100.0 + len(calls))
+        ts = START + step * np.arange(count, dtype=np.int64)
+        return BarSeries(ts, price, price, price, price, np.ones(count), tz="UTC")
+
+    monkeypatch.setattr(fetcher, "_fetch_with_store", fake_fetch)
+    first = fetcher.get_historical_data("BTC-USD", interval="4h", period="1mo")
+    assert len(calls) == 1 and calls[0] != "4h"
+    assert fetcher.get_historical_data("BTC-USD", interval="4h", period="1mo").close[-1] == first.close[-1]
+    assert len(calls) == 1
+
+    fresh = fetcher.get_historical_data("BTC-USD", interval="4h", period="1mo", use_cache=False)
+    assert len(calls) == 2
+    assert fresh.close[-1] == 102.0
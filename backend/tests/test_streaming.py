@@ -0,0 +1,113 @@
+import asyncio
+import json
+import sys
+import threading
+import numpy as np
+import pytest
+from app.services.bar_series import BarSeries
+from app.services.streaming import BarRing, LiveFeed, StreamManager
+
+websockets = pytest.importorskip("websockets")
+
+T0 = 1704067200 # 2024-01-01 00:00 UTC
+MINUTE = 60
+
+def kline(start: int, close: float, closed: bool) -> str:
+    # Format pesan kline Binance (harga & volume sebagai string)
+    return json.dumps({"e": "kline", "k": {
+        "t": start * 1000, "o": "100.0", "h": str(max(close, 100.0)), "l": str(min(close, 100.0)),
+        "c": str(close), "v": "5.0", "x": closed,
+    }})
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Timeout menunggu feed")
+        await asyncio.sleep(0.01)
+
+async def run_feed():
+    paths = []
+    release = asyncio.Event()
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        await ws.send(kline(T0, 101.0, closed=False))
+        await ws.send(kline(T0, 102.0, closed=True))
+        await ws.send(kline(T0 + MINUTE, 103.0, closed=False))
+        await release.wait()
+        await ws.send(kline(T0 + MINUTE, 104.0, closed=True))
+        await ws.send(kline(T0 + 2 * MINUTE, 105.0, closed=False))
+        await ws.wait_closed()
+
+    async def no_poll():
+        return None
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        streams = StreamManager(ws_url=f"ws://127.0.0.1:{port}/ws", poll_interval=0.01)
+        key = "BTC-USD_1m"
+        streams.subscribe(key, no_poll, ws_stream="btcusdt@kline_1m")
+        try:
+            await wait_for(lambda: streams.latest(key) is not None and streams.latest(key).close == 103.0)
+            first_ring = streams.recent_bars(key)
+            release.set()
+            await wait_for(lambda: streams.latest(key).close == 105.0)
+            return paths, first_ring, streams.recent_bars(key), streams.latest(key)
+        finally:
+            await streams.stop_all()
+
+def test_websocket_feed_updates_latest_and_ring():
+    paths, first_ring, ring, latest = asyncio.run(run_feed())
+    assert paths == ["/ws/btcusdt@kline_1m"]
+    assert first_ring.timestamp.tolist() == [T0]
+    assert first_ring.close.tolist() == [102.0]
+    assert ring.timestamp.tolist() == [T0, T0 + MINUTE]
+    assert ring.close.tolist() == [102.0, 104.0]
+    assert int(latest.timestamp.timestamp()) == T0 + 2 * MINUTE
+
+def test_merge_recent_appends_closed_bars():
+    streams = StreamManager(ring_size=4)
+    feed_key = "BTC-USD_1m"
+    feed = streams.feeds[feed_key] = LiveFeed(feed_key, 4)
+    for k, close in enumerate([10.0, 11.0, 12.0]):
+        feed.ring.push(T0 + k * MINUTE, close, close, close, close, 1.0)
+
+    # Cache berhenti di bar kedua (masih berjalan saat di-cache)
+    ts = np.array([T0 - MINUTE, T0, T0 + MINUTE], dtype=np.int64)
+    prices = np.array([9.0, 10.0, 10.5])
+    cached = BarSeries(ts, prices, prices, prices, prices, np.ones(3), tz="UTC")
+    merged = streams.merge_recent(feed_key, cached)
+    assert merged.timestamp.tolist() == [T0 - MINUTE, T0, T0 + MINUTE, T0 + 2 * MINUTE]
+    assert merged.close.tolist() == [9.0, 10.0, 11.0, 12.0]
+    # Hasil dipakai ulang selama ring tidak berubah
+    assert streams.merge_recent(feed_key, cached) is merged
+    assert streams.merge_recent("ETH-USD_1m", cached) is cached
+
+def test_ring_snapshot_consistent_while_pushing():
+    ring = BarRing(8)
+    done = threading.Event()
+
+    def writer():
+        # Ring penuh: setiap push menimpa slot paling lama
+        for k in range(200000):
+            ring.push(T0 + k * MINUTE, k, k, k, k, k)
+        done.set()
+
+    # Switch thread sesering mungkin supaya pembaca bisa menyela di tengah push
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    bad = 0
+    while not done.is_set():
+        series = ring.to_series("UTC")
+        index = (series.timestamp - T0) // MINUTE
+        if np.any(np.diff(series.timestamp) <= 0):
+            bad += 1
+        for col in (series.open, series.high, series.low, series.close, series.volume):
+            if not np.array_equal(col, index):
+                bad += 1
+    thread.join()
+    sys.setswitchinterval(interval)
+    assert bad == 0
@@ -0,0 +1,39 @@
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from app.models.schemas import StrategySignal
+from app.services.backtester import Backtester
+from app.services.bar_series import BarSeries
+from app.services.first_touch import LOSS, WIN
+from app.services.strategies import registry
+from app.services.trade_engine import ORDER_MODELS
+
+def random_walk(count: int, seed: int) -> BarSeries:
+    rng = np.random.default_rng(seed)
+    ts = 1704067200 + 3600 * np.arange(count, dtype=np.int64)
+    close = 100 * np.exp(rng.normal(0, 0.01, count).cumsum())
+    open = np.r_[close[0], close[:-1]]
+    high = np.maximum(open, close) * (1 + rng.uniform(0, 0.01, count))
+    low = np.minimum(open, close) * (1 - rng.uniform(0, 0.01, count))
+    return BarSeries(ts, open, high, low, close, rng.uniform(1e5, 1e6, count), tz="UTC")
+
+@pytest.mark.parametrize("strategy", [spec.name for spec in registry.specs() if spec.backtest])
+def test_status_agrees_with_pnl_sign(strategy):
+    # Seed 15 dan 17 menghasilkan stop Aura di sisi yang salah dari entry
+    for seed in range(20):
+        columns = Backtester(random_walk(3000, seed)).simulate(strategy)
+        assert np.all(columns.pnl[columns.status == WIN] > 0)
+        assert np.all(columns.pnl[columns.status == LOSS] < 0)
+
+def signal(kind: str, price: float, sl: float, tp: float) -> StrategySignal:
+    return StrategySignal(name="x", timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc), type=kind,
+                          price=price, metadata={"sl": sl, "tp": tp})
+
+def test_bracket_rejects_levels_on_wrong_side():
+    bracket = ORDER_MODELS["bracket"]
+    assert bracket(signal("BULLISH", 100, 95, 110)) is not None
+    assert bracket(signal("BEARISH", 100, 105, 90)) is not None
+    assert bracket(signal("BULLISH", 100, 101, 110)) is None # SL di atas entry
+    assert bracket(signal("BULLISH", 100, 95, 99)) is None
+    assert bracket(signal("BEARISH", 100, 99, 90)) is None # SL di bawah entry
+    assert bracket(signal("BEARISH", 100, 105, 101)) is None
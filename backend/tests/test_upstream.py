@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from app.services import streaming
+from app.services.streaming import LiveFeed, StreamManager
+from app.services.upstream import HostGuard, UpstreamUnavailable
+
+def test_low_priority_keeps_reserve_for_data_fetches():
+    guard = HostGuard("yahoo", rate=4, burst=8, max_wait=2, reserve=4)
+    polls = 0
+    for _ in range(100):
+        try:
+            assert guard.acquire(low_priority=True) == 0.0
+            polls += 1
+        except UpstreamUnavailable:
+            pass
+    # Hanya token di atas cadangan yang dipakai polling
+    assert polls == 4
+    assert guard.stats()["deferred"] == 96
+    # Fetch data tetap mendapat token cadangan tanpa menunggu
+    assert [guard.acquire() for _ in range(4)] == [0.0] * 4
+    # Fetch data yang mengantre membuat polling ditolak, bukan sebaliknya
+    assert guard.acquire() > 0
+    with pytest.raises(UpstreamUnavailable):
+        guard.acquire(low_priority=True)
+
+def test_poller_backs_off_while_upstream_busy(monkeypatch):
+    streams = StreamManager(poll_interval=0.01, max_poll_interval=0.04)
+    feed = LiveFeed("BBCA.JK_1d")
+    results = iter([False, False, False, False, True, False])
+    delays = []
+
+    async def poll():
+        if not next(results):
+            raise UpstreamUnavailable("yahoo: busy, low-priority request deferred")
+        return None
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        if len(delays) == 6:
+            feed.last_read = 0.0 # Feed idle: poller berhenti
+
+    monkeypatch.setattr(streaming.asyncio, "sleep", fake_sleep)
+    asyncio.run(streams._run_poll(feed, poll))
+    assert delays == [0.02, 0.04, 0.04, 0.04, 0.01, 0.02]
@@ -0,0 +1,65 @@
+import numpy as np
+from app.services.bar_series import BarSeries
+from app.services.volume_profile import VolumeProfileStore
+
+DAY = 86400
+START = 1704067200 # 2024-01-01 00:00 UTC
+NOW = START + 1000 * DAY
+
+def make_series(start: int, step: int, count: int, scale: float, seed: int) -> BarSeries:
+    rng = np.random.default_rng(seed)
+    ts = start + step * np.arange(count, dtype=np.int64)
+    close = 100 + rng.normal(0, 1, count).cumsum()
+    volume = scale * rng.uniform(0.5, 1.5, count)
+    return BarSeries(ts, close, close + 1, close - 1, close, volume, tz="UTC")
+
+def test_intervals_do_not_share_profile(tmp_path):
+    daily = make_series(START, DAY, 120, 1e8, seed=1)
+    # Bar jam 00:00 punya timestamp yang sama dengan bar harian
+    hourly = make_series(START, 3600, 24 * 120, 1e5, seed=2)
+
+    fresh = VolumeProfileStore(root=str(tmp_path / "fresh")).expected_volume("YAHOO_BBCA", "1d", daily, now=NOW)
+
+    store = VolumeProfileStore(root=str(tmp_path / "mixed"))
+    first = store.expected_volume("YAHOO_BBCA", "1d", daily, now=NOW)
+    store.expected_volume("YAHOO_BBCA", "1h", hourly, now=NOW)
+    again = store.expected_volume("YAHOO_BBCA", "1d", daily, now=NOW)
+    np.testing.assert_array_equal(first, fresh)
+    np.testing.assert_array_equal(again, fresh)
+
+    # Profil yang dibaca ulang dari disk juga tidak tercampur
+    reloaded = VolumeProfileStore(root=str(tmp_path / "mixed"))
+    np.testing.assert_array_equal(reloaded.expected_volume("YAHOO_BBCA", "1d", daily, now=NOW), fresh)
+    assert reloaded.expected_volume("YAHOO_BBCA", "1h", hourly, now=NOW).max() < 1e6
+
+def test_period_keys_are_order_independent(tmp_path):
+    year = make_series(START, DAY, 365, 1e6, seed=3)
+    month = year[-30:]
+
+    fresh = VolumeProfileStore(root=str(tmp_path / "fresh")).expected_volume("YAHOO_BBCA_1mo", "1d", month, now=NOW)
+
+    store = VolumeProfileStore(root=str(tmp_path / "shared"))
+    store.expected_volume("YAHOO_BBCA_1y", "1d", year, now=NOW)
+    np.testing.assert_array_equal(store.expected_volume("YAHOO_BBCA_1mo", "1d", month, now=NOW), fresh)
+
+def test_profiles_are_bounded_and_saved_outside_lock(tmp_path):
+    store = VolumeProfileStore(root=str(tmp_path), max_profiles=2)
+    save = store._save
+    locked = []
+
+    def checked_save(*args):
+        locked.append(store._lock.locked())
+        save(*args)
+
+    store._save = checked_save
+    datasets = {f"S{k}": make_series(START, DAY, 60, 1e6, seed=10 + k) for k in range(4)}
+    first = {symbol: store.expected_volume(symbol, "1d", data, baseline=f"p{10 + k}", now=NOW)
+             for k, (symbol, data) in enumerate(datasets.items())}
+    assert store.stats()["profiles"] == 2
+    assert locked and not any(locked)
+
+    # Profil yang sudah dibuang dari memory dibaca ulang dari disk tanpa rebuild
+    again = store.expected_volume("S0", "1d", datasets["S0"], baseline="p10", now=NOW)
+    np.testing.assert_array_equal(again, first["S0"])
+    assert store.stats()["rebuilds"] == 0
+    assert store.stats()["profiles"] == 2